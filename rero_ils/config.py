@@ -386,6 +386,11 @@ CELERY_BEAT_SCHEDULE = {
         "schedule": schedules.timedelta(minutes=1),
         "enabled": False,
     },
+    "celery.operation-logs-writer": {
+        "task": "rero_ils.modules.operation_logs.tasks.flush_operation_logs",
+        "schedule": schedules.timedelta(seconds=30),
+        "enabled": False,
+    },
     "celery.accounts": {
         "task": "invenio_accounts.tasks.clean_session_table",
         "schedule": schedules.timedelta(minutes=60),
@@ -531,9 +536,24 @@ CELERY_BEAT_SCHEDULE = {
 }
 
 INDEXER_BULK_REQUEST_TIMEOUT = 60
+#: Number of queue messages loaded together by the bulk indexer.
+RERO_ILS_INDEXER_BULK_CHUNK_SIZE = 500
+
+#: Timeout (in seconds) of the circulation policies resolution tables
+#: stored into the application cache (0 means no expiration).
+RERO_ILS_CIRC_POLICIES_CACHE_TIMEOUT = 300
+
+#: Horizon (in days before and after today) of the precomputed library
+#: opening calendars. Dates outside this horizon are computed day by day.
+RERO_ILS_LIBRARY_CALENDAR_PAST_DAYS = 730
+RERO_ILS_LIBRARY_CALENDAR_FUTURE_DAYS = 730
 
 RERO_IMPORT_CACHE = "redis://localhost:6379/5"
+#: Time to live (in minutes) of the cached import results.
 RERO_IMPORT_CACHE_EXPIRE = 10
+#: Time to live (in seconds) of the cached empty import results and source
+#: failures.
+RERO_IMPORT_CACHE_NEGATIVE_EXPIRE = 60
 
 # Database
 # ========
@@ -1991,6 +2011,9 @@ RECORDS_REST_ENDPOINTS = dict(
 # TODO: Should be taken into angular
 RERO_ILS_SEARCH_GLOBAL_VIEW_CODE = "global"
 RERO_ILS_SEARCH_GLOBAL_NAME = _("Global catalog")
+#: Maximum age (in seconds) of the organisations by view code kept into the
+#: process memory.
+RERO_ILS_ORGANISATION_VIEWCODE_CACHE_TTL = 300
 
 # Default number of results in facet
 RERO_ILS_DEFAULT_AGGREGATION_SIZE = 30
@@ -3372,11 +3395,31 @@ RERO_ILS_ENABLE_OPERATION_LOG = {
     "local_entities": "locent",
 }
 RERO_ILS_ENABLE_OPERATION_LOG_VALIDATION = False
+#: Send the operation logs to a durable message queue indexed by chunks
+#: instead of indexing each log when it is created.
+RERO_ILS_OPERATION_LOG_BUFFERED = False
+#: Name of the operation logs message queue.
+RERO_ILS_OPERATION_LOG_MQ_QUEUE = "operation_logs"
+#: Number of queued operation logs indexed by bulk request. A flush is also
+#: triggered when a process has published this number of logs.
+RERO_ILS_OPERATION_LOG_CHUNK_SIZE = 500
 
 # Statistics Configuration
 # ========================
 # Compute the stats with a timeframe given in months
 RERO_ILS_STATS_BILLING_TIMEFRAME_IN_MONTHS = 3
+#: Number of libraries processed in parallel to compute the statistics.
+RERO_ILS_STATS_WORKERS = 4
+#: Method used to count the active patrons:
+#: - `exact`: distinct patrons paged with a composite aggregation.
+#: - `cardinality`: approximate distinct count (HyperLogLog++), exact below
+#:    the precision threshold.
+#: - `scan`: all the operation logs are loaded (slow, for comparison only).
+RERO_ILS_STATS_ACTIVE_PATRONS_MODE = "exact"
+#: Precision threshold of the `cardinality` count (max: 40000).
+RERO_ILS_STATS_ACTIVE_PATRONS_PRECISION_THRESHOLD = 40000
+#: Number of patrons by composite aggregation page.
+RERO_ILS_STATS_ACTIVE_PATRONS_PAGE_SIZE = 1000
 
 
 # =============================================================================
@@ -3425,6 +3468,18 @@ ROLLOVER_LOGGING_CONFIG = {
 # notification with this type, the notification will not be created.
 RERO_ILS_DISABLED_NOTIFICATION_TYPE = []
 
+# Number of loans processed together when the reminder notifications
+# (due soon, overdue) are created: notifications of a chunk are committed
+# and indexed together.
+RERO_ILS_NOTIFICATIONS_CREATION_CHUNK_SIZE = 500
+# Number of aggregated notifications sent together by the dispatcher: the
+# emails of a chunk are sent with one SMTP connection and the notifications
+# of a chunk are committed and indexed together.
+RERO_ILS_NOTIFICATIONS_DISPATCH_CHUNK_SIZE = 100
+# Number of threads used by the dispatcher to build and send the aggregated
+# notifications of a chunk (1 means no thread).
+RERO_ILS_NOTIFICATIONS_DISPATCH_WORKERS = 1
+
 # Define which files should be considered as a template file. Each full_path
 # file matching one of the specific regular expression will be considered.
 RERO_ILS_NOTIFICATIONS_ALLOWED_TEMPLATE_FILES = ["*.txt", "*.tpl.*"]
@@ -3478,6 +3533,20 @@ INDEXER_REPLACE_REFS = True
 INDEXER_RECORD_TO_INDEX = "rero_ils.modules.indexer_utils.record_to_index"
 #: Trigger delay for celery tasks to index referenced records.
 RERO_ILS_INDEXER_TASK_DELAY = schedules.timedelta(seconds=2)
+#: Refresh policy for single record indexing/deletion.
+#: One of `true`, `wait_for`, `deferred` (refresh once at the end of the
+#: request/task) or `none` (see `rero_ils.modules.indexer_utils`).
+RERO_ILS_INDEXER_REFRESH_POLICY = "true"
+#: Refresh policies by record type, ie: `{"notif": "wait_for"}`.
+RERO_ILS_INDEXER_REFRESH_POLICIES = {}
+#: Coalesce the reindexing of dependent records (holdings, documents) and
+#: index them once at the end of each API request.
+RERO_ILS_INDEXER_COALESCE_REINDEX = False
+
+#: Record types kept into the request scoped record cache, ie:
+#: `["org", "lib", "loc", "itty", "ptty", "cipo"]` for the circulation.
+#: The request scoped record cache is disabled if empty.
+RERO_ILS_RECORD_CACHE_PID_TYPES = []
 
 RERO_ILS_APP_URL_SCHEME = "https"
 RERO_ILS_APP_HOST = "bib.rero.ch"
@@ -3536,6 +3605,11 @@ RERO_ILS_ENTITY_TYPES = {
 # The absolute path to put the agent synchronization logs, default is the
 # instance  path
 # RERO_ILS_MEF_SYNC_LOG_DIR = "/var/logs/reroils"
+#: Number of concurrent MEF server requests of the entity synchronization.
+RERO_ILS_MEF_SYNC_WORKERS = 4
+#: Number of entities synchronized by batch: the linked documents are updated
+#: once by batch.
+RERO_ILS_MEF_SYNC_CHUNK_SIZE = 100
 
 RERO_ILS_APP_HELP_PAGE = "https://github.com/rero/rero-ils/wiki/Public-demo-help"
 
@@ -3917,6 +3991,10 @@ RERO_IMPORT_REST_ENDPOINTS = dict(
     ),
 )
 
+#: Maximum time (in seconds) to wait for the sources of a federated import
+#: search (`/imports/federated/`).
+RERO_IMPORT_FEDERATED_TIMEOUT = 30
+
 # STREAMED EXPORT RECORDS
 # =============================================================================
 RERO_INVENIO_BASE_EXPORT_REST_ENDPOINTS = dict(
@@ -3944,6 +4022,14 @@ RERO_INVENIO_BASE_EXPORT_REST_ENDPOINTS = dict(
         },
         search_serializers_aliases={"csv": "text/csv"},
     ),
+    document=dict(
+        resource=RECORDS_REST_ENDPOINTS.get("doc"),
+        default_media_type="application/marcxml+xml",
+        search_serializers={
+            "application/marcxml+xml": "rero_ils.modules.documents.serializers:xml_marcxml_stream_search",
+        },
+        search_serializers_aliases={"marcxml": "application/marcxml+xml"},
+    ),
     patron_transaction_events=dict(
         resource=RECORDS_REST_ENDPOINTS.get("ptre"),
         default_media_type="text/csv",
@@ -3960,6 +4046,11 @@ RERO_INVENIO_BASE_EXPORT_REST_ENDPOINTS = dict(
 RERO_SRU_NUMBER_OF_RECORDS = 100
 # Maximum number of records which can be harvested with an request.
 RERO_SRU_MAXIMUM_RECORDS = 1000
+# Deepest record position reachable without a result set cursor (the
+# `max_result_window` setting of the documents index).
+RERO_SRU_MAX_RESULT_WINDOW = 10000
+# Inactivity time (in seconds) after which a result set cursor expires.
+RERO_SRU_RESULT_SET_TTL = 300
 
 # SIP2
 # ====
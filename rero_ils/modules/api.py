@@ -18,6 +18,8 @@
 
 """API for manipulating records."""
 import re
+from contextlib import ExitStack, nullcontext
+from contextvars import ContextVar
 from copy import deepcopy
 from uuid import uuid4
 
@@ -26,7 +28,7 @@ import pytz
 from celery import current_app as current_celery_app
 from elasticsearch.exceptions import NotFoundError
 from elasticsearch.helpers import bulk
-from flask import current_app
+from flask import current_app, g, has_request_context
 from invenio_db import db
 from invenio_indexer.api import RecordIndexer
 from invenio_indexer.signals import before_record_index
@@ -34,16 +36,21 @@ from invenio_pidstore.errors import PIDDoesNotExistError
 from invenio_pidstore.models import PersistentIdentifier, PIDStatus
 from invenio_records.api import Record
 from invenio_records_rest.utils import obj_or_import_string
-from invenio_search import current_search
+from invenio_search import current_search, current_search_client
 from invenio_search.api import RecordsSearch
 from invenio_search.engine import search
+from invenio_search.utils import build_alias_name
 from jsonschema import FormatChecker
 from jsonschema.exceptions import ValidationError
 from kombu.compat import Consumer
-from sqlalchemy import text
 from sqlalchemy.orm.exc import NoResultFound
 
-from .utils import extracted_data_from_ref
+from .indexer_utils import get_refresh_policy, refresh_argument
+from .monitoring.metrics import Metrics
+from .utils import extracted_data_from_ref, iter_query_by_keyset
+
+_reindex_coordinator = ContextVar("reindex_coordinator", default=None)
+_record_cache = ContextVar("record_cache", default=None)
 
 """Custom ILS record JSON schema format validator."""
 ils_record_format_checker = FormatChecker()
@@ -265,34 +272,88 @@ class IlsRecord(Record):
         return record
 
     @classmethod
-    def get_record_by_pid(cls, pid, with_deleted=False, verbose=False):
-        """Get ILS record by pid value."""
+    def get_record(cls, id_, with_deleted=False, read_only=False):
+        """Get ILS record by uuid.
+
+        :param id_: the record uuid.
+        :param with_deleted: also get deleted records.
+        :param read_only: the caller will not modify the returned record, so
+            the record instance shared by the record cache could be returned.
+        :returns: the record.
+        """
+        cache = None if with_deleted else RecordCache.current()
+        if cache and (record := cache.get(cls, id_=id_, read_only=read_only)):
+            return record
+        record = super().get_record(id_, with_deleted=with_deleted)
+        if cache:
+            record = cache.put(record, read_only=read_only)
+        return record
+
+    @classmethod
+    def get_record_by_pid(cls, pid, with_deleted=False, verbose=False, read_only=False):
+        """Get ILS record by pid value.
+
+        :param pid: the record pid.
+        :param with_deleted: also get deleted records.
+        :param verbose: verbose output.
+        :param read_only: the caller will not modify the returned record, so
+            the record instance shared by the record cache could be returned.
+        :returns: the record or `None` if not found.
+        """
         if verbose:
             click.echo(f"\t\tget_record_by_pid: {cls.__name__} {pid}")
         if pid:
             assert cls.provider
+            cache = None if with_deleted else RecordCache.current()
+            if cache and (record := cache.get(cls, pid=pid, read_only=read_only)):
+                return record
             try:
                 persistent_identifier = PersistentIdentifier.get(
                     cls.provider.pid_type, pid
                 )
-                return super().get_record(
+                record = super().get_record(
                     persistent_identifier.object_uuid, with_deleted=with_deleted
                 )
             # TODO: is it better to raise a error or to return None?
             except (NoResultFound, PIDDoesNotExistError):
                 return None
+            if cache:
+                record = cache.put(record, read_only=read_only)
+            return record
 
     @classmethod
-    def get_records_by_pids(cls, pids):
+    def get_records_by_pids(cls, pids, with_deleted=False, chunk_size=1000):
         """Get ILS records by pid values.
 
+        Records are loaded with one query (persistent identifiers joined with
+        the record metadata) by chunk of pids. Records are returned in the
+        order of the given pids, unknown pids are ignored.
+
         :param pids: Object pid list to retrieve.
+        :param with_deleted: also get deleted records.
+        :param chunk_size: number of records loaded by query.
         :return: Generator of ILS resource.
         """
         assert type(pids) is list
-        for pid in pids:
-            if resource := cls.get_record_by_pid(pid):
-                yield resource
+        assert cls.provider
+        model_cls = cls.model_cls
+        for idx in range(0, len(pids), chunk_size):
+            chunk = pids[idx : idx + chunk_size]
+            query = (
+                db.session.query(PersistentIdentifier.pid_value, model_cls)
+                .join(model_cls, model_cls.id == PersistentIdentifier.object_uuid)
+                .filter(
+                    PersistentIdentifier.pid_type == cls.provider.pid_type,
+                    PersistentIdentifier.pid_value.in_(chunk),
+                )
+            )
+            if not with_deleted:
+                query = query.filter(model_cls.is_deleted != True)  # noqa: E712
+            with db.session.no_autoflush:
+                models = dict(query.all())
+            for pid in chunk:
+                if model := models.get(pid):
+                    yield cls(model.data, model=model)
 
     @classmethod
     def record_pid_exists(cls, pid):
@@ -341,40 +402,48 @@ class IlsRecord(Record):
         return query
 
     @classmethod
-    def get_all_pids(cls, with_deleted=False, limit=100000):
-        """Get all records pids. Return a generator iterator."""
-        query = cls._get_all(with_deleted=with_deleted)
+    def _iter_all(cls, columns, with_deleted=False, limit=100000, stream=False):
+        """Iterate over the persistent identifiers of the record type.
+
+        :param columns: the persistent identifier columns to retrieve.
+        :param with_deleted: get also deleted persistent identifiers.
+        :param limit: page size, all rows are loaded at once if `None`.
+        :param stream: use a server side cursor instead of pages. No database
+            commit could be done while iterating.
+        :returns: an iterator of rows.
+        """
+        query = cls._get_all(with_deleted=with_deleted).with_entities(
+            PersistentIdentifier.id, *columns
+        )
+        if stream:
+            return query.yield_per(limit or 1000)
         if limit:
-            count = query.count()
             # slower, less memory
-            query = query.order_by(text("pid_value")).limit(limit)
-            offset = 0
-            while offset < count:
-                for identifier in query.offset(offset):
-                    yield identifier.pid_value
-                offset += limit
-        else:
-            # faster, more memory
-            for identifier in query:
-                yield identifier.pid_value
+            return iter_query_by_keyset(query, PersistentIdentifier.id, limit)
+        # faster, more memory
+        return query
 
     @classmethod
-    def get_all_ids(cls, with_deleted=False, limit=100000):
+    def get_all_pids(cls, with_deleted=False, limit=100000, stream=False):
+        """Get all records pids. Return a generator iterator."""
+        for identifier in cls._iter_all(
+            [PersistentIdentifier.pid_value],
+            with_deleted=with_deleted,
+            limit=limit,
+            stream=stream,
+        ):
+            yield identifier.pid_value
+
+    @classmethod
+    def get_all_ids(cls, with_deleted=False, limit=100000, stream=False):
         """Get all records uuids. Return a generator iterator."""
-        query = cls._get_all(with_deleted=with_deleted)
-        if limit:
-            # slower, less memory
-            query = query.order_by(text("pid_value")).limit(limit)
-            offset = 0
-            count = cls.count(with_deleted=with_deleted)
-            while offset < count:
-                for identifier in query.limit(limit).offset(offset):
-                    yield identifier.object_uuid
-                offset += limit
-        else:
-            # faster, more memory
-            for identifier in query:
-                yield identifier.object_uuid
+        for identifier in cls._iter_all(
+            [PersistentIdentifier.object_uuid],
+            with_deleted=with_deleted,
+            limit=limit,
+            stream=stream,
+        ):
+            yield identifier.object_uuid
 
     @classmethod
     def count(cls, with_deleted=False):
@@ -392,10 +461,17 @@ class IlsRecord(Record):
         except NoResultFound:
             pass
 
+    def commit(self, **kwargs):
+        """Store changes of the current record instance in the database."""
+        record = super().commit(**kwargs)
+        RecordCache.invalidate(self)
+        return record
+
     def delete(self, force=False, dbcommit=False, delindex=False):
         """Delete record and persistent identifier."""
         can, _ = self.can_delete
         if can or force:
+            RecordCache.invalidate(self)
             if delindex:
                 self.delete_from_index()
             persistent_identifier = self.get_persistent_identifier(self.id)
@@ -457,6 +533,7 @@ class IlsRecord(Record):
         persistent_identifier = self.get_persistent_identifier(self.id)
         if persistent_identifier.is_deleted():
             raise IlsRecordError.Deleted()
+        RecordCache.invalidate(self)
         self = super().revert(revision_id=revision_id)
         if reindex:
             self.reindex(forceindex=False)
@@ -564,21 +641,164 @@ class IlsRecord(Record):
         return deepcopy(self.replace_refs())
 
 
+class RecordCache:
+    """Request or task scoped identity map of ILS records.
+
+    Into a record cache scope, the records of the configured types
+    (`RERO_ILS_RECORD_CACHE_PID_TYPES`) are loaded only once from the
+    database by `IlsRecord.get_record_by_pid` and `IlsRecord.get_record`.
+    Callers get a copy of the cached record, except if they ask for a
+    read only record: the cached instance is then returned. A cached record
+    is invalidated when it is committed, reverted or deleted.
+
+    A record cache scope is opened explicitly for a task::
+
+        with RecordCache():
+            for loan in loans:
+                loan.get_overdue_fees
+
+    or for each request if `RERO_ILS_RECORD_CACHE_PID_TYPES` is not empty.
+    """
+
+    def __init__(self, pid_types=None):
+        """Constructor.
+
+        :param pid_types: record types to cache, the configured ones if
+            `None`.
+        """
+        if pid_types is None:
+            pid_types = current_app.config.get("RERO_ILS_RECORD_CACHE_PID_TYPES", [])
+        self.pid_types = set(pid_types)
+        # cached records by pid type and pid or uuid
+        self.records = {}
+        self._token = None
+
+    def __enter__(self):
+        """Open a record cache scope (nested scopes use the outer one)."""
+        if cache := _record_cache.get():
+            return cache
+        self._token = _record_cache.set(self)
+        return self
+
+    def __exit__(self, *exc):
+        """Close the record cache scope."""
+        if self._token is not None:
+            _record_cache.reset(self._token)
+            self._token = None
+            self.records.clear()
+
+    @classmethod
+    def current(cls):
+        """Get the active record cache if any.
+
+        :returns: the record cache of the current scope or of the current
+            request, `None` otherwise.
+        """
+        if cache := _record_cache.get():
+            return cache
+        if has_request_context() and current_app.config.get(
+            "RERO_ILS_RECORD_CACHE_PID_TYPES"
+        ):
+            if "rero_ils_record_cache" not in g:
+                g.rero_ils_record_cache = cls()
+            return g.rero_ils_record_cache
+
+    @classmethod
+    def invalidate(cls, record):
+        """Remove a record from the active record cache.
+
+        :param record: the modified record.
+        """
+        if (cache := cls.current()) and record.provider:
+            pid_type = record.provider.pid_type
+            removed = cache.records.pop((pid_type, "pid", record.pid), None)
+            removed = cache.records.pop((pid_type, "id", str(record.id)), removed)
+            if removed is not None:
+                Metrics.incr("record_cache", "invalidated")
+
+    @staticmethod
+    def _copy(record):
+        """Get a copy of a record sharing the same database model."""
+        return record.__class__(deepcopy(dict(record)), model=record.model)
+
+    def get(self, record_cls, pid=None, id_=None, read_only=False):
+        """Get a record from the cache.
+
+        :param record_cls: the record class.
+        :param pid: the record pid.
+        :param id_: the record uuid.
+        :param read_only: return the cached instance instead of a copy.
+        :returns: the cached record or `None`.
+        """
+        if not record_cls.provider:
+            return None
+        pid_type = record_cls.provider.pid_type
+        if pid_type not in self.pid_types:
+            return None
+        key = (pid_type, "pid", pid) if pid else (pid_type, "id", str(id_))
+        record = self.records.get(key)
+        if record is None or type(record) is not record_cls:
+            Metrics.incr("record_cache", "miss")
+            return None
+        Metrics.incr("record_cache", "hit")
+        return record if read_only else self._copy(record)
+
+    def put(self, record, read_only=False):
+        """Store a record loaded from the database into the cache.
+
+        :param record: the loaded record.
+        :param read_only: the record is returned to a read only caller.
+        :returns: the record to return to the caller.
+        """
+        if not record.provider or record.provider.pid_type not in self.pid_types:
+            return record
+        pid_type = record.provider.pid_type
+        cached = record if read_only else self._copy(record)
+        self.records[(pid_type, "pid", record.pid)] = cached
+        self.records[(pid_type, "id", str(record.id))] = cached
+        return record
+
+
 class IlsRecordsIndexer(RecordIndexer):
     """Indexing class for ils."""
 
     record_cls = IlsRecord
+    #: Refresh policy for single record writes (see `REFRESH_POLICIES`).
+    #: `None` means the one defined in the configuration.
+    refresh_policy = None
+
+    def _refresh(self, record):
+        """Get the ES refresh argument for a single record write.
+
+        :param record: Record instance.
+        :returns: the value of the ES `refresh` parameter.
+        """
+        pid_type = getattr(getattr(record, "provider", None), "pid_type", None)
+        policy = get_refresh_policy(pid_type=pid_type, default=self.refresh_policy)
+        index = self.record_to_index(record)
+        if coordinator := ReindexCoordinator.current():
+            coordinator.touch(index)
+        return refresh_argument(index, policy)
 
     def index(self, record):
         """Indexing a record."""
-        return super().index(record, arguments=dict(refresh="true"))
+        return super().index(record, arguments=dict(refresh=self._refresh(record)))
 
     def delete(self, record):
         """Delete a record.
 
         :param record: Record instance.
         """
-        return super().delete(record, refresh="true")
+        return super().delete(record, refresh=self._refresh(record))
+
+    def reindex_parents(self, record):
+        """Reindex the records depending on the indexed record.
+
+        Override this method for records having parents containing some of
+        their data (ie: the document of a holding).
+
+        :param record: Record instance.
+        """
 
     def bulk_index(self, record_id_iterator, doc_type=None):
         """Bulk index records.
@@ -653,39 +873,124 @@ class IlsRecordsIndexer(RecordIndexer):
     def _actionsiter(self, message_iterator):
         """Iterate bulk actions.
 
+        Messages are consumed by chunks (see `RERO_ILS_INDEXER_BULK_CHUNK_SIZE`).
+        For each chunk, the records to index are loaded with one query by
+        record type and the indexer instances are reused.
+
         :param message_iterator: Iterator yielding messages from a queue.
         """
+        chunk_size = current_app.config.get("RERO_ILS_INDEXER_BULK_CHUNK_SIZE", 500)
+        indexers = {}
+        chunk = []
         for message in message_iterator:
-            payload = message.decode()
-            try:
-                indexer = self._get_record_class(payload).get_indexer_class()
-                if payload["op"] == "delete":
-                    yield indexer()._delete_action(payload=payload)
-                else:
-                    yield indexer()._index_action(payload=payload)
-                message.ack()
-            except NoResultFound:
-                message.reject()
-            except Exception:
-                message.reject()
-                current_app.logger.error(
-                    f"Failed to {payload['op']}"
-                    f" {payload.get('doc_type'), 'rec'} "
-                    f"{payload.get('pid')}:{payload.get('id')}",
-                    exc_info=True,
-                )
+            chunk.append(message)
+            if len(chunk) >= chunk_size:
+                yield from self._chunk_actionsiter(chunk, indexers)
+                chunk = []
+        if chunk:
+            yield from self._chunk_actionsiter(chunk, indexers)
+
+    def _chunk_actionsiter(self, messages, indexers):
+        """Iterate bulk actions of a chunk of messages.
+
+        :param messages: list of messages from a queue.
+        :param indexers: indexer instances cache by doc type.
+        """
+        payloads = [message.decode() for message in messages]
+        # load the records to index, grouped by doc type
+        ids_by_type = {}
+        for payload in payloads:
+            if payload["op"] != "delete":
+                doc_type = payload.get("doc_type", "rec")
+                ids_by_type.setdefault(doc_type, []).append(payload["id"])
+        records = {}
+        with ExitStack() as stack:
+            for doc_type, ids in ids_by_type.items():
+                try:
+                    indexer = self._get_chunk_indexer(doc_type, indexers)
+                    loaded = indexer.record_cls.get_records(ids)
+                    records.update({str(record.id): record for record in loaded})
+                    # allow the indexer to prefetch data for its dumpers
+                    stack.enter_context(indexer.prefetch(loaded))
+                except Exception:
+                    current_app.logger.error(
+                        f"Failed to load {len(ids)} {doc_type} records",
+                        exc_info=True,
+                    )
+            last_ops = {}
+            for message, payload in zip(messages, payloads):
+                # skip duplicated messages for the same record
+                if last_ops.get(payload["id"]) == payload["op"]:
+                    message.ack()
+                    continue
+                try:
+                    indexer = self._get_chunk_indexer(
+                        payload.get("doc_type", "rec"), indexers
+                    )
+                    if payload["op"] == "delete":
+                        yield indexer._delete_action(payload=payload)
+                    elif record := records.get(payload["id"]):
+                        yield indexer._index_action(payload=payload, record=record)
+                    else:
+                        raise NoResultFound()
+                    last_ops[payload["id"]] = payload["op"]
+                    message.ack()
+                except NoResultFound:
+                    message.reject()
+                except Exception:
+                    message.reject()
+                    current_app.logger.error(
+                        f"Failed to {payload['op']}"
+                        f" {payload.get('doc_type', 'rec')} "
+                        f"{payload.get('pid')}:{payload.get('id')}",
+                        exc_info=True,
+                    )
+
+    def _get_chunk_indexer(self, doc_type, indexers):
+        """Get the indexer instance for a doc type.
+
+        :param doc_type: the doc type of the queue message.
+        :param indexers: indexer instances cache by doc type.
+        :returns: the indexer instance.
+        """
+        if doc_type not in indexers:
+            record_cls = self._get_record_class({"doc_type": doc_type})
+            indexers[doc_type] = record_cls.get_indexer_class()()
+        return indexers[doc_type]
+
+    def prefetch(self, records):
+        """Prefetch data needed to index a batch of records.
 
-    def _index_action(self, payload):
+        Override this method to load, in one time, data used by the dumpers
+        or by the listeners of the given records.
+
+        :param records: list of records which will be indexed.
+        :returns: a context manager, the prefetched data are available into
+            its block.
+        """
+        return nullcontext()
+
+    def _index_action(self, payload, record=None):
         """Bulk index action.
 
         :param payload: Decoded message body.
+        :param record: the already loaded record, loaded from the payload
+            if `None`.
         :return: Dictionary defining an Elasticsearch bulk 'index' action.
         """
-        record = self.record_cls.get_record(payload["id"])
-        index = self.record_to_index(record)
+        record = record or self.record_cls.get_record(payload["id"])
+        return self._record_index_action(record, index=payload.get("index"))
 
+    def _record_index_action(self, record, index=None):
+        """Bulk index action for an already loaded record.
+
+        :param record: Record instance.
+        :param index: The Elasticsearch index, computed from the record
+            if `None`.
+        :return: Dictionary defining an Elasticsearch bulk 'index' action.
+        """
         arguments = {}
-        index = payload.get("index") or index
+        index = index or self.record_to_index(record)
         body = self._prepare_record(record, index, arguments)
         action = {
             "_op_type": "index",
@@ -766,3 +1071,192 @@ class ReferencedRecordsIndexer:
                     f'Record indexing error {r["pid_type"]} '
                     f'{r["record"]["pid"]}: {str(err)}'
                 )
+
+
+class ReindexCoordinator:
+    """Coalesce the reindexing of dependent records.
+
+    Indexing an item reindexes its holding, and indexing a holding reindexes
+    its document. Within a coordinator scope, these dependent records are
+    only collected and deduplicated. They are indexed once, in dependency
+    order, when the scope is closed: one bulk request by record type.
+
+    A coordinator scope is opened explicitly for a task::
+
+        with ReindexCoordinator():
+            for item in items:
+                item.reindex()
+
+    or for each API request if `RERO_ILS_INDEXER_COALESCE_REINDEX` is set.
+    """
+
+    #: indexing order of the record types, other types are indexed last.
+    order = ["item", "hold", "doc"]
+
+    def __init__(self):
+        """Constructor."""
+        # pids to reindex by pid type
+        self.dirty = {}
+        # indices written into the coordinator scope
+        self.touched_indices = set()
+        self._token = None
+
+    def __enter__(self):
+        """Open a coordinator scope (nested scopes use the outer one)."""
+        if coordinator := _reindex_coordinator.get():
+            return coordinator
+        self._token = _reindex_coordinator.set(self)
+        return self
+
+    def __exit__(self, *exc):
+        """Close the coordinator scope and flush the collected records."""
+        if self._token is None:
+            return
+        try:
+            self.flush()
+        finally:
+            _reindex_coordinator.reset(self._token)
+            self._token = None
+
+    @classmethod
+    def current(cls):
+        """Get the active coordinator if any.
+
+        :returns: the coordinator of the current scope or of the current
+            request, `None` otherwise.
+        """
+        if coordinator := _reindex_coordinator.get():
+            return coordinator
+        if has_request_context() and current_app.config.get(
+            "RERO_ILS_INDEXER_COALESCE_REINDEX"
+        ):
+            if "rero_ils_reindex_coordinator" not in g:
+                g.rero_ils_reindex_coordinator = cls()
+            return g.rero_ils_reindex_coordinator
+
+    @classmethod
+    def reindex(cls, record):
+        """Reindex a record or schedule it if a coordinator is active.
+
+        :param record: Record instance.
+        """
+        if coordinator := cls.current():
+            coordinator.add(record)
+        else:
+            record.reindex()
+
+    @classmethod
+    def flush_request(cls, exception=None):
+        """Flush the request coordinator.
+
+        Registered as a request teardown.
+
+        :param exception: the exception raised by the request if any.
+        """
+        if coordinator := g.get("rero_ils_reindex_coordinator"):
+            # the coordinator stays the request one until the end of the
+            # flush: the parents scheduled by the flush are indexed by it.
+            try:
+                coordinator.flush()
+            except Exception as err:
+                current_app.logger.error(f"Reindex coordinator error: {err}")
+            finally:
+                g.pop("rero_ils_reindex_coordinator", None)
+
+    def add(self, record):
+        """Schedule the reindexing of a record.
+
+        :param record: Record instance.
+        """
+        self.add_pids(record.provider.pid_type, [record.pid])
+
+    def add_pids(self, pid_type, pids):
+        """Schedule the reindexing of records by pid.
+
+        :param pid_type: the record type.
+        :param pids: the record pids.
+        """
+        scheduled = self.dirty.setdefault(pid_type, {})
+        for pid in pids:
+            scheduled[pid] = None
+            Metrics.incr("reindex_coordinator", "scheduled")
+
+    def touch(self, index):
+        """Register an index written into the coordinator scope.
+
+        :param index: the index name.
+        """
+        self.touched_indices.add(index)
+
+    def _next_pid_type(self):
+        """Get the next record type to index in dependency order."""
+        return min(
+            self.dirty,
+            key=lambda pid_type: (
+                self.order.index(pid_type)
+                if pid_type in self.order
+                else len(self.order)
+            ),
+        )
+
+    def _refresh_touched_indices(self):
+        """Make the previous writes visible for the indexer dumpers."""
+        if self.touched_indices:
+            current_search_client.indices.refresh(
+                index=",".join(
+                    build_alias_name(index) for index in sorted(self.touched_indices)
+                )
+            )
+            self.touched_indices.clear()
+
+    def flush(self):
+        """Index all scheduled records in dependency order."""
+        from .utils import get_record_class_from_schema_or_pid_type
+
+        processed = set()
+        while self.dirty:
+            pid_type = self._next_pid_type()
+            pids = [
+                pid
+                for pid in self.dirty.pop(pid_type)
+                if (pid_type, pid) not in processed
+            ]
+            processed.update((pid_type, pid) for pid in pids)
+            # the dumpers of the parent records are reading their children
+            # from the index.
+            self._refresh_touched_indices()
+            record_cls = get_record_class_from_schema_or_pid_type(pid_type=pid_type)
+            indexer = record_cls.get_indexer_class()()
+            actions = []
+            records = list(record_cls.get_records_by_pids(pids))
+            with indexer.prefetch(records):
+                for record in records:
+                    action = indexer._record_index_action(record)
+                    actions.append(action)
+                    self.touched_indices.add(action["_index"])
+                    # parents are scheduled into this coordinator
+                    indexer.reindex_parents(record)
+            if not actions:
+                continue
+            refresh = "false"
+            if not self.dirty:
+                refresh = refresh_argument(
+                    actions[0]["_index"],
+                    get_refresh_policy(
+                        pid_type=pid_type, default=indexer.refresh_policy
+                    ),
+                )
+            success, errors = bulk(
+                current_search_client,
+                actions,
+                stats_only=True,
+                raise_on_error=False,
+                refresh=refresh,
+                request_timeout=current_app.config["INDEXER_BULK_REQUEST_TIMEOUT"],
+            )
+            Metrics.incr("reindex_coordinator", "indexed", success)
+            if errors:
+                current_app.logger.error(
+                    f"Reindex coordinator: {errors} {pid_type} indexing errors"
+                )
+        self.touched_indices.clear()
@@ -24,11 +24,14 @@ import sys
 from functools import partial
 
 from elasticsearch_dsl import Q
+from flask import current_app
+from invenio_cache import current_cache
 
 from rero_ils.modules.api import IlsRecord, IlsRecordsIndexer, IlsRecordsSearch
 from rero_ils.modules.fetchers import id_fetcher
 from rero_ils.modules.libraries.api import Library
 from rero_ils.modules.minters import id_minter
+from rero_ils.modules.monitoring.metrics import Metrics
 from rero_ils.modules.providers import Provider
 from rero_ils.modules.utils import extracted_data_from_ref, get_patron_from_arguments
 
@@ -37,6 +40,7 @@ from .models import CircPolicyIdentifier, CircPolicyMetadata
 
 DUE_SOON_REMINDER_TYPE = "due_soon"
 OVERDUE_REMINDER_TYPE = "overdue"
+CIRC_POLICIES_MATRIX_CACHE_PREFIX = "circ_policies_matrix:"
 
 # cipo provider
 CircPolicyProvider = type(
@@ -186,6 +190,23 @@ class CircPolicy(IlsRecord):
         # is only one default policy by organisation
         return super().create(data, id_, delete_pid, dbcommit, reindex, **kwargs)
 
+    def dbcommit(self, reindex=False, forceindex=False):
+        """Commit changes to db.
+
+        The resolution table is invalidated once the changes are committed,
+        a table built meanwhile by a concurrent request could be stale.
+        """
+        super().dbcommit(reindex=reindex, forceindex=forceindex)
+        self.invalidate_circ_policies_matrix(self.organisation_pid)
+        return self
+
+    def delete(self, force=False, dbcommit=False, delindex=False):
+        """Delete record and persistent identifier."""
+        return_value = super().delete(force=force, dbcommit=dbcommit, delindex=delindex)
+        if dbcommit:
+            self.invalidate_circ_policies_matrix(self.organisation_pid)
+        return return_value
+
     @classmethod
     def exist_name_and_organisation_pid(cls, name, organisation_pid):
         """Check if the policy name is unique on organisation.
@@ -294,18 +315,109 @@ class CircPolicy(IlsRecord):
         except StopIteration:
             return None
 
+    @classmethod
+    def _build_circ_policies_matrix(cls, organisation_pid):
+        """Build the circulation policies resolution table of an organisation.
+
+        The table contains the policy pid to use for each library/patron
+        type/item type combination ("LPI" policies), for each patron
+        type/item type combination ("OPI" policies) and the default policy.
+        It is built from the database: unlike the index, it is up to date as
+        soon as the changes are committed.
+
+        :param organisation_pid: the organisation pid.
+        :return the resolution table.
+        """
+        matrix = {"lpi": {}, "opi": {}, "default": None}
+        organisation_ref = CircPolicyMetadata.json["organisation"]["$ref"]
+        query = (
+            CircPolicyMetadata.query.filter(CircPolicyMetadata.is_deleted.is_(False))
+            .filter(organisation_ref.as_string().like(f"%/{organisation_pid}"))
+            .with_entities(CircPolicyMetadata.json)
+            .order_by(CircPolicyMetadata.created)
+        )
+        for (data,) in query:
+            pid = data["pid"]
+            if data.get("is_default") and not matrix["default"]:
+                matrix["default"] = pid
+            settings = [
+                (
+                    extracted_data_from_ref(setting["patron_type"]),
+                    extracted_data_from_ref(setting["item_type"]),
+                )
+                for setting in data.get("settings", [])
+            ]
+            library_level = data.get("policy_library_level")
+            if library_level is True:
+                for library in data.get("libraries", []):
+                    library_pid = extracted_data_from_ref(library)
+                    for patron_type_pid, item_type_pid in settings:
+                        key = (library_pid, patron_type_pid, item_type_pid)
+                        matrix["lpi"].setdefault(key, pid)
+            elif library_level is False:
+                for key in settings:
+                    matrix["opi"].setdefault(key, pid)
+        return matrix
+
+    @classmethod
+    def get_circ_policies_matrix(cls, organisation_pid):
+        """Get the circulation policies resolution table of an organisation.
+
+        The table is built lazily and stored into the application cache.
+
+        :param organisation_pid: the organisation pid.
+        :return the resolution table.
+        """
+        key = f"{CIRC_POLICIES_MATRIX_CACHE_PREFIX}{organisation_pid}"
+        if (matrix := current_cache.get(key)) is None:
+            Metrics.incr("circ_policies_matrix", "miss")
+            matrix = cls._build_circ_policies_matrix(organisation_pid)
+            current_cache.set(
+                key,
+                matrix,
+                timeout=current_app.config.get(
+                    "RERO_ILS_CIRC_POLICIES_CACHE_TIMEOUT", 0
+                ),
+            )
+        else:
+            Metrics.incr("circ_policies_matrix", "hit")
+        return matrix
+
+    @classmethod
+    def invalidate_circ_policies_matrix(cls, organisation_pid):
+        """Remove the resolution table of an organisation from the cache.
+
+        :param organisation_pid: the organisation pid.
+        """
+        current_cache.delete(f"{CIRC_POLICIES_MATRIX_CACHE_PREFIX}{organisation_pid}")
+
     @classmethod
     def provide_circ_policy(
         cls, organisation_pid, library_pid, patron_type_pid, item_type_pid
     ):
         """Return a circ policy for library/patron/item.
 
+        The policy is resolved with the cached resolution table. If the table
+        doesn't give an existing policy (ie: a stale table), the table is
+        invalidated and the policy is resolved with the search queries.
+
         :param organisation_pid: the organisation_pid.
         :param library_pid: the library pid.
         :param patron_type_pid: the patron type_pid.
         :param item_type_pid: the item_type pid.
         :return the best circulation policy corresponding to criteria.
         """
+        matrix = cls.get_circ_policies_matrix(organisation_pid)
+        pid = (
+            matrix["lpi"].get((library_pid, patron_type_pid, item_type_pid))
+            or matrix["opi"].get((patron_type_pid, item_type_pid))
+            or matrix["default"]
+        )
+        if pid and (policy := CircPolicy.get_record_by_pid(pid)):
+            return policy
+
+        Metrics.incr("circ_policies_matrix", "stale")
+        cls.invalidate_circ_policies_matrix(organisation_pid)
         if LPI_policy := CircPolicy.get_circ_policy_by_LPI(
             organisation_pid, library_pid, patron_type_pid, item_type_pid
         ):
@@ -483,9 +595,37 @@ class CircPoliciesIndexer(IlsRecordsIndexer):
 
     record_cls = CircPolicy
 
+    def index(self, record):
+        """Index a circulation policy.
+
+        :param record: Record instance.
+        """
+        return_value = super().index(record)
+        # the REST API commits the changes without `dbcommit`
+        CircPolicy.invalidate_circ_policies_matrix(record.organisation_pid)
+        return return_value
+
+    def delete(self, record):
+        """Delete a circulation policy from the index.
+
+        :param record: Record instance.
+        """
+        return_value = super().delete(record)
+        CircPolicy.invalidate_circ_policies_matrix(record.organisation_pid)
+        return return_value
+
     def bulk_index(self, record_id_iterator):
         """Bulk index records.
 
         :param record_id_iterator: Iterator yielding record UUIDs.
         """
-        super().bulk_index(record_id_iterator, doc_type="cipo")
+        record_ids = list(record_id_iterator)
+        super().bulk_index(record_ids, doc_type="cipo")
+        query = CircPolicyMetadata.query.filter(
+            CircPolicyMetadata.id.in_(record_ids)
+        ).with_entities(CircPolicyMetadata.json)
+        organisation_pids = {
+            extracted_data_from_ref(data["organisation"]) for (data,) in query if data
+        }
+        for organisation_pid in organisation_pids:
+            CircPolicy.invalidate_circ_policies_matrix(organisation_pid)
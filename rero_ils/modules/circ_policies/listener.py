@@ -0,0 +1,41 @@
+# -*- coding: utf-8 -*-
+#
+# RERO ILS
+# Copyright (C) 2019-2024 RERO
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, version 3 of the License.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+"""Signals connector for circulation policies."""
+
+from rero_ils.modules.item_types.api import ItemType
+from rero_ils.modules.libraries.api import Library
+from rero_ils.modules.patron_types.api import PatronType
+
+from .api import CircPolicy
+
+
+def invalidate_circ_policies_matrix(sender, record=None, *args, **kwargs):
+    """Invalidate the circulation policies resolution table.
+
+    The table of the record organisation is invalidated when a record used
+    to resolve the circulation policies is created, updated or deleted.
+    This method should be connected with 'after_record_insert',
+    'after_record_update' and 'after_record_delete'. As these signals are
+    sent before the changes are committed, the circulation policies are
+    also invalidated once committed (see `CircPolicy.dbcommit`).
+
+    :param record: the created/updated/deleted record.
+    """
+    if isinstance(record, (CircPolicy, PatronType, ItemType, Library)):
+        if organisation_pid := record.organisation_pid:
+            CircPolicy.invalidate_circ_policies_matrix(organisation_pid)
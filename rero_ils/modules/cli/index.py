@@ -21,7 +21,9 @@
 from __future__ import absolute_import, print_function
 
 import json
+import multiprocessing
 import sys
+import time
 
 import click
 import dateparser
@@ -62,6 +64,97 @@ def connect_queue(connection, name):
     return queue(connection)
 
 
+def bulk_queue_worker(
+    worker,
+    version_type,
+    queue,
+    chunk_size,
+    max_chunk_bytes,
+    raise_on_error,
+    stats_only=True,
+):
+    """Process the bulk indexing queue into a dedicated process.
+
+    Each worker creates its own application, so it has its own database
+    session and Elasticsearch client. The workers are competing consumers
+    of the same queue: each message is processed by only one worker.
+
+    :param worker: worker number.
+    :param version_type: Elasticsearch version type.
+    :param queue: Name of the queue to process, the default one if `None`.
+    :param chunk_size: Number of messages/actions by bulk request.
+    :param max_chunk_bytes: Maximum size of a bulk request in bytes.
+    :param raise_on_error: raise an exception on Elasticsearch errors.
+    :param stats_only: if `False` also report the failed error responses.
+    :returns: a dictionary with the worker statistics.
+    """
+    from invenio_app.factory import create_api
+
+    app = create_api()
+    result = {
+        "worker": worker,
+        "indexed": 0,
+        "errors": 0,
+        "failed": [],
+        "exception": None,
+    }
+    start_time = time.monotonic()
+    with app.app_context():
+        if chunk_size:
+            app.config["RERO_ILS_INDEXER_BULK_CHUNK_SIZE"] = chunk_size
+        connected_queue = None
+        if queue:
+            connection = current_app.extensions["invenio-celery"].celery.connection()
+            connected_queue = connect_queue(connection, queue)
+        indexer = IlsRecordsIndexer(
+            version_type=version_type, queue=connected_queue, routing_key=queue
+        )
+        search_bulk_kwargs = {"raise_on_error": raise_on_error}
+        if chunk_size:
+            search_bulk_kwargs["chunk_size"] = chunk_size
+        if max_chunk_bytes:
+            search_bulk_kwargs["max_chunk_bytes"] = max_chunk_bytes
+        try:
+            _, (result["indexed"], errors) = indexer.process_bulk_queue(
+                search_bulk_kwargs=search_bulk_kwargs, stats_only=stats_only
+            )
+            if stats_only:
+                result["errors"] = errors
+            else:
+                result["errors"] = len(errors)
+                result["failed"] = errors
+        except Exception as err:
+            result["exception"] = str(err)
+    result["time"] = time.monotonic() - start_time
+    return result
+
+
+def run_bulk_queue_workers(processes, **kwargs):
+    """Process the bulk indexing queue with several processes.
+
+    :param processes: number of worker processes.
+    :param kwargs: worker parameters, see `bulk_queue_worker`.
+    :returns: the list of the worker statistics.
+    """
+    ctx = multiprocessing.get_context("spawn")
+    with ctx.Pool(processes) as pool:
+        return pool.starmap(
+            bulk_queue_worker,
+            [
+                (
+                    worker,
+                    kwargs.get("version_type"),
+                    kwargs.get("queue"),
+                    kwargs.get("chunk_size"),
+                    kwargs.get("max_chunk_bytes"),
+                    kwargs.get("raise_on_error", True),
+                    kwargs.get("stats_only", True),
+                )
+                for worker in range(processes)
+            ],
+        )
+
+
 @click.group()
 def index():
     """Index management commands."""
@@ -95,12 +188,76 @@ def index():
     default=True,
     help="Controls if ES bulk indexing errors raise an exception.",
 )
+@click.option(
+    "--processes",
+    "-p",
+    default=1,
+    type=int,
+    help="Number of local processes consuming the queue.",
+)
+@click.option(
+    "--chunk-size",
+    type=int,
+    default=None,
+    help="Number of records by bulk request.",
+)
+@click.option(
+    "--max-chunk-bytes",
+    type=int,
+    default=None,
+    help="Maximum size in bytes of a bulk request.",
+)
 @with_appcontext
 def run(
-    delayed, concurrency, with_stats, version_type=None, queue=None, raise_on_error=True
+    delayed,
+    concurrency,
+    with_stats,
+    version_type=None,
+    queue=None,
+    raise_on_error=True,
+    processes=1,
+    chunk_size=None,
+    max_chunk_bytes=None,
 ):
     """Run bulk record indexing."""
-    if delayed:
+    if not delayed and processes > 1:
+        click.secho(
+            f"Indexing records with {processes} processes " f"({queue})...",
+            fg="green",
+        )
+        results = run_bulk_queue_workers(
+            processes,
+            version_type=version_type,
+            queue=queue,
+            chunk_size=chunk_size,
+            max_chunk_bytes=max_chunk_bytes,
+            raise_on_error=raise_on_error,
+            stats_only=not with_stats,
+        )
+        total_indexed = total_errors = 0
+        total_time = max(result["time"] for result in results)
+        for result in results:
+            total_indexed += result["indexed"]
+            total_errors += result["errors"]
+            rate = result["indexed"] / result["time"] if result["time"] else 0
+            msg = (
+                f'worker {result["worker"]}: indexed: {result["indexed"]} '
+                f'error: {result["errors"]} time: {result["time"]:.1f}s '
+                f"({rate:.1f} records/s)"
+            )
+            if result["exception"]:
+                click.secho(f'{msg} exception: {result["exception"]}', fg="red")
+            else:
+                click.secho(msg, fg="yellow")
+            for failed in result.get("failed", []):
+                click.secho(f"  {failed}", fg="red")
+        rate = total_indexed / total_time if total_time else 0
+        click.secho(
+            f"indexed: {total_indexed} error: {total_errors} "
+            f"time: {total_time:.1f}s ({rate:.1f} records/s)",
+            fg="green",
+        )
+    elif delayed:
         click.secho(
             f"Starting {concurrency} tasks for indexing records " f"({queue})...",
             fg="green",
@@ -131,8 +288,14 @@ def run(
             queue=connected_queue,
             routing_key=queue,
         )
+        search_bulk_kwargs = {"raise_on_error": raise_on_error}
+        if chunk_size:
+            current_app.config["RERO_ILS_INDEXER_BULK_CHUNK_SIZE"] = chunk_size
+            search_bulk_kwargs["chunk_size"] = chunk_size
+        if max_chunk_bytes:
+            search_bulk_kwargs["max_chunk_bytes"] = max_chunk_bytes
         name, count = indexer.process_bulk_queue(
-            search_bulk_kwargs={"raise_on_error": raise_on_error},
+            search_bulk_kwargs=search_bulk_kwargs,
             stats_only=(not with_stats),
         )
         click.secho(f'"{name}" indexed: {count[0]} error: {count[1]}', fg="yellow")
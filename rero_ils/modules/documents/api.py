@@ -42,6 +42,7 @@ from rero_ils.modules.providers import Provider
 from rero_ils.modules.utils import sorted_pids
 
 from .dumpers import document_indexer_dumper, document_replace_refs_dumper
+from .dumpers.indexer import IndexerDumper
 from .extensions import (
     AddMEFPidExtension,
     EditionStatementExtension,
@@ -590,6 +591,15 @@ class DocumentsIndexer(IlsRecordsIndexer):
 
         return return_value
 
+    def prefetch(self, records):
+        """Prefetch the holdings and items of the documents to index.
+
+        :param records: list of documents which will be indexed.
+        :returns: a context manager, the prefetched data are available into
+            its block.
+        """
+        return IndexerDumper.prefetch_holdings([record.pid for record in records])
+
     def bulk_index(self, record_id_iterator):
         """Bulk index records.
 
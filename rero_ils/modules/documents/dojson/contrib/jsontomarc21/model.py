@@ -17,8 +17,11 @@
 
 """RERO-ILS to MARC21 model definition."""
 
+from collections import defaultdict
+
 from dojson import utils
 from dojson.contrib.to_marc21.model import Underdo
+from elasticsearch_dsl import Q
 from flask import current_app
 from flask_babel import gettext as translate
 
@@ -31,11 +34,11 @@ from rero_ils.modules.entities.remote_entities.api import (
     RemoteEntitiesSearch,
     RemoteEntity,
 )
-from rero_ils.modules.holdings.api import Holding, HoldingsSearch
-from rero_ils.modules.items.api import Item, ItemsSearch
-from rero_ils.modules.libraries.api import Library
-from rero_ils.modules.locations.api import Location
-from rero_ils.modules.organisations.api import Organisation
+from rero_ils.modules.holdings.api import HoldingsSearch
+from rero_ils.modules.items.api import ItemsSearch
+from rero_ils.modules.libraries.api import LibrariesSearch
+from rero_ils.modules.locations.api import LocationsSearch
+from rero_ils.modules.organisations.api import OrganisationsSearch
 from rero_ils.modules.utils import date_string_to_utc
 
 
@@ -205,89 +208,119 @@ def do_concept(entity, source_order):
     return result
 
 
-def get_holdings_items(
-    document_pid, organisation_pids=None, library_pids=None, location_pids=None
-):
-    """Create Holding and Item informations.
-
-    :param document_pid: document pid to use for holdings search
-    :param organisation_pids: Which organisations items to add.
-    :param library_pids: Which from libraries items to add.
-    :param location_pids: Which from locations items to add.
+class HoldingsItemsContext:
+    """Holdings and items of a set of documents.
 
-    :returns: list of holding informations with associated organisation,
-              library and location pid, name informations.
+    The holdings, items, organisations, libraries and locations of all the
+    documents (ie: a chunk of exported documents) are loaded with one scan by
+    resource, then the holding and item informations of each document are
+    built from the memory.
     """
 
-    def get_name(resource, pid):
-        """Get name from resource.
+    def __init__(
+        self,
+        document_pids,
+        organisation_pids=None,
+        library_pids=None,
+        location_pids=None,
+    ):
+        """Initialization method.
 
-        The name will be cached.
-        :param resource: Resource class to use.
-        :param pid: Pid for the resource to get the name from.
-        :returns: name from the resource
+        :param document_pids: the document pids to load.
+        :param organisation_pids: Which organisations items to add.
+        :param library_pids: Which from libraries items to add.
+        :param location_pids: Which from locations items to add.
         """
-        data = resource.get_record_by_pid(pid)
-        if data:
-            return data.get("name")
-
-    results = []
-    if document_pid:
-        holding_pids = Holding.get_holdings_pid_by_document_pid(
-            document_pid=document_pid, with_masked=False
+        # holdings by document pid
+        self.holdings = defaultdict(list)
+        # items by holding pid
+        self.items = defaultdict(list)
+        # names by resource type and pid
+        self.names = defaultdict(dict)
+        if document_pids := list(filter(None, document_pids)):
+            self._load(document_pids, organisation_pids, library_pids, location_pids)
+
+    def _load(self, document_pids, organisation_pids, library_pids, location_pids):
+        """Load the holdings, items and names of the documents.
+
+        :param document_pids: the document pids to load.
+        :param organisation_pids: Which organisations items to add.
+        :param library_pids: Which from libraries items to add.
+        :param location_pids: Which from locations items to add.
+        """
+        masked = Q("term", _masked=True)
+        query = (
+            HoldingsSearch()
+            .filter("terms", document__pid=document_pids)
+            .filter("bool", must_not=[masked])
         )
-
-        holding_pids = list(holding_pids)
-        organisations = {}
-        libraries = {}
-        locations = {}
-        query = HoldingsSearch().filter("terms", pid=holding_pids)
         if organisation_pids:
             query = query.filter({"terms": {"organisation.pid": organisation_pids}})
         if library_pids:
             query = query.filter({"terms": {"library.pid": library_pids}})
         if location_pids:
             query = query.filter({"terms": {"location.pid": location_pids}})
+        standard_holding_pids = []
+        name_pids = defaultdict(set)
         for hit in query.scan():
-            holding = hit.to_dict()
-            organisation_pid = hit.organisation.pid
-            if organisation_pid not in organisations:
-                organisations[organisation_pid] = get_name(
-                    Organisation, organisation_pid
-                )
-            library_pid = hit.library.pid
-            if library_pid not in libraries:
-                libraries[library_pid] = get_name(Library, library_pid)
-            location_pid = hit.location.pid
-            if location_pid not in locations:
-                locations[location_pid] = get_name(Location, location_pid)
-
-            result = {
-                "organisation": {
-                    "pid": organisation_pid,
-                    "name": organisations[organisation_pid],
-                },
-                "library": {"pid": library_pid, "name": libraries[library_pid]},
-                "location": {"pid": location_pid, "name": locations[location_pid]},
-                "holdings": {
-                    "call_number": holding.get("call_number"),
-                    "second_call_number": holding.get("second_call_number"),
-                    "enumerationAndChronology": holding.get("enumerationAndChronology"),
-                    "electronic_location": holding.get("electronic_location", []),
-                    "notes": holding.get("notes", []),
-                    "supplementaryContent": holding.get("supplementaryContent"),
-                    "index": holding.get("index"),
-                    "missing_issues": holding.get("missing_issues"),
-                },
-            }
+            self.holdings[hit.document.pid].append(hit.to_dict())
             if hit.holdings_type == "standard":
-                item_pids = Item.get_items_pid_by_holding_pid(
-                    hit.pid, with_masked=False
-                )
-                item_hits = ItemsSearch().filter("terms", pid=list(item_pids)).scan()
-                for item_hit in item_hits:
-                    item_data = item_hit.to_dict()
-                    item_result = result
+                standard_holding_pids.append(hit.pid)
+            name_pids["organisation"].add(hit.organisation.pid)
+            name_pids["library"].add(hit.library.pid)
+            name_pids["location"].add(hit.location.pid)
+
+        if standard_holding_pids:
+            query = (
+                ItemsSearch()
+                .filter("terms", holding__pid=standard_holding_pids)
+                .filter("bool", must_not=[masked])
+            )
+            for hit in query.scan():
+                self.items[hit.holding.pid].append(hit.to_dict())
+
+        for resource_type, search_class in [
+            ("organisation", OrganisationsSearch),
+            ("library", LibrariesSearch),
+            ("location", LocationsSearch),
+        ]:
+            query = (
+                search_class()
+                .filter("terms", pid=list(name_pids[resource_type]))
+                .source(["pid", "name"])
+            )
+            for hit in query.scan():
+                self.names[resource_type][hit.pid] = hit.name
+
+    def get_holdings_items(self, document_pid):
+        """Create Holding and Item informations of a document.
+
+        :param document_pid: document pid to use.
+        :returns: list of holding informations with associated organisation,
+                  library and location pid, name informations.
+        """
+        results = []
+        for holding in self.holdings.get(document_pid, []):
+            result = {}
+            for resource_type in ["organisation", "library", "location"]:
+                pid = holding[resource_type]["pid"]
+                result[resource_type] = {
+                    "pid": pid,
+                    "name": self.names[resource_type].get(pid),
+                }
+            result["holdings"] = {
+                "call_number": holding.get("call_number"),
+                "second_call_number": holding.get("second_call_number"),
+                "enumerationAndChronology": holding.get("enumerationAndChronology"),
+                "electronic_location": holding.get("electronic_location", []),
+                "notes": holding.get("notes", []),
+                "supplementaryContent": holding.get("supplementaryContent"),
+                "index": holding.get("index"),
+                "missing_issues": holding.get("missing_issues"),
+            }
+            if holding.get("holdings_type") == "standard":
+                for item_data in self.items.get(holding["pid"], []):
+                    item_result = dict(result)
                     item_result["item"] = {
                         "barcode": item_data.get("barcode"),
                         "all_number": item_data.get("all_number"),
@@ -301,7 +334,38 @@ def get_holdings_items(
                     results.append(item_result)
             else:
                 results.append(result)
-    return results
+        return results
+
+
+def get_holdings_items(
+    document_pid,
+    organisation_pids=None,
+    library_pids=None,
+    location_pids=None,
+    context=None,
+):
+    """Create Holding and Item informations.
+
+    :param document_pid: document pid to use for holdings search
+    :param organisation_pids: Which organisations items to add.
+    :param library_pids: Which from libraries items to add.
+    :param location_pids: Which from locations items to add.
+    :param context: the `HoldingsItemsContext` containing the document, the
+        holdings and items are loaded for this document only if `None`.
+
+    :returns: list of holding informations with associated organisation,
+              library and location pid, name informations.
+    """
+    if not document_pid:
+        return []
+    if context is None:
+        context = HoldingsItemsContext(
+            [document_pid],
+            organisation_pids=organisation_pids,
+            library_pids=library_pids,
+            location_pids=location_pids,
+        )
+    return context.get_holdings_items(document_pid)
 
 
 ORDER = [
@@ -338,6 +402,7 @@ class ToMarc21Overdo(Underdo):
         organisation_pids=None,
         library_pids=None,
         location_pids=None,
+        holdings_items_context=None,
     ):
         """Translate blob values and instantiate new model instance.
 
@@ -357,6 +422,8 @@ class ToMarc21Overdo(Underdo):
         :param organisation_pids: Which organisations items to add.
         :param library_pids: Which libraries items to add.
         :param location_pids: Which locations items to add.):
+        :param holdings_items_context: the prefetched `HoldingsItemsContext`
+                                       of the documents to transform.
         :param language: Language to use.
         """
         # TODO: real leader
@@ -416,12 +483,12 @@ class ToMarc21Overdo(Underdo):
 
         if with_holdings_items:
             # add holdings items informations
-            get_holdings_items
             blob["holdings_items"] = get_holdings_items(
                 document_pid=blob.get("pid"),
                 organisation_pids=organisation_pids,
                 library_pids=library_pids,
                 location_pids=location_pids,
+                context=holdings_items_context,
             )
 
         # Physical Description
@@ -18,6 +18,10 @@
 
 """Indexing dumper."""
 
+from collections import defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar
+
 from flask import current_app
 from invenio_records.dumpers import Dumper
 
@@ -27,23 +31,121 @@ from rero_ils.modules.utils import extracted_data_from_ref
 from ..extensions import TitleExtension
 from ..utils import process_i18n_literal_fields
 
+# holdings fields copied as is into the document holdings
+HOLDINGS_ADDITIONAL_FIELDS = [
+    "call_number",
+    "second_call_number",
+    "index",
+    "enumerationAndChronology",
+    "supplementaryContent",
+    "local_fields",
+]
+# holdings and items fields used to build the document holdings
+HOLDING_FIELDS = [
+    "pid",
+    "document",
+    "location",
+    "circulation_category",
+    "organisation",
+    "library",
+    "holdings_type",
+    "notes",
+    *HOLDINGS_ADDITIONAL_FIELDS,
+]
+ITEM_FIELDS = [
+    "pid",
+    "holding",
+    "barcode",
+    "status",
+    "local_fields",
+    "call_number",
+    "second_call_number",
+    "temporary_item_type",
+    "acquisition_date",
+    "notes",
+]
+
+_prefetched_holdings = ContextVar("prefetched_holdings", default=None)
+
 
 class IndexerDumper(Dumper):
     """Document indexer."""
 
     @staticmethod
-    def _process_holdings(record, data):
-        """Add holding information to the indexed record."""
+    def search_holdings(document_pids):
+        """Get the holdings and items of documents from the index.
+
+        The holdings and the items of all given documents are retrieved with
+        only one scan each, the items are grouped by holding pid.
+
+        :param document_pids: list of document pids.
+        :returns: a dictionary with the list of `(holding, items)` tuples by
+            document pid.
+        """
         from rero_ils.modules.holdings.api import HoldingsSearch
         from rero_ils.modules.items.api.api import ItemsSearch
-        from rero_ils.modules.items.models import ItemNoteTypes
 
-        holdings = []
-        es_holdings = (
-            HoldingsSearch().filter("term", document__pid=record["pid"]).source().scan()
+        result = {pid: [] for pid in document_pids}
+        holdings = list(
+            HoldingsSearch()
+            .filter("terms", document__pid=list(document_pids))
+            .source(HOLDING_FIELDS)
+            .scan()
         )
-        for holding in es_holdings:
+        if not holdings:
+            return result
+        items = defaultdict(list)
+        es_items = (
+            ItemsSearch()
+            .filter("terms", holding__pid=[hit.pid for hit in holdings])
+            .source(ITEM_FIELDS)
+            .scan()
+        )
+        for item in es_items:
+            item = item.to_dict()
+            items[item["holding"]["pid"]].append(item)
+        for holding in holdings:
             holding = holding.to_dict()
+            result.setdefault(holding["document"]["pid"], []).append(
+                (holding, items.get(holding["pid"], []))
+            )
+        return result
+
+    @classmethod
+    @contextmanager
+    def prefetch_holdings(cls, document_pids):
+        """Prefetch holdings and items for a batch of documents.
+
+        Into this block, the dump of the given documents uses the prefetched
+        data instead of querying the index for each document.
+
+        :param document_pids: list of document pids.
+        """
+        token = _prefetched_holdings.set(cls.search_holdings(document_pids))
+        try:
+            yield
+        finally:
+            _prefetched_holdings.reset(token)
+
+    @classmethod
+    def _get_holdings(cls, document_pid):
+        """Get the holdings and items of a document.
+
+        :param document_pid: the document pid.
+        :returns: the list of `(holding, items)` tuples.
+        """
+        prefetched = _prefetched_holdings.get()
+        if prefetched is not None and document_pid in prefetched:
+            return prefetched[document_pid]
+        return cls.search_holdings([document_pid])[document_pid]
+
+    @classmethod
+    def _process_holdings(cls, record, data):
+        """Add holding information to the indexed record."""
+        from rero_ils.modules.items.models import ItemNoteTypes
+
+        holdings = []
+        for holding, items in cls._get_holdings(record["pid"]):
             hold_data = {
                 "pid": holding["pid"],
                 "location": {
@@ -61,15 +163,7 @@ class IndexerDumper(Dumper):
                 "holdings_type": holding["holdings_type"],
             }
             # Index additional holdings fields into the document record
-            holdings_fields = [
-                "call_number",
-                "second_call_number",
-                "index",
-                "enumerationAndChronology",
-                "supplementaryContent",
-                "local_fields",
-            ]
-            for field in holdings_fields:
+            for field in HOLDINGS_ADDITIONAL_FIELDS:
                 if field in holding:
                     hold_data[field] = holding.get(field)
             # Index holdings notes
@@ -77,9 +171,7 @@ class IndexerDumper(Dumper):
                 hold_data["notes"] = notes
 
             # Index items attached to each holdings record
-            es_items = ItemsSearch().filter("term", holding__pid=holding["pid"]).scan()
-            for item in es_items:
-                item = item.to_dict()
+            for item in items:
                 item_data = {
                     "pid": item["pid"],
                     "barcode": item["barcode"],
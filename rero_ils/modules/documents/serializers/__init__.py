@@ -28,6 +28,7 @@ from rero_ils.modules.documents.serializers.json import (
 from rero_ils.modules.documents.serializers.marc import (
     DocumentMARCXMLSerializer,
     DocumentMARCXMLSRUSerializer,
+    DocumentMARCXMLStreamSerializer,
 )
 from rero_ils.modules.documents.serializers.ris import RISSerializer
 from rero_ils.modules.serializers import (
@@ -44,6 +45,7 @@ _json_export = DocumentExportJSONSerializer()
 _xml_dc = DublinCoreSerializer(RecordSchemaJSONV1)
 _xml_marcxml = DocumentMARCXMLSerializer()
 _xml_marcxmlsru = DocumentMARCXMLSRUSerializer()
+_xml_marcxml_stream = DocumentMARCXMLStreamSerializer()
 ris_serializer = RISSerializer()
 
 # Records-REST serializers
@@ -76,3 +78,9 @@ xml_dc_response = record_responsify(_xml_dc, "application/xml")
 xml_marcxml_search = search_responsify(_xml_marcxml, "application/xml")
 xml_marcxml_response = record_responsify(_xml_marcxml, "application/xml")
 xml_marcxmlsru_search = search_responsify(_xml_marcxmlsru, "application/xml")
+xml_marcxml_stream_search = search_responsify_file(
+    _xml_marcxml_stream,
+    "application/marcxml+xml",
+    file_extension="xml",
+    file_prefix="export",
+)
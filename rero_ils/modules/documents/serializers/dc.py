@@ -96,13 +96,16 @@ class DublinCoreSerializer(_DublinCoreSerializer):
         maximum_records = sru.get("maximum_records", 0)
         query = sru.get("query")
         query_es = sru.get("query_es")
-        next_record = start_record + maximum_records + 1
+        next_record = start_record + maximum_records
 
         element = ElementMaker()
         xml_root = element.searchRetrieveResponse()
         if sru:
             xml_root.append(element.version("1.1"))
         xml_root.append(element.numberOfRecords(str(total)))
+        if result_set_id := sru.get("result_set_id"):
+            xml_root.append(element.resultSetId(result_set_id))
+            xml_root.append(element.resultSetIdleTime(str(sru["result_set_ttl"])))
         xml_records = element.records()
 
         language = request.args.get("ln", DEFAULT_LANGUAGE)
@@ -133,7 +136,7 @@ class DublinCoreSerializer(_DublinCoreSerializer):
                 echoed_search_rr.append(element.query_es(query_es))
             if start_record:
                 echoed_search_rr.append(element.startRecord(str(start_record)))
-            if next_record > 1 and next_record < total:
+            if next_record > 1 and next_record <= total:
                 echoed_search_rr.append(element.nextRecordPosition(str(next_record)))
             if maximum_records:
                 echoed_search_rr.append(element.maximumRecords(str(maximum_records)))
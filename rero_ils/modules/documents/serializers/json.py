@@ -20,7 +20,7 @@
 
 from datetime import datetime
 
-from flask import current_app, json, request, stream_with_context
+from flask import current_app, g, json, request, stream_with_context
 from werkzeug.local import LocalProxy
 
 from rero_ils.modules.documents.utils import process_i18n_literal_fields
@@ -31,7 +31,7 @@ from rero_ils.modules.documents.views import (
 )
 from rero_ils.modules.libraries.api import LibrariesSearch
 from rero_ils.modules.locations.api import LocationsSearch
-from rero_ils.modules.organisations.api import OrganisationsSearch
+from rero_ils.modules.organisations.api import Organisation, OrganisationsSearch
 from rero_ils.modules.serializers import JSONSerializer
 
 from ..dumpers import document_replace_refs_dumper
@@ -48,13 +48,17 @@ class DocumentJSONSerializer(JSONSerializer):
 
     @staticmethod
     def _get_view_information():
-        """Get the `view_id` and `view_code` to use to build response."""
-        view_id = None
+        """Get the `view_id` and `view_code` to use to build response.
+
+        The view is resolved once by request and not for each search hit.
+        """
         view_code = request.args.get("view", GLOBAL_VIEW_CODE)
+        if (view := g.get("rero_ils_document_view")) and view[1] == view_code:
+            return view
+        view_id = None
         if view_code != GLOBAL_VIEW_CODE:
-            view_id = OrganisationsSearch().get_record_by_viewcode(view_code, "pid")[
-                "pid"
-            ]
+            view_id = Organisation.get_record_by_viewcode(view_code)["pid"]
+        g.rero_ils_document_view = view_id, view_code
         return view_id, view_code
 
     def preprocess_record(self, pid, record, links_factory=None, **kwargs):
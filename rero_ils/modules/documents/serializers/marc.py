@@ -23,17 +23,18 @@ from copy import deepcopy
 
 from dojson._compat import iteritems, string_types
 from dojson.utils import GroupableOrderedDict
-from flask import current_app, request
+from flask import current_app, request, stream_with_context
 from lxml import etree
 from lxml.builder import ElementMaker
 from werkzeug.local import LocalProxy
 
 from rero_ils.modules.documents.dojson.contrib.jsontomarc21 import to_marc21
 from rero_ils.modules.documents.dojson.contrib.jsontomarc21.model import (
+    HoldingsItemsContext,
     replace_contribution_sources,
 )
 from rero_ils.modules.entities.remote_entities.api import RemoteEntitiesSearch
-from rero_ils.modules.serializers import JSONSerializer
+from rero_ils.modules.serializers import JSONSerializer, StreamSerializerMixin
 from rero_ils.modules.utils import strip_chars
 
 DEFAULT_LANGUAGE = LocalProxy(lambda: current_app.config.get("BABEL_DEFAULT_LANGUAGE"))
@@ -46,6 +47,9 @@ class DocumentMARCXMLSerializer(JSONSerializer):
     records due to high memory usage.
     """
 
+    MARC21_REC = "http://www.loc.gov/MARC21/slim"
+    """MARCXML XML Schema"""
+
     def __init__(self, xslt_filename=None, schema_class=None):
         """Initialize serializer.
 
@@ -81,6 +85,7 @@ class DocumentMARCXMLSerializer(JSONSerializer):
         library_pids=None,
         location_pids=None,
         links_factory=None,
+        holdings_items_context=None,
         **kwargs,
     ):
         """Transform search result hit into an intermediate representation."""
@@ -91,6 +96,7 @@ class DocumentMARCXMLSerializer(JSONSerializer):
             organisation_pids=organisation_pids,
             library_pids=library_pids,
             location_pids=location_pids,
+            holdings_items_context=holdings_items_context,
         )
 
     # Needed if we use it for documents serialization !
@@ -136,6 +142,16 @@ class DocumentMARCXMLSerializer(JSONSerializer):
             contribution = hit.to_dict()
             es_contributions[contribution["pid"]] = contribution
 
+        # get all holdings and items of the documents
+        holdings_items_context = None
+        if with_holdings_items:
+            holdings_items_context = HoldingsItemsContext(
+                document_pids=[hit["_source"].get("pid") for hit in hits],
+                organisation_pids=organisation_pids,
+                library_pids=library_pids,
+                location_pids=location_pids,
+            )
+
         order = current_app.config.get("RERO_ILS_AGENTS_LABEL_ORDER", {})
         source_order = order.get(language, order.get(order["fallback"], []))
         records = []
@@ -161,12 +177,88 @@ class DocumentMARCXMLSerializer(JSONSerializer):
                 library_pids=library_pids,
                 location_pids=location_pids,
                 links_factory=item_links_factory,
+                holdings_items_context=holdings_items_context,
             )
             # complete the contributions from refs
 
             records.append(record)
         return records
 
+    @classmethod
+    def dump_marc_record(cls, record, prefix=None):
+        """Dump a MARC JSON record into a MARCXML record element.
+
+        :param record: the MARC JSON record (`to_marc21` result).
+        :param prefix: the MARCXML namespace prefix.
+        :returns: the `record` element.
+        """
+        rec_element = ElementMaker(
+            namespace=cls.MARC21_REC, nsmap={prefix: cls.MARC21_REC}
+        )
+        data_element = ElementMaker()
+        rec_data = rec_element.record()
+
+        if leader := record.get("leader"):
+            rec_data.append(data_element.leader(leader))
+
+        if isinstance(record, GroupableOrderedDict):
+            items = record.iteritems(with_order=False, repeated=True)
+        else:
+            items = iteritems(record)
+
+        for df, subfields in items:
+            # Control fields
+            if len(df) == 3:
+                if isinstance(subfields, string_types):
+                    controlfield = data_element.controlfield(subfields)
+                    controlfield.attrib["tag"] = df[:3]
+                    rec_data.append(controlfield)
+                elif isinstance(subfields, (list, tuple, set)):
+                    for subfield in subfields:
+                        controlfield = data_element.controlfield(subfield)
+                        controlfield.attrib["tag"] = df[:3]
+                        rec_data.append(controlfield)
+            else:
+                # Skip leader.
+                if df == "leader":
+                    continue
+
+                if not isinstance(subfields, (list, tuple, set)):
+                    subfields = (subfields,)
+
+                df = df.replace("_", " ")
+                for subfield in subfields:
+                    if not isinstance(subfield, (list, tuple, set)):
+                        subfield = [subfield]
+
+                    for s in subfield:
+                        datafield = data_element.datafield()
+                        datafield.attrib["tag"] = df[:3]
+                        datafield.attrib["ind1"] = df[3]
+                        datafield.attrib["ind2"] = df[4]
+
+                        if isinstance(s, GroupableOrderedDict):
+                            items = s.iteritems(with_order=False, repeated=True)
+                        elif isinstance(s, dict):
+                            items = iteritems(s)
+                        else:
+                            datafield.append(data_element.subfield(s))
+
+                            items = ()
+
+                        for code, value in items:
+                            if isinstance(value, string_types):
+                                datafield.append(
+                                    data_element.subfield(strip_chars(value), code=code)
+                                )
+                            else:
+                                for v in value:
+                                    datafield.append(
+                                        data_element.subfield(strip_chars(v), code=code)
+                                    )
+                        rec_data.append(datafield)
+        return rec_data
+
     # Needed if we use it for documents serialization !
     # def serialize_search(self, pid_fetcher, search_result,
     #                      item_links_factory=None, **kwargs):
@@ -196,8 +288,6 @@ class DocumentMARCXMLSRUSerializer(DocumentMARCXMLSerializer):
     """
 
     MARC21_ZS = "http://www.loc.gov/zing/srw/"
-    MARC21_REC = "http://www.loc.gov/MARC21/slim"
-    """MARCXML XML Schema"""
 
     def dumps_etree(self, total, records, sru, xslt_filename=None, prefix=None):
         """Dump records into a etree."""
@@ -205,82 +295,13 @@ class DocumentMARCXMLSRUSerializer(DocumentMARCXMLSerializer):
 
         def dump_record(record, idx):
             """Dump a single record."""
-            rec_element = ElementMaker(
-                namespace=self.MARC21_REC, nsmap={prefix: self.MARC21_REC}
-            )
-            data_element = ElementMaker()
             rec = element.record()
             rec.append(element.recordPacking("xml"))
             rec.append(element.recordSchema("marcxml"))
 
             rec_record_data = element.recordData()
-            rec_data = rec_element.record()
-
-            if leader := record.get("leader"):
-                rec_data.append(data_element.leader(leader))
-
-            if isinstance(record, GroupableOrderedDict):
-                items = record.iteritems(with_order=False, repeated=True)
-            else:
-                items = iteritems(record)
-
-            for df, subfields in items:
-                # Control fields
-                if len(df) == 3:
-                    if isinstance(subfields, string_types):
-                        controlfield = data_element.controlfield(subfields)
-                        controlfield.attrib["tag"] = df[:3]
-                        rec_data.append(controlfield)
-                    elif isinstance(subfields, (list, tuple, set)):
-                        for subfield in subfields:
-                            controlfield = data_element.controlfield(subfield)
-                            controlfield.attrib["tag"] = df[:3]
-                            rec_data.append(controlfield)
-                else:
-                    # Skip leader.
-                    if df == "leader":
-                        continue
-
-                    if not isinstance(subfields, (list, tuple, set)):
-                        subfields = (subfields,)
-
-                    df = df.replace("_", " ")
-                    for subfield in subfields:
-                        if not isinstance(subfield, (list, tuple, set)):
-                            subfield = [subfield]
-
-                        for s in subfield:
-                            datafield = data_element.datafield()
-                            datafield.attrib["tag"] = df[:3]
-                            datafield.attrib["ind1"] = df[3]
-                            datafield.attrib["ind2"] = df[4]
-
-                            if isinstance(s, GroupableOrderedDict):
-                                items = s.iteritems(with_order=False, repeated=True)
-                            elif isinstance(s, dict):
-                                items = iteritems(s)
-                            else:
-                                datafield.append(data_element.subfield(s))
-
-                                items = ()
-
-                            for code, value in items:
-                                if isinstance(value, string_types):
-                                    datafield.append(
-                                        data_element.subfield(
-                                            strip_chars(value), code=code
-                                        )
-                                    )
-                                else:
-                                    for v in value:
-                                        datafield.append(
-                                            data_element.subfield(
-                                                strip_chars(v), code=code
-                                            )
-                                        )
-                            rec_data.append(datafield)
-                rec_record_data.append(rec_data)
-                rec.append(rec_record_data)
+            rec_record_data.append(self.dump_marc_record(record, prefix=prefix))
+            rec.append(rec_record_data)
             rec.append(element.RecordPosition(str(idx)))
             return rec
 
@@ -296,7 +317,10 @@ class DocumentMARCXMLSRUSerializer(DocumentMARCXMLSerializer):
             root = element.searchRetrieveResponse()
             root.append(element.version("1.1"))
             root.append(element.numberOfRecords(str(number_of_records)))
-            if next_record > 1 and next_record < number_of_records:
+            if result_set_id := sru.get("result_set_id"):
+                root.append(element.resultSetId(result_set_id))
+                root.append(element.resultSetIdleTime(str(sru["result_set_ttl"])))
+            if next_record > 1 and next_record <= number_of_records:
                 root.append(element.nextRecordPosition(str(next_record)))
             data = element.records()
             for idx, record in enumerate(records, start_record):
@@ -369,3 +393,53 @@ class DocumentMARCXMLSRUSerializer(DocumentMARCXMLSerializer):
             records=records,
             **self.dumps_kwargs,
         )
+
+
+class DocumentMARCXMLStreamSerializer(DocumentMARCXMLSerializer, StreamSerializerMixin):
+    """Streamed MARCXML serializer for documents export.
+
+    The search result (ES.scan()) is converted by chunks and each MARCXML
+    record is sent as soon as it is built, so the memory usage doesn't depend
+    on the number of exported records.
+    """
+
+    chunk_size = 100
+
+    def serialize_search(
+        self, pid_fetcher, search_result, links=None, item_links_factory=None
+    ):
+        """Serialize a search result.
+
+        :param pid_fetcher: Persistent identifier fetcher.
+        :param search_result: Elasticsearch search result.
+        :param links: Dictionary of links to add to response.
+        :param item_links_factory: Factory function for record links.
+        """
+        language = request.args.get("ln", DEFAULT_LANGUAGE)
+        with_holdings_items = not request.args.get("without_items", False)
+
+        def generate_xml():
+            """Generate the MARCXML collection as a generator.
+
+            :returns: a generator of XML fragments.
+            """
+            yield '<?xml version="1.0" encoding="UTF-8"?>\n'
+            yield f'<collection xmlns="{self.MARC21_REC}">\n'
+            for _, hits in self.get_chunks(search_result):
+                # the contributions, holdings and items are loaded by chunk
+                hits = [{"_id": hit.meta.id, "_source": hit.to_dict()} for hit in hits]
+                records = self.transform_records(
+                    hits=hits,
+                    pid_fetcher=pid_fetcher,
+                    language=language,
+                    with_holdings_items=with_holdings_items,
+                    item_links_factory=item_links_factory,
+                )
+                for record in records:
+                    yield etree.tostring(
+                        self.dump_marc_record(record), encoding="unicode"
+                    )
+                    yield "\n"
+            yield "</collection>\n"
+
+        return stream_with_context(generate_xml())
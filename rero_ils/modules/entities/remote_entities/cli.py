@@ -20,6 +20,8 @@
 
 from __future__ import absolute_import, print_function
 
+from itertools import islice
+
 import click
 from flask.cli import with_appcontext
 
@@ -58,14 +60,14 @@ def sync(query, dry_run, from_last_date, verbose, log_dir, from_date, in_memory)
         n_updated = 0
         doc_updated = set()
         err_pids = []
-        with click.progressbar(pids, length=total) as bar:
-            for pid in bar:
-                current_doc_updated, updated, error = sync_entity.sync_record(pid)
+        pids = iter(pids)
+        with click.progressbar(length=total) as bar:
+            while chunk := list(islice(pids, sync_entity.chunk_size)):
+                current_doc_updated, updated, errors = sync_entity.sync_batch(chunk)
                 doc_updated.update(current_doc_updated)
-                if updated:
-                    n_updated += 1
-                if error:
-                    err_pids.append(pid)
+                n_updated += len(updated)
+                err_pids.extend(errors)
+                bar.update(len(chunk))
         n_doc_updated = len(doc_updated)
         sync_entity.end_sync(n_doc_updated, n_updated, err_pids)
         if err_pids:
@@ -19,14 +19,17 @@
 """API for manipulating documents."""
 
 import sys
+from concurrent.futures import ThreadPoolExecutor
 from copy import deepcopy
 from datetime import datetime
 from itertools import islice
 
 import requests
 from deepdiff import DeepDiff
+from flask import current_app
 from invenio_db import db
 
+from rero_ils.modules.api import ReindexCoordinator
 from rero_ils.modules.commons.exceptions import RecordNotFound
 from rero_ils.modules.documents.api import Document
 from rero_ils.modules.utils import (
@@ -44,7 +47,13 @@ class SyncEntity:
     """Entity MEF synchronization."""
 
     def __init__(
-        self, dry_run=False, verbose=False, log_dir=None, from_last_date=False
+        self,
+        dry_run=False,
+        verbose=False,
+        log_dir=None,
+        from_last_date=False,
+        workers=None,
+        chunk_size=None,
     ):
         """Constructor.
 
@@ -53,11 +62,21 @@ class SyncEntity:
         :param log_dir: string - path to put the logs
         :param from_last_date: boolean - if True try to consider entity
             modified after the last run date time
+        :param workers: integer - number of concurrent MEF server requests
+        :param chunk_size: integer - number of MEF records synchronized
+            by batch
         """
+        config = current_app.config
         self.dry_run = dry_run
         self.verbose = verbose
         self.from_date = None
         self.start_timestamp = None
+        self.workers = workers or config.get("RERO_ILS_MEF_SYNC_WORKERS", 1)
+        self.chunk_size = chunk_size or config.get("RERO_ILS_MEF_SYNC_CHUNK_SIZE", 1)
+        # one session for all MEF server requests to reuse the connections
+        self.session = requests_retry_session(pool_maxsize=self.workers)
+        # latest MEF records of the current batch by (type, source, pid)
+        self._latest = {}
         self.logger = create_logger(
             name="SyncEntity",
             file_name="sync_mef.log",
@@ -121,12 +140,69 @@ class SyncEntity:
             msg = f"Unable to find MEF base url for {entity_type}"
             raise KeyError(msg)
         url = f"{base_url}/mef/latest/{source}:{pid}"
-        res = requests_retry_session().get(url)
+        res = self.session.get(url)
         if res.status_code == requests.codes.ok:
             return res.json()
         self.logger.debug(f"Problem get {url}: {res.status_code}")
         return {}
 
+    def _prefetch_latest(self, entities):
+        """Get concurrently the latest MEF records of a batch of entities.
+
+        :param entities: the `RemoteEntity` records of the batch.
+        """
+        keys = {
+            (entity.type, source, entity[source]["pid"])
+            for entity in entities
+            for source in entity["sources"]
+        }
+        app = current_app._get_current_object()
+
+        def get_latest(key):
+            """Get the latest MEF record, errors are raised by the sync."""
+            with app.app_context():
+                entity_type, source, pid = key
+                try:
+                    mef = self._get_latest(
+                        entity_type=entity_type, source=source, pid=pid
+                    )
+                    return key, mef
+                except Exception as err:
+                    self.logger.debug(f"Problem get latest {key}: {err}")
+                    return key, None
+
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            for key, mef in executor.map(get_latest, keys):
+                if mef is not None:
+                    self._latest[key] = mef
+
+    def _get_latest_cached(self, entity_type, source, pid):
+        """Get the latest MEF record prefetched for the current batch.
+
+        :param entity_type: (string) the entity type such as
+        `agents`, `concepts`
+        :param source: (string) the entity source such as `idref`, `gnd`
+        :param pid: (string) the entity identifier.
+        :returns: dictionary representing the MEF record.
+        """
+        if (mef := self._latest.get((entity_type, source, pid))) is not None:
+            return mef
+        return self._get_latest(entity_type=entity_type, source=source, pid=pid)
+
+    @staticmethod
+    def _get_urls_to_replace(pids_to_replace):
+        """Get the entity URLs to replace.
+
+        :param pids_to_replace: (dict) the MEF source URLs with the tuple of
+            (old_entity_pid, new_entity_pid)
+        :returns: a dictionary with the old entity URL as key and the new
+            entity URL as value.
+        """
+        return {
+            f"{mef_url}/{old_pid}": f"{mef_url}/{new_pid}"
+            for mef_url, (old_pid, new_pid) in pids_to_replace.items()
+        }
+
     def _update_entities_in_document(self, doc_pid, pids_to_replace):
         """Updates the contribution and subjects in document.
 
@@ -136,8 +212,55 @@ class SyncEntity:
             tuple of (old_entity_pid, new_entity_pid)
             >> {'gnd': ('entity_old1', 'entity_new1')}
         """
+        doc = self._replace_entity_urls(
+            doc_pid, self._get_urls_to_replace(pids_to_replace)
+        )
+        # in any case we update the doc as the mef pid can be changed
+        if doc and not self.dry_run:
+            doc.replace(doc, dbcommit=True, reindex=True)
+
+    def _update_documents(self, urls_by_document):
+        """Update a batch of documents.
+
+        Each document is written once with all its entity URL replacements
+        and the documents are indexed with bulk requests.
+
+        :param urls_by_document: (dict) the entity URLs to replace (see
+            `_get_urls_to_replace`) by document pid.
+        :returns: the pids of the updated documents, the pids of the
+            documents that generate an error.
+        :rtype: set, set.
+        """
+        doc_updated = set()
+        doc_errors = set()
+        with ReindexCoordinator() as coordinator:
+            for doc_pid, urls_to_replace in urls_by_document.items():
+                try:
+                    doc = self._replace_entity_urls(doc_pid, urls_to_replace)
+                    # in any case we update the doc as the mef pid can be
+                    # changed
+                    if doc and not self.dry_run:
+                        doc.replace(doc, dbcommit=True, reindex=False)
+                        coordinator.add(doc)
+                    doc_updated.add(doc_pid)
+                except Exception as err:
+                    self.logger.error(
+                        f"ERROR: document(pid: {doc_pid}) update -> {str(err)}"
+                    )
+                    doc_errors.add(doc_pid)
+        return doc_updated, doc_errors
+
+    def _replace_entity_urls(self, doc_pid, urls_to_replace):
+        """Replace the entity URLs of a document.
+
+        :param doc_pid: (string) document pid
+        :param urls_to_replace: (dict) the new entity URL by old entity URL.
+        :returns: the document (not saved), `None` if it does not exist.
+        """
         # get the document from the DB
-        doc = Document.get_record_by_pid(doc_pid)
+        if not (doc := Document.get_record_by_pid(doc_pid)):
+            self.logger.debug(f"Document {doc_pid} not found")
+            return
 
         # get all entities from the document over all entity fields:
         # contribution and subjects
@@ -152,23 +275,18 @@ class SyncEntity:
             self.logger.debug(f"No entity to update for document {doc.pid}")
 
         # update the $ref entity URL and MEF pid
-        for mef_url, (old_pid, new_pid) in pids_to_replace.items():
-            old_entity_url = f"{mef_url}/{old_pid}"
-            new_entity_url = f"{mef_url}/{new_pid}"
-            entities_to_update = filter(
-                lambda c: c.get("$ref") == old_entity_url, remote_entities
-            )
-            for entity in entities_to_update:
-                if old_entity_url != new_entity_url:
-                    self.logger.info(
-                        f"Entitiy URL changed from {old_entity_url} to "
-                        f"{new_entity_url} for document {doc.pid}"
-                    )
-                # update the entity URL
-                entity["$ref"] = new_entity_url
-        # in any case we update the doc as the mef pid can be changed
-        if not self.dry_run:
-            doc.replace(doc, dbcommit=True, reindex=True)
+        for entity in remote_entities:
+            old_entity_url = entity["$ref"]
+            if (new_entity_url := urls_to_replace.get(old_entity_url)) is None:
+                continue
+            if old_entity_url != new_entity_url:
+                self.logger.info(
+                    f"Entitiy URL changed from {old_entity_url} to "
+                    f"{new_entity_url} for document {doc.pid}"
+                )
+            # update the entity URL
+            entity["$ref"] = new_entity_url
+        return doc
 
     def get_entities_pids(self, query="*", from_date=None):
         """Get contributions identifiers.
@@ -266,10 +384,13 @@ class SyncEntity:
         else:
             return get_mef_pids(es_query), total
 
-    def sync_record(self, pid):
+    def sync_record(self, pid, urls_by_document=None):
         """Sync a MEF record.
 
         :param pid: (string) the MEF identifier.
+        :param urls_by_document: (dict) if given, the linked documents are not
+            updated but their entity URLs to replace are added to this
+            dictionary by document pid (see `sync_batch`).
         :returns: the number of updated document, true if the MEF record
             has been update, true if an error occurs.
         :rtype: integer, boolean, x.
@@ -287,7 +408,7 @@ class SyncEntity:
             # iterate over all entity sources: rero, gnd, idref
             pids_to_replace = {}
             for source in entity["sources"]:
-                mef = self._get_latest(
+                mef = self._get_latest_cached(
                     entity_type=entity.type, source=source, pid=entity[source]["pid"]
                 )
                 # MEF sever failed to retrieve the latest MEF record
@@ -328,7 +449,7 @@ class SyncEntity:
                                 f"recursion with (pid:{new_mef_pid})"
                             )
                             new_doc_updated, new_updated, new_error = self.sync_record(
-                                new_mef_pid
+                                new_mef_pid, urls_by_document
                             )
                             # TODO: find a better way
                             doc_updated.update(new_doc_updated)
@@ -373,10 +494,15 @@ class SyncEntity:
                     f" try to update documents: {doc_pids}"
                 )
 
-                for doc_pid in doc_pids:
-                    self._update_entities_in_document(
-                        doc_pid=doc_pid, pids_to_replace=pids_to_replace
-                    )
+                if urls_by_document is None:
+                    for doc_pid in doc_pids:
+                        self._update_entities_in_document(
+                            doc_pid=doc_pid, pids_to_replace=pids_to_replace
+                        )
+                else:
+                    urls_to_replace = self._get_urls_to_replace(pids_to_replace)
+                    for doc_pid in doc_pids:
+                        urls_by_document.setdefault(doc_pid, {}).update(urls_to_replace)
                 doc_updated = set(doc_pids)
         except Exception as err:
             self.logger.error(f"ERROR: MEF record(pid: {pid}) -> {str(err)}")
@@ -385,6 +511,45 @@ class SyncEntity:
             # raise
         return doc_updated, updated, error
 
+    def sync_batch(self, pids):
+        """Sync a batch of MEF records.
+
+        The latest MEF records are retrieved concurrently. The entity URLs to
+        replace are accumulated over the batch, so a document linked to
+        several updated entities is written only once.
+
+        :param pids: (list of strings) the MEF identifiers.
+        :returns: the updated document pids, the updated MEF pids, the MEF
+            pids that generate an error.
+        :rtype: set, list of strings, list of strings.
+        """
+        # close db session to prevent psycopg2.OperationalError.
+        db.session.close()
+        urls_by_document = {}
+        # the MEF pids which contribute URLs to replace by document pid
+        mef_by_document = {}
+        mef_updated = []
+        mef_errors = []
+        try:
+            self._prefetch_latest(RemoteEntity.get_records_by_pids(list(pids)))
+            for pid in pids:
+                doc_pids, updated, error = self.sync_record(pid, urls_by_document)
+                for doc_pid in doc_pids:
+                    mef_by_document.setdefault(doc_pid, []).append(pid)
+                if updated:
+                    mef_updated.append(pid)
+                if error:
+                    mef_errors.append(pid)
+        finally:
+            self._latest = {}
+        doc_updated, doc_errors = self._update_documents(urls_by_document)
+        # the MEF records of a failing document update should be synced again
+        for doc_pid in doc_errors:
+            for pid in mef_by_document.get(doc_pid, []):
+                if pid not in mef_errors:
+                    mef_errors.append(pid)
+        return doc_updated, mef_updated, mef_errors
+
     def start_sync(self):
         """Add logging information about the starting process."""
         self.start_timestamp = datetime.now()
@@ -436,13 +601,12 @@ class SyncEntity:
         doc_updated = set()
         n_mef_updated = 0
         mef_errors = set()
-        for pid in pids:
-            current_doc_updated, mef_updated, error = self.sync_record(pid)
+        pids = iter(pids)
+        while chunk := list(islice(pids, self.chunk_size)):
+            current_doc_updated, mef_updated, errors = self.sync_batch(chunk)
             doc_updated.update(current_doc_updated)
-            if mef_updated:
-                n_mef_updated += 1
-            if error:
-                mef_errors.add(pid)
+            n_mef_updated += len(mef_updated)
+            mef_errors.update(errors)
         n_doc_updated = len(doc_updated)
         self.end_sync(n_doc_updated, n_mef_updated, mef_errors)
         return n_doc_updated, n_mef_updated, mef_errors
@@ -32,6 +32,7 @@ from invenio_base.utils import obj_or_import_string
 from invenio_circulation.signals import loan_state_changed
 from invenio_indexer.signals import before_record_index
 from invenio_records.signals import (
+    after_record_delete,
     after_record_insert,
     after_record_update,
     before_record_update,
@@ -62,6 +63,8 @@ from rero_ils.modules.acquisition.acq_receipt_lines.listener import (
 )
 from rero_ils.modules.acquisition.acq_receipts.listener import enrich_acq_receipt_data
 from rero_ils.modules.acquisition.budgets.listener import budget_is_active_changed
+from rero_ils.modules.api import ReindexCoordinator
+from rero_ils.modules.circ_policies.listener import invalidate_circ_policies_matrix
 from rero_ils.modules.collections.listener import enrich_collection_data
 from rero_ils.modules.holdings.listener import (
     enrich_holding_data,
@@ -103,7 +106,8 @@ from rero_ils.modules.utils import remove_user_name, set_user_name
 from rero_ils.theme.menus import init_menu_lang, init_menu_profile, init_menu_tools
 from rero_ils.version import __version__
 
-from .receivers import set_boosting_query_fields
+from .indexer_utils import IndexEnrichers, flush_deferred_refresh
+from .receivers import set_boosting_query_fields, warm_organisation_viewcode_cache
 
 
 @identity_loaded.connect
@@ -188,6 +192,8 @@ class REROILSAPP(object):
         # jsonschema store
         # SEE: RECORDS_REFRESOLVER_STORE for more details
         self.jsonschema_store = {}
+        # `before_record_index` enrichment functions by index
+        self.index_enrichers = IndexEnrichers()
         if app:
             self.init_app(app)
             # force to load ils template before others
@@ -232,6 +238,11 @@ class REROILSAPP(object):
             handler = logging.StreamHandler()
             es_trace_logger.addHandler(handler)
         app_loaded.connect(set_boosting_query_fields)
+        app_loaded.connect(warm_organisation_viewcode_cache)
+        # index once the dependent records collected during the request
+        app.teardown_request(ReindexCoordinator.flush_request)
+        # refresh once the indices touched with the `deferred` refresh policy
+        app.teardown_appcontext(flush_deferred_refresh)
         connections.add_connection("default", current_search_client)
 
     @staticmethod
@@ -316,29 +327,33 @@ class REROILSAPP(object):
 
     def register_signals(self, app):
         """Register signals."""
-        # TODO: use before_record_index.dynamic_connect() if it works
-        # example:
-        # before_record_index.dynamic_connect(
-        #    enrich_patron_data, sender=app, index='patrons-patron-v0.0.1')
-        before_record_index.connect(enrich_acq_account_data, sender=app)
-        before_record_index.connect(enrich_acq_order_data, sender=app)
-        before_record_index.connect(enrich_acq_receipt_data, sender=app)
-        before_record_index.connect(enrich_acq_receipt_line_data, sender=app)
-        before_record_index.connect(enrich_acq_order_line_data, sender=app)
-        before_record_index.connect(enrich_collection_data, sender=app)
-        before_record_index.connect(enrich_loan_data, sender=app)
-        before_record_index.connect(enrich_item_data, sender=app)
-        before_record_index.connect(enrich_patron_data, sender=app)
-        before_record_index.connect(enrich_holding_data, sender=app)
-        before_record_index.connect(enrich_notification_data, sender=app)
-        before_record_index.connect(enrich_patron_transaction_event_data, sender=app)
-        before_record_index.connect(enrich_patron_transaction_data, sender=app)
-        before_record_index.connect(enrich_ill_request_data, sender=app)
-        before_record_index.connect(prepare_template_data, sender=app)
+        # only the enrichment functions of the indexed record index are called
+        enrichers = self.index_enrichers
+        enrichers.register("acq_accounts", enrich_acq_account_data)
+        enrichers.register("acq_orders", enrich_acq_order_data)
+        enrichers.register("acq_receipts", enrich_acq_receipt_data)
+        enrichers.register("acq_receipt_lines", enrich_acq_receipt_line_data)
+        enrichers.register("acq_order_lines", enrich_acq_order_line_data)
+        enrichers.register("collections", enrich_collection_data)
+        enrichers.register("loans", enrich_loan_data)
+        enrichers.register("items", enrich_item_data)
+        enrichers.register("patrons", enrich_patron_data)
+        enrichers.register("holdings", enrich_holding_data)
+        enrichers.register("notifications", enrich_notification_data)
+        enrichers.register(
+            "patron_transaction_events", enrich_patron_transaction_event_data
+        )
+        enrichers.register("patron_transactions", enrich_patron_transaction_data)
+        enrichers.register("ill_requests", enrich_ill_request_data)
+        enrichers.register("templates", prepare_template_data)
+        before_record_index.connect(enrichers.dispatch, sender=app, weak=False)
 
         after_record_insert.connect(create_subscription_patron_transaction)
         after_record_update.connect(create_subscription_patron_transaction)
         after_record_update.connect(update_items_locations_and_types)
+        after_record_insert.connect(invalidate_circ_policies_matrix)
+        after_record_update.connect(invalidate_circ_policies_matrix)
+        after_record_delete.connect(invalidate_circ_policies_matrix)
 
         before_record_update.connect(budget_is_active_changed)
         before_record_update.connect(negative_availability_changes)
@@ -37,6 +37,7 @@ from rero_ils.modules.api import (
     IlsRecordError,
     IlsRecordsIndexer,
     IlsRecordsSearch,
+    ReindexCoordinator,
 )
 from rero_ils.modules.documents.api import Document
 from rero_ils.modules.errors import (
@@ -873,10 +874,17 @@ class HoldingsIndexer(IlsRecordsIndexer):
         Parent document is indexed as well.
         """
         return_value = super().index(record)
-        document = Document.get_record_by_pid(record.document_pid)
-        document.reindex()
+        self.reindex_parents(record)
         return return_value
 
+    def reindex_parents(self, record):
+        """Reindex the parent document.
+
+        :param record: Record instance.
+        """
+        document = Document.get_record_by_pid(record.document_pid)
+        ReindexCoordinator.reindex(document)
+
     def delete(self, record):
         """Delete a record.
 
@@ -889,7 +897,7 @@ class HoldingsIndexer(IlsRecordsIndexer):
             ItemsSearch.flush_and_refresh()
         document = Document.get_record_by_pid(record.document_pid)
         return_value = super().delete(record)
-        document.reindex()
+        ReindexCoordinator.reindex(document)
         return return_value
 
     def bulk_index(self, record_id_iterator):
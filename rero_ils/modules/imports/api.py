@@ -20,16 +20,25 @@
 
 from __future__ import absolute_import, print_function
 
-import pickle
+import time
 import traceback
-from datetime import datetime, timedelta
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FuturesTimeoutError
+from concurrent.futures import as_completed
+from datetime import datetime
+from threading import Lock
 
 import requests
 from dojson.contrib.marc21.utils import create_record
 from dojson.utils import GroupableOrderedDict
-from flask import current_app, jsonify, url_for
+from flask import (
+    copy_current_request_context,
+    current_app,
+    has_request_context,
+    jsonify,
+    url_for,
+)
 from lxml import etree
-from redis import Redis
 from six import BytesIO
 
 from rero_ils.modules.documents.dojson.contrib.marc21tojson import (
@@ -40,6 +49,15 @@ from rero_ils.modules.documents.dojson.contrib.marc21tojson import (
     marc21_ugent,
 )
 from rero_ils.modules.documents.dojson.contrib.unimarctojson import unimarc
+from rero_ils.modules.monitoring.metrics import Metrics
+
+from .cache import ImportCache
+
+# The dojson processors keep the state of the record being converted into
+# their (module level) instance: a processor can't convert several records at
+# the same time.
+_processor_locks = {}
+_processor_locks_lock = Lock()
 
 
 class Import(object):
@@ -65,8 +83,7 @@ class Import(object):
         assert self.search.get("anywhere")
         assert self.to_json_processor
         self.init_results()
-        self.cache = Redis.from_url(current_app.config.get("RERO_IMPORT_CACHE"))
-        self.cache_expire = current_app.config.get("RERO_IMPORT_CACHE_EXPIRE")
+        self.cache = ImportCache(self.name)
 
     def init_results(self):
         """Init results."""
@@ -360,69 +377,140 @@ class Import(object):
         new_json_data["__order__"] = new_order
         return GroupableOrderedDict(new_json_data)
 
+    def _split_stream(self, stream, url_api):
+        """Yield the MARC records of a SRU response.
+
+        The response is parsed only once: the number of records of the search
+        is read on the fly (see `self.remote_total`) and the parsed elements
+        are freed as soon as their MARC record is created.
+
+        :param stream: the SRU XML response stream.
+        :param url_api: the SRU url (for error messages).
+        :returns: a generator of MARC JSON records.
+        """
+        record_tag = "{http://www.loc.gov/zing/srw/}record"
+        start = time.perf_counter()
+        try:
+            for _, element in etree.iterparse(
+                stream, tag=("{*}numberOfRecords", record_tag)
+            ):
+                parent = element.getparent()
+                if element.tag == record_tag:
+                    marc = create_record(element)
+                    self.timings["parse"] += time.perf_counter() - start
+                    yield marc
+                    start = time.perf_counter()
+                elif parent is not None and parent.getparent() is None:
+                    self.remote_total = int(element.text)
+                # free the consumed elements
+                element.clear(keep_tail=True)
+                while element.getprevious() is not None:
+                    del parent[0]
+        except Exception:
+            current_app.logger.error(
+                f"Import: {self.name} error: XML SPLIT url: {url_api}"
+            )
+        self.timings["parse"] += time.perf_counter() - start
+
+    @classmethod
+    def get_processor_lock(cls):
+        """Get the lock of the source dojson processor.
+
+        The sources using the same processor share the same lock.
+
+        :returns: the processor lock.
+        """
+        processor = getattr(cls.to_json_processor, "__self__", cls.to_json_processor)
+        with _processor_locks_lock:
+            return _processor_locks.setdefault(processor, Lock())
+
+    def _convert_record(self, marc):
+        """Convert a MARC record to the local json format.
+
+        :param marc: the MARC JSON record.
+        :returns: a tuple with the cleaned MARC JSON record, the record id and
+            the converted record, `None` if the record can't be converted.
+        """
+        start = time.perf_counter()
+        json_data = self.clean_marc(marc)
+        # Some BNF records are empty hmm...
+        if not json_data.values():
+            return None
+        # convert marc json to local json format
+        with self.get_processor_lock():
+            record = self.to_json_processor(json_data)
+        self.timings["convert"] += time.perf_counter() - start
+        return json_data, self.get_id(json_data), record
+
     def search_records(
         self, what, relation, where="anywhere", max_results=0, no_cache=False
     ):
         """Get the records.
 
+        The time spent by each import stage is kept into `self.timings`.
+
         :param what: what term to search
         :param relation: relation for what and where
         :param where: in witch index to search
         :param max_results: maximum records to search
         :param no_cache: do not use cache if true
         """
-
-        def _split_stream(stream):
-            """Yield record elements from given XML stream."""
-            try:
-                for _, element in etree.iterparse(
-                    stream, tag="{http://www.loc.gov/zing/srw/}record"
-                ):
-                    yield element
-            except Exception:
-                current_app.logger.error(
-                    f"Import: {self.name} error: XML SPLIT url: {url_api}"
-                )
-                return []
-
         if max_results == 0:
             max_results = self.max_results
         if self.name == "LOC" and relation == "all":
             relation = "="
         self.init_results()
-        url_api = "Not yet set"
+        self.timings = {"request": 0, "parse": 0, "convert": 0}
+        self.remote_total = 0
         if not what:
             return self.results, 200
+        url_api = self._create_sru_url(
+            what=what, relation=relation, where=where, max_results=max_results
+        )
         try:
-            cache_key = f"{self.name}_{what}_{relation}_{where}_{max_results}"
-            cache = self.cache.get(cache_key)
-            if cache and not no_cache:
-                cache_data = pickle.loads(cache)
-                self.results["hits"] = cache_data["hits"]
-                self.data = cache_data["data"]
+            cached = None
+            if not no_cache:
+                cached = self.cache.get(what, relation, where, max_results)
+            if cached and cached.get("message") is not None:
+                # cached source failure
+                self.status_code = cached["status"]
+                self.status_msg = cached["message"]
+            elif cached:
+                self.results["hits"]["hits"] = cached["hits"]
+                if cached["hits"]:
+                    self.results["hits"]["remote_total"] = cached["remote_total"]
+                self.data = cached["data"]
                 self.status_code = 200
             else:
-                url_api = self._create_sru_url(
-                    what=what, relation=relation, where=where, max_results=max_results
-                )
-                response = requests.get(
-                    url_api, timeout=(self.timeout_connect, self.timeout_request)
-                )
-                self.status_code = response.status_code
-                self.status_msg = "Request error."
-                response.raise_for_status()
-
-                for xml_record in _split_stream(BytesIO(response.content)):
-                    # convert xml in marc json
-                    json_data = self.clean_marc(create_record(xml_record))
-                    # Some BNF records are empty hmm...
-                    if not json_data.values():
+                start = time.perf_counter()
+                try:
+                    response = requests.get(
+                        url_api, timeout=(self.timeout_connect, self.timeout_request)
+                    )
+                    self.timings["request"] = time.perf_counter() - start
+                    self.status_code = response.status_code
+                    self.status_msg = "Request error."
+                    response.raise_for_status()
+                except (
+                    requests.exceptions.ConnectionError,
+                    requests.exceptions.Timeout,
+                    requests.exceptions.HTTPError,
+                ) as error:
+                    # do not query again a failing source for a while
+                    status = 433
+                    if isinstance(error, requests.exceptions.HTTPError):
+                        status = error.response.status_code
+                    self.cache.set_failure(what, relation, where, status, str(error))
+                    raise
+
+                positions = []
+                marc_records = self._split_stream(BytesIO(response.content), url_api)
+                for position, converted in enumerate(
+                    map(self._convert_record, marc_records)
+                ):
+                    if not converted:
                         continue
-
-                    # convert marc json to local json format
-                    record = self.to_json_processor(json_data)
-
-                    id_ = self.get_id(json_data)
+                    json_data, id_, record = converted
                     if record and id_:
                         data = {
                             "id": id_,
@@ -433,24 +521,41 @@ class Import(object):
                             "metadata": record,
                             "source": self.name,
                         }
+                        positions.append(position)
                         self.data.append(json_data)
                         self.results["hits"]["hits"].append(data)
-                        self.results["hits"]["remote_total"] = int(
-                            etree.parse(BytesIO(response.content))
-                            .find("{*}numberOfRecords")
-                            .text
-                        )
-                # save to cache if we have hits
                 if self.results["hits"]["hits"]:
-                    cache_data = {"hits": self.results["hits"], "data": self.data}
-                    self.cache.setex(
-                        cache_key,
-                        timedelta(minutes=self.cache_expire),
-                        value=pickle.dumps(cache_data),
+                    self.results["hits"]["remote_total"] = self.remote_total
+                for stage, duration in self.timings.items():
+                    Metrics.incr("imports", f"{self.name}_{stage}", duration)
+                Metrics.incr(
+                    "imports", f"{self.name}_records", len(self.results["hits"]["hits"])
+                )
+                current_app.logger.debug(
+                    f"Import: {self.name} timings: {self.timings} url: {url_api}"
+                )
+                if self.status_code >= 400:
+                    self.cache.set_failure(
+                        what, relation, where, self.status_code, self.status_msg
+                    )
+                else:
+                    # empty results are cached for a shorter time
+                    self.cache.set(
+                        what,
+                        relation,
+                        where,
+                        max_results,
+                        hits=self.results["hits"]["hits"],
+                        positions=positions,
+                        data=self.data,
+                        remote_total=self.remote_total,
                     )
             self.results["hits"]["total"]["value"] = len(self.results["hits"]["hits"])
             self.create_aggregations(self.results)
-        except requests.exceptions.ConnectionError as error:
+        except (
+            requests.exceptions.ConnectionError,
+            requests.exceptions.Timeout,
+        ) as error:
             self.status_code = 433
             self.status_msg = str(error)
         except requests.exceptions.HTTPError as error:
@@ -863,3 +968,152 @@ class RenouvaudImport(Import):
             current_app.config.get("REST_MIMETYPE_QUERY_ARG_NAME", "format"): "marc",
         }
         return url_for("api_imports.import_renouvaud_record", **args)
+
+
+class FederatedImport(object):
+    """Search several import sources concurrently."""
+
+    # identifier types used to detect the same document into several sources
+    deduplication_types = ["bf:Isbn", "bf:Issn", "bf:Ean"]
+
+    def __init__(self, sources, timeout=None):
+        """Init FederatedImport class.
+
+        :param sources: a dictionary with the import class and the maximum
+            number of results by source key (sources order is kept to merge
+            the results).
+        :param timeout: the maximum time (in seconds) to wait for the sources
+            results, `RERO_IMPORT_FEDERATED_TIMEOUT` if not given.
+        """
+        self.sources = sources
+        self.timeout = timeout or current_app.config.get(
+            "RERO_IMPORT_FEDERATED_TIMEOUT"
+        )
+
+    def _search_source(self, key, what, relation, where, no_cache):
+        """Search one source.
+
+        :param key: the source key.
+        :param what: what term to search
+        :param relation: relation for what and where
+        :param where: in witch index to search
+        :param no_cache: do not use cache if true
+        :returns: the source results.
+        """
+        import_class, max_results = self.sources[key]
+        results, status_code = import_class().search_records(
+            what=what,
+            relation=relation,
+            where=where,
+            max_results=max_results,
+            no_cache=no_cache,
+        )
+        data = {
+            "source": key,
+            "status": status_code,
+            "hits": results["hits"]["hits"],
+            "remote_total": results["hits"].get("remote_total", 0),
+        }
+        if errors := results.get("errors"):
+            data["errors"] = errors
+        return data
+
+    def search(self, what, relation="all", where="anywhere", no_cache=False):
+        """Search the sources concurrently.
+
+        The results of each source are yielded as soon as they are available.
+        The sources which don't answer before the timeout are yielded with a
+        408 status. Finally, the merged results are yielded.
+
+        :param what: what term to search
+        :param relation: relation for what and where
+        :param where: in witch index to search
+        :param no_cache: do not use cache if true
+        :returns: a generator of the source results followed by the merged
+            results.
+        """
+        app = current_app._get_current_object()
+
+        def _search(key):
+            with app.app_context():
+                return self._search_source(key, what, relation, where, no_cache)
+
+        results = {}
+        executor = ThreadPoolExecutor(max_workers=max(len(self.sources), 1))
+        futures = {}
+        for key in self.sources:
+            # links to the records need the current request
+            search = _search
+            if has_request_context():
+                search = copy_current_request_context(_search)
+            futures[executor.submit(search, key)] = key
+        try:
+            for future in as_completed(futures, timeout=self.timeout):
+                key = futures[future]
+                try:
+                    data = future.result()
+                except Exception as error:
+                    current_app.logger.error(f"Import: {key} error: {error}")
+                    data = {
+                        "source": key,
+                        "status": 500,
+                        "hits": [],
+                        "errors": {"code": 500, "message": str(error)},
+                    }
+                results[key] = data
+                yield data
+        except FuturesTimeoutError:
+            for future, key in futures.items():
+                if key not in results:
+                    future.cancel()
+                    yield {
+                        "source": key,
+                        "status": 408,
+                        "hits": [],
+                        "errors": {"code": 408, "message": "Timeout."},
+                    }
+        finally:
+            executor.shutdown(wait=False)
+        hits = self.merge([results[key] for key in self.sources if key in results])
+        yield {"merged": {"hits": hits, "total": len(hits)}}
+
+    @classmethod
+    def get_identifiers(cls, hit):
+        """Get the identifiers used to deduplicate a hit.
+
+        :param hit: the import hit.
+        :returns: a set of (type, normalized value).
+        """
+        return {
+            (identifier["type"], identifier["value"].replace("-", "").upper())
+            for identifier in hit.get("metadata", {}).get("identifiedBy", [])
+            if identifier.get("type") in cls.deduplication_types
+            and identifier.get("value")
+        }
+
+    @classmethod
+    def merge(cls, results):
+        """Merge and deduplicate the hits of several sources.
+
+        A hit sharing an identifier with a previous hit is not kept, its
+        source and id are added to the `duplicates` of the kept hit.
+
+        :param results: the list of the source results (priority order).
+        :returns: the list of merged hits.
+        """
+        hits = []
+        known = {}
+        for data in results:
+            for hit in data["hits"]:
+                identifiers = cls.get_identifiers(hit)
+                if duplicate := next(
+                    (known[ident] for ident in identifiers if ident in known), None
+                ):
+                    duplicate.setdefault("duplicates", []).append(
+                        {"source": data["source"], "id": hit["id"]}
+                    )
+                    continue
+                hit = dict(hit, source_key=data["source"])
+                hits.append(hit)
+                known |= {ident: hit for ident in identifiers}
+        return hits
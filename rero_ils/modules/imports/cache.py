@@ -0,0 +1,189 @@
+# -*- coding: utf-8 -*-
+#
+# RERO ILS
+# Copyright (C) 2019-2024 RERO
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, version 3 of the License.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+"""Cache of the import search results."""
+
+import json
+import zlib
+from datetime import timedelta
+
+from dojson.utils import GroupableOrderedDict
+from flask import current_app
+from redis import Redis
+
+from ..monitoring.metrics import Metrics
+
+
+def marc_to_plain(value):
+    """Convert a MARC JSON record to JSON serializable data.
+
+    :param value: the MARC JSON record (or one of its values).
+    :returns: the same data with dicts and lists.
+    """
+    if isinstance(value, dict):
+        # the raw items keep the `__order__` key and the repeated values
+        return {key: marc_to_plain(val) for key, val in dict.items(value)}
+    if isinstance(value, (list, tuple)):
+        return [marc_to_plain(val) for val in value]
+    return value
+
+
+def plain_to_marc(value):
+    """Rebuild a MARC JSON record from `marc_to_plain` data.
+
+    :param value: the JSON data.
+    :returns: the MARC JSON record (or one of its values).
+    """
+    if isinstance(value, dict):
+        data = {key: plain_to_marc(val) for key, val in value.items()}
+        return GroupableOrderedDict(data) if "__order__" in data else data
+    if isinstance(value, list):
+        return tuple(plain_to_marc(val) for val in value)
+    return value
+
+
+class ImportCache(object):
+    """Cache of the import search results of a source.
+
+    Entries are zlib compressed JSON documents stored into Redis. An entry
+    contains the hits of a query with their position into the source response,
+    so a query asking less records is served from an entry with more records.
+    Empty results and source failures are cached for a shorter time.
+    """
+
+    metrics_namespace = "import_cache"
+
+    def __init__(self, name):
+        """Init ImportCache class.
+
+        :param name: the import source name.
+        """
+        config = current_app.config
+        self.name = name
+        self.redis = Redis.from_url(config.get("RERO_IMPORT_CACHE"))
+        self.expire = timedelta(minutes=config.get("RERO_IMPORT_CACHE_EXPIRE"))
+        self.negative_expire = timedelta(
+            seconds=config.get("RERO_IMPORT_CACHE_NEGATIVE_EXPIRE")
+        )
+
+    def get_key(self, what, relation, where):
+        """Get the cache key of a query.
+
+        :param what: what term to search
+        :param relation: relation for what and where
+        :param where: in witch index to search
+        :returns: the cache key.
+        """
+        return f"import:{self.name}:{where}:{relation}:{what}"
+
+    def get(self, what, relation, where, max_results):
+        """Get the cached results of a query.
+
+        :param what: what term to search
+        :param relation: relation for what and where
+        :param where: in witch index to search
+        :param max_results: maximum records to search
+        :returns: a dict with the `status` and the `hits`, `data` and
+            `remote_total` or the error `message`, `None` if the query isn't
+            cached.
+        """
+        max_results = int(max_results)
+        raw = self.redis.get(self.get_key(what, relation, where))
+        entry = json.loads(zlib.decompress(raw)) if raw else None
+        if entry is None or (
+            entry.get("message") is None
+            and entry["max_results"] < max_results
+            and entry["remote_total"] > entry["max_results"]
+        ):
+            Metrics.incr(self.metrics_namespace, "miss")
+            return
+        if entry.get("message") is not None:
+            Metrics.incr(self.metrics_namespace, "negative_hit")
+            return entry
+        Metrics.incr(self.metrics_namespace, "hit")
+        # keep only the hits of the first `max_results` source records
+        hits = []
+        data = []
+        for position, hit, marc in zip(
+            entry["positions"], entry["hits"], entry["data"]
+        ):
+            if position < max_results:
+                hits.append(hit)
+                data.append(plain_to_marc(marc))
+        return {
+            "status": entry["status"],
+            "hits": hits,
+            "data": data,
+            "remote_total": entry["remote_total"] if hits else 0,
+        }
+
+    def set(
+        self, what, relation, where, max_results, hits, positions, data, remote_total
+    ):
+        """Cache the results of a query.
+
+        An existing entry containing more records is kept.
+
+        :param what: what term to search
+        :param relation: relation for what and where
+        :param where: in witch index to search
+        :param max_results: maximum records to search
+        :param hits: the result hits.
+        :param positions: the position of each hit into the source response.
+        :param data: the MARC JSON record of each hit.
+        :param remote_total: the number of records of the source.
+        """
+        max_results = int(max_results)
+        key = self.get_key(what, relation, where)
+        if raw := self.redis.get(key):
+            entry = json.loads(zlib.decompress(raw))
+            if entry.get("max_results", 0) > max_results:
+                return
+        entry = {
+            "status": 200,
+            "max_results": max_results,
+            "remote_total": remote_total,
+            "hits": hits,
+            "positions": positions,
+            "data": [marc_to_plain(marc) for marc in data],
+        }
+        expire = self.expire if hits else self.negative_expire
+        self._store(key, entry, expire)
+
+    def set_failure(self, what, relation, where, status, message):
+        """Cache a source failure for a query.
+
+        :param what: what term to search
+        :param relation: relation for what and where
+        :param where: in witch index to search
+        :param status: the error status code.
+        :param message: the error message.
+        """
+        entry = {"status": status, "message": message}
+        self._store(self.get_key(what, relation, where), entry, self.negative_expire)
+
+    def _store(self, key, entry, expire):
+        """Compress and store an entry.
+
+        :param key: the cache key.
+        :param entry: the entry to store.
+        :param expire: the entry time to live.
+        """
+        payload = zlib.compress(json.dumps(entry).encode())
+        self.redis.setex(key, expire, value=payload)
+        Metrics.incr(self.metrics_namespace, "stored")
+        Metrics.incr(self.metrics_namespace, "stored_bytes", len(payload))
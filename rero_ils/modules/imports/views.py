@@ -20,13 +20,17 @@
 
 from __future__ import absolute_import, print_function
 
-from flask import Blueprint, current_app, jsonify
+import json
+
+from flask import Blueprint, abort, current_app, jsonify
 from flask import request as flask_request
+from flask import stream_with_context
 from invenio_records_rest.utils import obj_or_import_string
 from invenio_rest import ContentNegotiatedMethodView
 
 from rero_ils.modules.decorators import check_logged_as_librarian
 
+from .api import FederatedImport
 from .exceptions import ResultNotFoundOnTheRemoteServer
 from .serializers import (
     json_record_serializer_factory,
@@ -42,13 +46,75 @@ api_blueprint = Blueprint("api_import", __name__, url_prefix="/imports")
 @check_logged_as_librarian
 def get_config():
     """Get configuration from config.py."""
-    sources = current_app.config.get("RERO_IMPORT_REST_ENDPOINTS", {}).values()
+    sources = [
+        dict(source)
+        for source in current_app.config.get("RERO_IMPORT_REST_ENDPOINTS", {}).values()
+    ]
     for source in sources:
         source.pop("import_class", None)
         source.pop("import_size", None)
     return jsonify(sorted(sources, key=lambda s: s.get("weight", 100)))
 
 
+def split_query(query):
+    """Split an import query.
+
+    :param query: the query (`where:relation:what` or only `what`).
+    :returns: a tuple with the where, relation and what values.
+    """
+    try:
+        query_split = query.split(":")
+        where = query_split[0]
+        relation = query_split[1]
+        what = ":".join(query_split[2:])
+    except Exception:
+        where = "anywhere"
+        relation = "all"
+        what = query
+    return where, relation, what
+
+
+@api_blueprint.route("/federated/", methods=["GET"])
+@check_logged_as_librarian
+def federated_search():
+    """Search several import sources concurrently.
+
+    The results are streamed as JSON lines: one line by source as soon as its
+    results are available, then one line with the merged and deduplicated
+    hits of all sources.
+    """
+    endpoints = current_app.config.get("RERO_IMPORT_REST_ENDPOINTS", {})
+    keys = list(endpoints)
+    if sources := flask_request.args.get("sources"):
+        keys = sources.split(",")
+        if any(key not in endpoints for key in keys):
+            abort(400)
+    keys.sort(key=lambda key: endpoints[key].get("weight", 100))
+    size = flask_request.args.get("size", type=int)
+    if "size" in flask_request.args and (size is None or size <= 0):
+        abort(400)
+    federated_import = FederatedImport(
+        {
+            key: (
+                obj_or_import_string(endpoints[key]["import_class"]),
+                size or endpoints[key].get("import_size", 50),
+            )
+            for key in keys
+        }
+    )
+    where, relation, what = split_query(flask_request.args.get("q"))
+    results = federated_import.search(
+        what=what,
+        relation=relation,
+        where=where,
+        no_cache=bool(flask_request.args.get("no_cache")),
+    )
+    return current_app.response_class(
+        stream_with_context(json.dumps(data) + "\n" for data in results),
+        mimetype="application/x-ndjson",
+    )
+
+
 class ImportsListResource(ContentNegotiatedMethodView):
     """Imports REST resource."""
 
@@ -76,16 +142,7 @@ class ImportsListResource(ContentNegotiatedMethodView):
     def get(self, **kwargs):
         """Implement the GET."""
         no_cache = True if flask_request.args.get("no_cache") else False
-        query = flask_request.args.get("q")
-        try:
-            query_split = query.split(":")
-            where = query_split[0]
-            relation = query_split[1]
-            what = ":".join(query_split[2:])
-        except Exception:
-            where = "anywhere"
-            relation = "all"
-            what = query
+        where, relation, what = split_query(flask_request.args.get("q"))
         size = flask_request.args.get("size", self.import_size)
         do_import = self.import_class()
         results, status_code = do_import.search_records(
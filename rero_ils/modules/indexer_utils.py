@@ -19,10 +19,27 @@
 """Utility functions for indexer data processing."""
 
 import re
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
 
-from flask import current_app
+from flask import current_app, g, has_app_context
 from invenio_indexer.utils import schema_to_index
-from invenio_search import current_search
+from invenio_search import current_search, current_search_client
+from invenio_search.utils import build_alias_name
+
+from .monitoring.metrics import Metrics
+
+#: Available refresh policies for single record writes.
+#:   - `true`: refresh the index immediately (default, synchronous).
+#:   - `wait_for`: wait until the next periodic refresh of the index.
+#:   - `deferred`: do not refresh at write time, refresh all touched indices
+#:     only once at the end of the current application context (request,
+#:     celery task or CLI command).
+#:   - `none`: never refresh, the periodic index refresh is enough.
+REFRESH_POLICIES = ["true", "wait_for", "deferred", "none"]
+
+_refresh_policy_override = ContextVar("refresh_policy_override", default=None)
 
 
 def record_to_index(record):
@@ -48,3 +65,154 @@ def record_to_index(record):
         return index
     else:
         return current_app.config["INDEXER_DEFAULT_INDEX"]
+
+
+def get_refresh_policy(pid_type=None, default=None):
+    """Get the refresh policy to use for a single record write.
+
+    The policy is resolved in the following order:
+      1. a call site policy set by the `refresh_policy` context manager.
+      2. the policy defined for the record type into the
+         `RERO_ILS_INDEXER_REFRESH_POLICIES` configuration.
+      3. the given default policy (indexer class policy).
+      4. the `RERO_ILS_INDEXER_REFRESH_POLICY` configuration.
+
+    :param pid_type: the record pid type.
+    :param default: the indexer class policy.
+    :returns: the refresh policy name.
+    """
+    if policy := _refresh_policy_override.get():
+        return policy
+    config = current_app.config
+    policy = (
+        config.get("RERO_ILS_INDEXER_REFRESH_POLICIES", {}).get(pid_type)
+        or default
+        or config.get("RERO_ILS_INDEXER_REFRESH_POLICY", "true")
+    )
+    if policy not in REFRESH_POLICIES:
+        raise ValueError(f"Unknown refresh policy: {policy}")
+    return policy
+
+
+@contextmanager
+def refresh_policy(policy):
+    """Force the refresh policy for all record writes of a code block.
+
+    When the `deferred` policy is used, the touched indices are refreshed
+    when leaving the block.
+
+    usage::
+
+        with refresh_policy("deferred"):
+            for item in items:
+                item.reindex()
+
+    :param policy: the refresh policy name.
+    """
+    if policy not in REFRESH_POLICIES:
+        raise ValueError(f"Unknown refresh policy: {policy}")
+    token = _refresh_policy_override.set(policy)
+    try:
+        yield
+    finally:
+        _refresh_policy_override.reset(token)
+        if policy == "deferred":
+            flush_deferred_refresh()
+
+
+def refresh_argument(index, policy):
+    """Get the ES `refresh` argument for a write and register deferred ones.
+
+    :param index: the index name (without prefix) of the written record.
+    :param policy: the refresh policy name.
+    :returns: the value of the ES `refresh` parameter.
+    """
+    Metrics.incr("indexer_refresh", policy)
+    if policy == "true":
+        return "true"
+    # a refresh of the index has been avoided
+    Metrics.incr("indexer_refresh", "avoided")
+    if policy == "wait_for":
+        return "wait_for"
+    if policy == "deferred" and has_app_context():
+        if "rero_ils_deferred_refresh" not in g:
+            g.rero_ils_deferred_refresh = set()
+        g.rero_ils_deferred_refresh.add(index)
+    return "false"
+
+
+def flush_deferred_refresh(exception=None):
+    """Refresh once all indices touched with the `deferred` policy.
+
+    Registered as an application context teardown, it is called at the end
+    of each request, celery task or CLI command.
+
+    :param exception: the exception raised by the application context if any.
+    """
+    if not has_app_context():
+        return
+    indices = g.pop("rero_ils_deferred_refresh", None)
+    if not indices:
+        return
+    try:
+        current_search_client.indices.refresh(
+            index=",".join(build_alias_name(index) for index in sorted(indices))
+        )
+        Metrics.incr("indexer_refresh", "deferred_flushed", len(indices))
+    except Exception as err:
+        current_app.logger.error(f"Deferred index refresh error: {err}")
+
+
+class IndexEnrichers:
+    """Registry of the functions enriching the indexed data by index.
+
+    Instead of connecting each enrichment function to the
+    `before_record_index` signal, which calls all of them for each indexed
+    record, only the registry is connected and it calls the functions
+    registered for the index of the record. The time spent into each
+    function is counted into the `index_enrichers` metrics.
+
+    The functions have the `before_record_index` receiver signature.
+    """
+
+    metrics_namespace = "index_enrichers"
+
+    def __init__(self):
+        """Constructor."""
+        # enrichment functions by index name (without version)
+        self.enrichers = {}
+
+    def register(self, index, func):
+        """Register an enrichment function.
+
+        :param index: the index name without version (ie: `items`).
+        :param func: the enrichment function.
+        """
+        self.enrichers.setdefault(index, []).append(func)
+
+    def get(self, index):
+        """Get the enrichment functions of an index.
+
+        :param index: the index name, with or without version.
+        :returns: the list of enrichment functions.
+        """
+        return self.enrichers.get(index.split("-")[0], [])
+
+    def dispatch(self, sender, index=None, **kwargs):
+        """Call the enrichment functions of the indexed record.
+
+        Connected to the `before_record_index` signal.
+
+        :param sender: the sender of the signal.
+        :param index: the index in which the record will be indexed.
+        :param kwargs: the other signal arguments (json, record, ...).
+        """
+        for func in self.get(index or ""):
+            start = time.perf_counter()
+            func(sender, index=index, **kwargs)
+            Metrics.incr(self.metrics_namespace, f"{func.__name__}_calls")
+            Metrics.incr(
+                self.metrics_namespace,
+                f"{func.__name__}_time",
+                time.perf_counter() - start,
+            )
@@ -26,7 +26,12 @@ from elasticsearch.exceptions import NotFoundError
 from elasticsearch_dsl import Q
 from invenio_search import current_search_client
 
-from rero_ils.modules.api import IlsRecordError, IlsRecordsIndexer, IlsRecordsSearch
+from rero_ils.modules.api import (
+    IlsRecordError,
+    IlsRecordsIndexer,
+    IlsRecordsSearch,
+    ReindexCoordinator,
+)
 from rero_ils.modules.documents.api import DocumentsSearch
 from rero_ils.modules.fetchers import id_fetcher
 from rero_ils.modules.item_types.api import ItemTypesSearch
@@ -304,7 +309,7 @@ class ItemsIndexer(IlsRecordsIndexer):
         # reindex the holding / doc for non circulation operations
         holding_pid = extracted_data_from_ref(record.get("holding"))
         holding = Holding.get_record_by_pid(holding_pid)
-        holding.reindex()
+        ReindexCoordinator.reindex(holding)
         # reindex the old holding
         old_holding_pid = None
         if es_item:
@@ -312,7 +317,7 @@ class ItemsIndexer(IlsRecordsIndexer):
             old_holding_pid = es_item.get("holding", {}).get("pid")
             if old_holding_pid != holding_pid:
                 old_holding = Holding.get_record_by_pid(old_holding_pid)
-                old_holding.reindex()
+                ReindexCoordinator.reindex(old_holding)
         return return_value
 
     def delete(self, record):
@@ -333,7 +338,7 @@ class ItemsIndexer(IlsRecordsIndexer):
                 deleted = True
         if not deleted:
             # for items count
-            holding.reindex()
+            ReindexCoordinator.reindex(holding)
         return return_value
 
     def bulk_index(self, record_id_iterator):
@@ -543,7 +543,9 @@ class ItemRecord(IlsRecord):
     @property
     def organisation_view(self):
         """Get Organisation view for item."""
-        organisation = Organisation.get_record_by_pid(self.organisation_pid)
+        organisation = Organisation.get_record_by_pid(
+            self.organisation_pid, read_only=True
+        )
         return organisation["view_code"]
 
     def get_owning_pickup_location_pid(self):
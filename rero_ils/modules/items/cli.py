@@ -28,6 +28,7 @@ from random import randint
 import click
 from flask.cli import with_appcontext
 
+from ..api import ReindexCoordinator
 from ..documents.api import Document
 from ..holdings.models import HoldingIdentifier
 from ..item_types.api import ItemType
@@ -62,7 +63,11 @@ class StreamArray(list):
 @with_appcontext
 def reindex_items():
     """Reindexing of item."""
-    with click.progressbar(Item.get_all_ids(), length=Item.count()) as bar:
+    # holdings and documents are reindexed only once at the end.
+    with (
+        ReindexCoordinator(),
+        click.progressbar(Item.get_all_ids(), length=Item.count()) as bar,
+    ):
         for uuid in bar:
             item = Item.get_record(uuid)
             item.reindex()
@@ -43,6 +43,7 @@ from rero_ils.modules.utils import (
     strtotime,
 )
 
+from .calendar import LibraryCalendar
 from .exceptions import LibraryNeverOpen
 from .extensions import LibraryCalendarChangesExtension
 from .models import LibraryAddressType, LibraryIdentifier, LibraryMetadata
@@ -223,6 +224,38 @@ class Library(IlsRecord):
                 return True
         return False
 
+    def _get_calendar(self, *days):
+        """Get the precomputed calendar usable for some days.
+
+        The precomputed calendar is only usable for UTC dates (naive dates are
+        considered as UTC) into the calendar horizon.
+
+        :param days: the dates or day ordinals to check.
+        :returns: the library calendar, `None` if it can't be used.
+        """
+        if any(isinstance(day, datetime) and day.utcoffset() for day in days):
+            return
+        days = [day.toordinal() if isinstance(day, datetime) else day for day in days]
+        calendar = LibraryCalendar.get(self)
+        if calendar and calendar.covers(*days):
+            return calendar
+
+    def _get_days_interval(self, start_date, end_date):
+        """Get the days ordinals checked between two dates.
+
+        Days are checked from `start_date` (with the same time) while the day
+        is before the day after `end_date`.
+
+        :param start_date: the interval start date.
+        :param end_date: the interval end date.
+        :returns: the first and the last day ordinals.
+        """
+        day_count, remainder = divmod(
+            end_date + timedelta(days=1) - start_date, timedelta(days=1)
+        )
+        first_day = start_date.toordinal()
+        return first_day, first_day + day_count + bool(remainder) - 1
+
     def _get_exceptions_matching_date(self, date_to_check, day_only=False):
         """Get all exception matching a given date."""
         for exception in self.get("exception_dates", []):
@@ -276,6 +309,9 @@ class Library(IlsRecord):
         if isinstance(date, datetime) and date.tzinfo is None:
             date = date.replace(tzinfo=pytz.utc)
 
+        if day_only and (calendar := self._get_calendar(date)):
+            return calendar.is_open(date.toordinal())
+
         # STEP 1 :: check about regular rules
         #   Each library could define if a specific weekday is open or closed.
         #   Check into this weekday array if the day is open/closed. If the
@@ -329,9 +365,13 @@ class Library(IlsRecord):
         if isinstance(date, str):
             date = parser.parse(date)
         add_day = -1 if previous else 1
-        date += timedelta(days=add_day)
-        while not self.is_open(date=date, day_only=True):
+        calendar = self._get_calendar(date)
+        if calendar and (day := calendar.next_open(date.toordinal(), previous)):
+            date += timedelta(days=day - date.toordinal())
+        else:
             date += timedelta(days=add_day)
+            while not self.is_open(date=date, day_only=True):
+                date += timedelta(days=add_day)
         if not ensure:
             return date
         opening_hour = self._get_opening_hour_by_day(date.strftime("%A"))
@@ -347,6 +387,15 @@ class Library(IlsRecord):
         if isinstance(end_date, str):
             end_date = date_string_to_utc(end_date)
 
+        first_day, last_day = self._get_days_interval(start_date, end_date)
+        if first_day > last_day:
+            return []
+        if calendar := self._get_calendar(start_date, end_date, last_day):
+            return [
+                start_date + timedelta(days=day - first_day)
+                for day in calendar.get_open_days(first_day, last_day)
+            ]
+
         dates = []
         end_date += timedelta(days=1)
         while end_date > start_date:
@@ -359,6 +408,15 @@ class Library(IlsRecord):
         """Get number of open day between date interval."""
         start_date = start_date or datetime.now(pytz.utc)
         end_date = end_date or datetime.now(pytz.utc)
+        if isinstance(start_date, str):
+            start_date = date_string_to_utc(start_date)
+        if isinstance(end_date, str):
+            end_date = date_string_to_utc(end_date)
+        first_day, last_day = self._get_days_interval(start_date, end_date)
+        if first_day > last_day:
+            return 0
+        if calendar := self._get_calendar(start_date, end_date, last_day):
+            return calendar.count_open(first_day, last_day)
         return len(self.get_open_days(start_date, end_date))
 
     def in_working_days(self, count, date=None):
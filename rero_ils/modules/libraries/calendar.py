@@ -0,0 +1,230 @@
+# -*- coding: utf-8 -*-
+#
+# RERO ILS
+# Copyright (C) 2019-2024 RERO
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, version 3 of the License.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+"""Precomputed opening calendar of a library."""
+
+import json
+from bisect import bisect_left, bisect_right
+from datetime import date, datetime, time
+from threading import Lock
+
+import pytz
+from dateutil.rrule import FREQNAMES, rrule
+from flask import current_app
+
+from rero_ils.modules.monitoring.metrics import Metrics
+from rero_ils.modules.utils import date_string_to_utc
+
+
+class LibraryCalendar:
+    """Precomputed opening days of a library.
+
+    The day level opening status of a library (the result of
+    `Library.is_open(date, day_only=True)`) is computed once for each day of
+    a rolling horizon around today. Days are identified by their UTC date
+    ordinal. The open days are kept into a sorted list, so the status of a day
+    is known in O(1) and the open days of an interval or the next open day are
+    found in O(log n).
+
+    Calendars are kept into the process memory. A calendar is rebuilt when
+    the library opening hours or exception dates change or when the horizon
+    moves (once a day).
+    """
+
+    _lock = Lock()
+    _calendars = {}
+
+    def __init__(self, first_day, status):
+        """Initialization method.
+
+        :param first_day: the ordinal of the first day of the horizon.
+        :param status: the opening status of each day of the horizon.
+        """
+        self.first_day = first_day
+        self.last_day = first_day + len(status) - 1
+        self.status = status
+        self.open_days = [
+            first_day + offset for offset, is_open in enumerate(status) if is_open
+        ]
+
+    @classmethod
+    def get(cls, library):
+        """Get the calendar of a library.
+
+        :param library: the `Library` record.
+        :returns: the library calendar, `None` if the library calendar can't
+            be precomputed.
+        """
+        today = datetime.now(pytz.utc).toordinal()
+        config = current_app.config
+        first_day = today - config.get("RERO_ILS_LIBRARY_CALENDAR_PAST_DAYS", 0)
+        last_day = today + config.get("RERO_ILS_LIBRARY_CALENDAR_FUTURE_DAYS", 0)
+        opening_hours = library.get("opening_hours", [])
+        exception_dates = library.get("exception_dates", [])
+        fingerprint = (
+            first_day,
+            last_day,
+            json.dumps([opening_hours, exception_dates], sort_keys=True),
+        )
+        with cls._lock:
+            cached = cls._calendars.get(library.pid)
+        if cached and cached[0] == fingerprint:
+            Metrics.incr("library_calendar", "hit")
+            return cached[1]
+        Metrics.incr("library_calendar", "miss")
+        calendar = cls.build(opening_hours, exception_dates, first_day, last_day)
+        with cls._lock:
+            cls._calendars[library.pid] = (fingerprint, calendar)
+        return calendar
+
+    @classmethod
+    def invalidate(cls, library_pid):
+        """Remove the calendar of a library from the memory.
+
+        :param library_pid: the library pid.
+        """
+        with cls._lock:
+            cls._calendars.pop(library_pid, None)
+
+    @classmethod
+    def build(cls, opening_hours, exception_dates, first_day, last_day):
+        """Compute the opening status of each day of a horizon.
+
+        :param opening_hours: the library opening hours.
+        :param exception_dates: the library exception dates.
+        :param first_day: the ordinal of the first day of the horizon.
+        :param last_day: the ordinal of the last day of the horizon.
+        :returns: the library calendar, `None` if an exception date isn't
+            defined by UTC days.
+        """
+        # STEP 1 :: regular rules, the first rule of a weekday is used.
+        rules = {}
+        for rule in opening_hours:
+            rules.setdefault(rule["day"], rule.get("is_open", False))
+        weekdays = [
+            rules.get(
+                date.fromordinal(first_day + offset).strftime("%A").lower(), False
+            )
+            for offset in range(7)
+        ]
+        status = bytearray(last_day - first_day + 1)
+        for offset in range(len(status)):
+            status[offset] = weekdays[offset % 7]
+
+        # STEP 2 :: exception dates, the last matching exception wins.
+        for exception in exception_dates:
+            day_ranges = cls._get_exception_day_ranges(exception, last_day)
+            if day_ranges is None:
+                return
+            value = exception["is_open"]
+            for start, end in day_ranges:
+                start, end = max(start, first_day), min(end, last_day)
+                if start <= end:
+                    status[start - first_day : end - first_day + 1] = bytes([value]) * (
+                        end - start + 1
+                    )
+        return cls(first_day, status)
+
+    @staticmethod
+    def _get_exception_day_ranges(exception, last_day):
+        """Get the day ranges matching an exception date.
+
+        A repeatable exception matches a day if the latest occurrence before
+        this day covers it (see `Library._get_exceptions_matching_date`).
+
+        :param exception: the exception date.
+        :param last_day: the ordinal of the last day of the horizon.
+        :returns: a list of (start, end) ordinals, `None` if the exception
+            isn't defined by UTC days.
+        """
+        start_date = date_string_to_utc(exception["start_date"])
+        end_date = start_date
+        if exception.get("end_date"):
+            end_date = date_string_to_utc(exception["end_date"])
+        if start_date.utcoffset() or end_date.utcoffset() or start_date.time():
+            return
+        if not (repeat := exception.get("repeat")):
+            return [(start_date.toordinal(), end_date.toordinal())]
+
+        day_gap = (end_date - start_date).days
+        occurrences = [
+            occurrence.toordinal()
+            for occurrence in rrule(
+                freq=FREQNAMES.index(repeat["period"].upper()),
+                until=datetime.combine(date.fromordinal(last_day), time(), pytz.utc),
+                interval=repeat["interval"],
+                dtstart=start_date,
+            )
+        ]
+        day_ranges = []
+        for idx, occurrence in enumerate(occurrences):
+            end = occurrence + day_gap
+            # the next occurrence hides the end of this one
+            if idx + 1 < len(occurrences):
+                end = min(end, occurrences[idx + 1] - 1)
+            day_ranges.append((occurrence, end))
+        return day_ranges
+
+    def covers(self, *days):
+        """Check if days are into the calendar horizon.
+
+        :param days: the day ordinals to check.
+        """
+        return all(self.first_day <= day <= self.last_day for day in days)
+
+    def is_open(self, day):
+        """Check if the library is open for a day.
+
+        :param day: the day ordinal.
+        """
+        return bool(self.status[day - self.first_day])
+
+    def get_open_days(self, first_day, last_day):
+        """Get the open days of an interval.
+
+        :param first_day: the first day ordinal (included).
+        :param last_day: the last day ordinal (included).
+        :returns: the sorted list of open day ordinals.
+        """
+        return self.open_days[
+            bisect_left(self.open_days, first_day) : bisect_right(
+                self.open_days, last_day
+            )
+        ]
+
+    def count_open(self, first_day, last_day):
+        """Get the number of open days of an interval.
+
+        :param first_day: the first day ordinal (included).
+        :param last_day: the last day ordinal (included).
+        """
+        return bisect_right(self.open_days, last_day) - bisect_left(
+            self.open_days, first_day
+        )
+
+    def next_open(self, day, previous=False):
+        """Get the next (or previous) open day.
+
+        :param day: the day ordinal (excluded).
+        :param previous: search the previous open day.
+        :returns: the open day ordinal, `None` if not found into the horizon.
+        """
+        if previous:
+            idx = bisect_left(self.open_days, day) - 1
+            return self.open_days[idx] if idx >= 0 else None
+        idx = bisect_right(self.open_days, day)
+        return self.open_days[idx] if idx < len(self.open_days) else None
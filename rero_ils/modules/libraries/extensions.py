@@ -22,6 +22,7 @@ from deepdiff import DeepDiff
 from invenio_cache import current_cache
 from invenio_records.extensions import RecordExtension
 
+from .calendar import LibraryCalendar
 from .tasks import calendar_changes_update_loans
 
 
@@ -72,6 +73,7 @@ class LibraryCalendarChangesExtension(RecordExtension):
         """
         if self._changes_detected:
             self._changes_detected = False  # Reset changes detection
+            LibraryCalendar.invalidate(record.pid)
             task = calendar_changes_update_loans.s(record).apply_async()
             self._cache_current_task(record, task)
 
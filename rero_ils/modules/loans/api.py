@@ -18,7 +18,6 @@
 
 """API for manipulating Loans."""
 import math
-from bisect import bisect_right
 from datetime import datetime, timedelta, timezone
 
 import ciso8601
@@ -643,13 +642,13 @@ class Loan(IlsRecord):
     @property
     def library_pid(self):
         """Get library PID regarding loan location."""
-        return Location.get_record_by_pid(self.location_pid).library_pid
+        return Location.get_record_by_pid(self.location_pid, read_only=True).library_pid
 
     @property
     def checkout_library_pid(self):
         """Get the checkout library pid."""
         if checkout_location := Location.get_record_by_pid(
-            self.get("checkout_location_pid")
+            self.get("checkout_location_pid"), read_only=True
         ):
             return checkout_location.library_pid
 
@@ -674,7 +673,9 @@ class Loan(IlsRecord):
     def pickup_library(self):
         """Get the library pid related to the pickup location."""
         if location_pid := self.pickup_location_pid:
-            return Location.get_record_by_pid(location_pid).get_library()
+            return Location.get_record_by_pid(
+                location_pid, read_only=True
+            ).get_library()
 
     @property
     def pickup_location_pid(self):
@@ -690,7 +691,7 @@ class Loan(IlsRecord):
     def transaction_library_pid(self):
         """Get loan transaction_library PID."""
         return (
-            Location.get_record_by_pid(self.transaction_location_pid)
+            Location.get_record_by_pid(self.transaction_location_pid, read_only=True)
             .get_library()
             .get("pid")
         )
@@ -713,9 +714,17 @@ class Loan(IlsRecord):
                   ...
                 ]
         """
-        from .utils import get_circ_policy
+        return self._get_overdue_fees()
+
+    def _get_overdue_fees(self, libraries=None):
+        """Compute all overdue fees based on incremental fees setting.
+
+        :param libraries: a dictionary of already loaded libraries by pid.
+            Loaded libraries are added to it.
+        :return: An array of tuple (see `get_overdue_fees`).
+        """
+        from .utils import compute_overdue_fees, get_circ_policy
 
-        fees = []
         # if the loan isn't "late", no need to continue.
         #   !!! there is a difference between "is_late" and "is_overdue" :
         #   * 'is_late' only check the loan end_date
@@ -725,7 +734,7 @@ class Loan(IlsRecord):
         #   consider any loan as "overdue". But as we use the checkout location
         #   to compute the fees, we need only need to know if loan is late.
         if not self.is_loan_late():
-            return fees
+            return []
 
         # find the circulation policy corresponding to the loan and check if
         # some 'overdue_fees' settings exists. If not, no need to continue.
@@ -734,47 +743,25 @@ class Loan(IlsRecord):
         cipo = get_circ_policy(self, checkout_location=True)
         overdue_settings = cipo.get("overdue_fees")
         if overdue_settings is None:
-            return fees
+            return []
 
         # At this point, we know that we need to compute an overdue amount.
-        # Initialize some useful variables to perform the job.
-        loan_lib = Library.get_record_by_pid(self.checkout_library_pid)
+        libraries = {} if libraries is None else libraries
+        library_pid = self.checkout_library_pid
+        if library_pid not in libraries:
+            libraries[library_pid] = Library.get_record_by_pid(
+                library_pid, read_only=True
+            )
+        loan_lib = libraries[library_pid]
         # add 1 day to end_date because the first overdue_date is next day
         # after the due date
         end_date = date_string_to_utc(self.end_date) + timedelta(days=1)
-        total = 0
-        max_overdue = overdue_settings.get("maximum_total_amount", math.inf)
-        intervals = cipo.get_overdue_intervals()
-        interval_lower_bounds = [inter["from"] for inter in intervals]
-
-        # For each overdue day, we need to find the correct fee_amount to
-        # charge. In the bellowed loop, `day_idx' is the day number from the
-        # due date ; `day` is the datetime of this day
-
-        for day_idx, day in enumerate(loan_lib.get_open_days(end_date), 1):
-            # replace the hour to start of the day :: an overdue start at
-            # at the beginning of the day
-            day = day.replace(hour=0, minute=0, second=0, microsecond=0, tzinfo=None)
-            day = loan_lib.get_timezone().localize(day)
-            # a) find the correct interval.
-            # b) check the index found exist into intervals
-            # c) check the upper limit of this interval is grower or equal
-            #    to day index
-            interval_idx = bisect_right(interval_lower_bounds, day_idx) - 1
-            if interval_idx == -1:
-                continue
-            if day_idx > intervals[interval_idx]["to"]:
-                continue
-            # d) add the corresponding fee_amount to the fees array.
-            # e) if maximum_overdue is reached, exit the loop
-            fee_amount = intervals[interval_idx]["fee_amount"]
-            gap = round(max_overdue - total, 2)
-            fee_amount = min(fee_amount, gap)
-            total = round(math.fsum([total, fee_amount]), 2)
-            fees.append((fee_amount, day))
-            if max_overdue <= total:
-                break
-        return fees
+        return compute_overdue_fees(
+            open_days=loan_lib.get_open_days(end_date),
+            intervals=cipo.get_overdue_intervals(),
+            maximum_total_amount=overdue_settings.get("maximum_total_amount", math.inf),
+            tz=loan_lib.get_timezone(),
+        )
 
     def is_notified(self, notification_type=None, counter=0):
         """Check if a notification already exists for a loan by type."""
@@ -872,6 +859,23 @@ class Loan(IlsRecord):
 
         return candidates
 
+    def get_notification_data(self, notification_type, counter=None):
+        """Get the data of a notification related to this loan.
+
+        :param notification_type: the notification type.
+        :param counter: the reminder counter (for OVERDUE or DUE_SOON
+                        notification)
+        :return: the notification data.
+        """
+        data = {
+            "creation_date": datetime.now(timezone.utc).isoformat(),
+            "notification_type": notification_type,
+            "context": {"loan": {"$ref": get_ref_for_pid("loans", self.pid)}},
+        }
+        if counter is not None:
+            data["context"]["reminder_counter"] = counter
+        return data
+
     def create_notification(self, trigger=None, _type=None, counter=0):
         """Creates a notification from base on a loan.
 
@@ -893,11 +897,7 @@ class Loan(IlsRecord):
             # notification where a delay could be configured
             dispatch = n_type in NotificationType.INTERNAL_NOTIFICATIONS
 
-            record = {
-                "creation_date": datetime.now(timezone.utc).isoformat(),
-                "notification_type": n_type,
-                "context": {"loan": {"$ref": get_ref_for_pid("loans", loan.pid)}},
-            }
+            record = loan.get_notification_data(n_type)
             # overdue + due_soon
             if n_type in NotificationType.REMINDERS_NOTIFICATIONS:
                 # Do not recreate if an existing notification already exists.
@@ -1231,26 +1231,42 @@ def get_on_loan_loans_for_library(library_pid):
         yield Loan.get_record(id_)
 
 
-def get_due_soon_loans(tstamp=None):
-    """Return all due_soon loans.
+def _get_due_soon_loans_query(tstamp=None):
+    """Get the query of the due_soon loans (oldest first).
 
     :param tstamp: a limit timestamp. Default is `datetime.now()`.
+    :return: the elasticsearch query.
     """
     end_date = tstamp or datetime.now(timezone.utc)
     end_date = end_date.strftime("%Y-%m-%dT%H:%M:%S.000Z")
-    query = (
+    return (
         current_circulation.loan_search_cls()
         .filter("term", state=LoanState.ITEM_ON_LOAN)
         .filter("range", due_soon_date={"lte": end_date})
         .params(preserve_order=True)
         .sort({"_created": {"order": "asc"}})
-        .source(False)
-        .scan()
     )
-    for hit in query:
+
+
+def get_due_soon_loans(tstamp=None):
+    """Return all due_soon loans.
+
+    :param tstamp: a limit timestamp. Default is `datetime.now()`.
+    """
+    for hit in _get_due_soon_loans_query(tstamp).source(False).scan():
         yield Loan.get_record(hit.meta.id)
 
 
+def get_due_soon_loan_pids(tstamp=None):
+    """Return all due_soon loan pids.
+
+    :param tstamp: a limit timestamp. Default is `datetime.now()`.
+    :return: a list of loan pids
+    """
+    query = _get_due_soon_loans_query(tstamp).source(["pid"])
+    return [hit.pid for hit in query.scan()]
+
+
 def get_expired_request(tstamp=None):
     """Return all expired request.
 
@@ -1269,12 +1285,13 @@ def get_expired_request(tstamp=None):
         yield Loan.get_record(hit.meta.id)
 
 
-def get_overdue_loan_pids(patron_pid=None, tstamp=None):
+def get_overdue_loan_pids(patron_pid=None, tstamp=None, org_pid=None):
     """Return all overdue loan pids optionally filtered for a patron pid.
 
     :param patron_pid: the patron pid. If none, return all overdue loans.
     :param tstamp: a timestamp to define the execution time of the function.
                    Default to `datetime.now()`.
+    :param org_pid: optional parameter to filter by organisation.
     :return: a list of loan pids
     """
     end_date = tstamp or datetime.now(timezone.utc)
@@ -1286,6 +1303,8 @@ def get_overdue_loan_pids(patron_pid=None, tstamp=None):
     )
     if patron_pid:
         query = query.filter("term", patron_pid=patron_pid)
+    if org_pid:
+        query = query.filter("term", organisation__pid=org_pid)
     results = (
         query.params(preserve_order=True)
         .sort({"_created": {"order": "asc"}})
@@ -1310,6 +1329,23 @@ def get_overdue_loans(patron_pid=None, tstamp=None):
         yield Loan.get_record_by_pid(pid)
 
 
+def get_overdue_loans_fees(patron_pid=None, org_pid=None):
+    """Compute the overdue fees of all overdue loans.
+
+    Overdue loans are loaded by chunks and the libraries used to compute the
+    fees are loaded only once.
+
+    :param patron_pid: the patron pid. If none, return all overdue loans.
+    :param org_pid: optional parameter to filter by organisation.
+    :return: a generator of tuple (loan, fees), see `Loan.get_overdue_fees`
+        for the fees structure.
+    """
+    libraries = {}
+    pids = get_overdue_loan_pids(patron_pid, org_pid=org_pid)
+    for loan in Loan.get_records_by_pids(pids):
+        yield loan, loan._get_overdue_fees(libraries=libraries)
+
+
 def get_non_anonymized_loans(patron=None, org_pid=None):
     """Search all loans for non anonymized loans.
 
@@ -40,6 +40,60 @@ class LoanOperationLogsSearch(OperationLogsSearch):
             query = query.filter("range", date=date_range)
         return query
 
+    def get_patron_hashed_pids(self, page_size=1000):
+        """Get the distinct hashed patron pids of the matching logs.
+
+        The hashed pids are paged with a composite aggregation, so all values
+        are returned without loading the logs.
+
+        :param page_size: int - number of hashed pids by request.
+        :returns: a generator of hashed patron pids.
+        """
+        after = None
+        while True:
+            query = self[:0].source(False)
+            composite = {
+                "sources": [
+                    {"hashed_pid": {"terms": {"field": "loan.patron.hashed_pid"}}}
+                ],
+                "size": page_size,
+            }
+            if after:
+                composite["after"] = after
+            query.aggs.bucket("patrons", "composite", **composite)
+            result = query.execute().aggregations.patrons
+            for bucket in result.buckets:
+                yield bucket.key.hashed_pid
+            after = result.to_dict().get("after_key")
+            if not after or len(result.buckets) < page_size:
+                return
+
+    def count_patrons(self, mode="exact", precision_threshold=40000, page_size=1000):
+        """Count the distinct patrons of the matching logs.
+
+        :param mode: str - the counting method, `cardinality` for an
+            approximate (but fast) count, `exact` for the composite
+            aggregation paging, `scan` to scan all the matching logs.
+        :param precision_threshold: int - below this number of patrons the
+            `cardinality` count is expected to be exact (max: 40000).
+        :param page_size: int - composite aggregation page size.
+        :returns: the number of distinct patrons.
+        """
+        if mode == "cardinality":
+            query = self[:0].source(False)
+            query.aggs.metric(
+                "patrons",
+                "cardinality",
+                field="loan.patron.hashed_pid",
+                precision_threshold=precision_threshold,
+            )
+            return int(query.execute().aggregations.patrons.value)
+        if mode == "scan":
+            return len(
+                {hit.loan.patron.hashed_pid for hit in self.source(["loan"]).scan()}
+            )
+        return sum(1 for _ in self.get_patron_hashed_pids(page_size=page_size))
+
 
 class LoanOperationLog(OperationLog, SpecificOperationLog):
     """Operation log for loans."""
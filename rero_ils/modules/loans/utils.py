@@ -274,6 +274,44 @@ def sum_for_fees(fee_steps):
     return round(math.fsum([fee[0] for fee in fee_steps]), 2) if fee_steps else 0
 
 
+def compute_overdue_fees(open_days, intervals, maximum_total_amount, tz):
+    """Compute the overdue fee steps of a loan.
+
+    Each overdue interval charges its `fee_amount` for each open day from
+    its lower bound until its upper bound (or the lower bound of the next
+    interval). The open days are processed interval by interval until the
+    maximum total amount is reached.
+
+    :param open_days: the open days (as datetime) since the first overdue
+        day, sorted.
+    :param intervals: the overdue intervals sorted by lower bound (see
+        `CircPolicy.get_overdue_intervals`).
+    :param maximum_total_amount: the maximum total amount of the fees.
+    :param tz: the timezone of the library (used for the fee dates).
+    :return an array of tuple (fee amount, fee date).
+    """
+    fees = []
+    total = 0
+    for idx, interval in enumerate(intervals):
+        # `from` and `to` are 1-based open day numbers.
+        first_day = max(interval["from"], 1)
+        last_day = min(interval["to"], len(open_days))
+        if idx + 1 < len(intervals):
+            last_day = min(last_day, intervals[idx + 1]["from"] - 1)
+        if last_day < first_day:
+            continue
+        for day in open_days[first_day - 1 : last_day]:
+            # an overdue starts at the beginning of the day
+            day = day.replace(hour=0, minute=0, second=0, microsecond=0, tzinfo=None)
+            gap = round(maximum_total_amount - total, 2)
+            fee_amount = min(interval["fee_amount"], gap)
+            total = round(math.fsum([total, fee_amount]), 2)
+            fees.append((fee_amount, tz.localize(day)))
+            if maximum_total_amount <= total:
+                return fees
+    return fees
+
+
 def get_loan_checkout_date(loan_pid):
     """Get the date when the loan has been checked out.
 
@@ -26,6 +26,8 @@ from invenio_pidstore.models import PersistentIdentifier, PIDStatus
 from invenio_search import RecordsSearch
 from sqlalchemy import text
 
+from ..utils import iter_query_by_keyset
+
 DB_CONNECTION_COUNTS_QUERY = text(
     """
         select
@@ -146,7 +148,8 @@ class Monitoring(object):
         """Get all doc_type pids. Return a generator iterator.
 
         :param with_deleted: get also deleted pids.
-        :param limit: Limit sql query to count size.
+        :param limit: page size of the sql queries, all pids are loaded at
+            once if `None`.
         :param date: Get all pids <= date.
         :returns: pid generator.
         """
@@ -155,19 +158,14 @@ class Monitoring(object):
             query = query.filter_by(status=PIDStatus.REGISTERED)
         if date:
             query = query.filter(PersistentIdentifier.created < date)
+        query = query.with_entities(
+            PersistentIdentifier.id, PersistentIdentifier.pid_value
+        )
         if limit:
-            count = query.count()
             # slower, less memory
-            query = query.order_by(text("pid_value")).limit(limit)
-            offset = 0
-            while offset < count:
-                for identifier in query.offset(offset):
-                    yield identifier.pid_value
-                offset += limit
-        else:
-            # faster, more memory
-            for identifier in query:
-                yield identifier.pid_value
+            query = iter_query_by_keyset(query, PersistentIdentifier.id, limit)
+        for identifier in query:
+            yield identifier.pid_value
 
     def get_es_db_missing_pids(self, doc_type, with_deleted=False):
         """Get ES and DB counts."""
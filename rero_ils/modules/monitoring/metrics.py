@@ -0,0 +1,79 @@
+# -*- coding: utf-8 -*-
+#
+# RERO ILS
+# Copyright (C) 2019-2024 RERO
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, version 3 of the License.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+"""Process level performance counters."""
+
+from collections import Counter, defaultdict
+from threading import Lock
+
+
+class Metrics:
+    """Process level performance counters.
+
+    Counters are grouped by namespace (ie: `indexer_refresh`) and are only
+    kept in the memory of the current process. They are exposed through the
+    `/monitoring/metrics` API.
+    """
+
+    _lock = Lock()
+    _counters = defaultdict(Counter)
+
+    @classmethod
+    def incr(cls, namespace, key, value=1):
+        """Increment a counter.
+
+        :param namespace: the counter namespace.
+        :param key: the counter name.
+        :param value: the value to add to the counter.
+        """
+        with cls._lock:
+            cls._counters[namespace][key] += value
+
+    @classmethod
+    def set(cls, namespace, key, value):
+        """Set a counter value (for gauges like a queue depth).
+
+        :param namespace: the counter namespace.
+        :param key: the counter name.
+        :param value: the new value.
+        """
+        with cls._lock:
+            cls._counters[namespace][key] = value
+
+    @classmethod
+    def get(cls, namespace=None):
+        """Get counters.
+
+        :param namespace: the counter namespace, all namespaces if `None`.
+        :returns: a dictionary with the counter values.
+        """
+        with cls._lock:
+            if namespace:
+                return dict(cls._counters.get(namespace, {}))
+            return {name: dict(values) for name, values in cls._counters.items()}
+
+    @classmethod
+    def reset(cls, namespace=None):
+        """Reset counters.
+
+        :param namespace: the counter namespace, all namespaces if `None`.
+        """
+        with cls._lock:
+            if namespace:
+                cls._counters.pop(namespace, None)
+            else:
+                cls._counters.clear()
@@ -29,6 +29,7 @@ from redis import Redis
 
 from ...permissions import monitoring_permission
 from .api import DB_CONNECTION_COUNTS_QUERY, DB_CONNECTIONS_QUERY, Monitoring
+from .metrics import Metrics
 
 api_blueprint = Blueprint("api_monitoring", __name__, url_prefix="/monitoring")
 
@@ -298,3 +299,13 @@ def timestamps():
                     data[name][key] = value
 
     return jsonify({"data": data})
+
+
+@api_blueprint.route("/metrics")
+@check_authentication
+def metrics():
+    """Get the performance counters of the current process.
+
+    :return: jsonified counters grouped by namespace.
+    """
+    return jsonify({"data": Metrics.get()})
@@ -142,7 +142,8 @@ class Notification(IlsRecord, ABC):
 
         data.setdefault("status", NotificationStatus.CREATED)
         record = super().create(data, id_, delete_pid, dbcommit, reindex, **kwargs)
-        create_patron_transaction_from_notification(
+        # keep the created transaction for callers indexing it later
+        record.patron_transaction = create_patron_transaction_from_notification(
             notification=record,
             dbcommit=dbcommit,
             reindex=reindex,
@@ -267,11 +268,13 @@ class Notification(IlsRecord, ABC):
         for result in results:
             yield PatronTransaction.get_record(result.meta.id)
 
-    def update_effective_recipients(self, recipients):
+    def update_effective_recipients(self, recipients, dbcommit=True, reindex=True):
         """Update the notification to set effective recipients.
 
         :param recipients: a list of tuple ; first element is the recipient
             type, second element is the recipient address.
+        :param dbcommit: make the change effective in db.
+        :param reindex: reindex the record.
         :return the updated notification.
         """
         recipients = recipients or []
@@ -279,19 +282,27 @@ class Notification(IlsRecord, ABC):
             self.setdefault("effective_recipients", []).append(
                 {"type": type_, "address": address}
             )
-        return self.update(data=self.dumps(), commit=True, dbcommit=True, reindex=True)
+        return self.update(
+            data=self.dumps(), commit=True, dbcommit=dbcommit, reindex=reindex
+        )
 
-    def update_process_date(self, sent=False, status=NotificationStatus.DONE):
+    def update_process_date(
+        self, sent=False, status=NotificationStatus.DONE, dbcommit=True, reindex=True
+    ):
         """Update the notification to set process date.
 
         :param sent: is the notification is sent.
         :param status: the new notification status.
+        :param dbcommit: make the change effective in db.
+        :param reindex: reindex the record.
         :return the updated notification.
         """
         self["process_date"] = datetime.now(timezone.utc).isoformat()
         self["notification_sent"] = sent
         self["status"] = status
-        return self.update(data=self.dumps(), commit=True, dbcommit=True, reindex=True)
+        return self.update(
+            data=self.dumps(), commit=True, dbcommit=dbcommit, reindex=reindex
+        )
 
 
 class NotificationsIndexer(IlsRecordsIndexer):
@@ -20,13 +20,22 @@
 
 from __future__ import absolute_import, print_function
 
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from contextvars import Context, ContextVar
+
 from flask import current_app
+from invenio_db import db
 from invenio_mail.api import TemplatedMessage
 from invenio_mail.tasks import send_email as task_send_email
 
+from ..api import ReindexCoordinator
 from .api import Notification
 from .models import NotificationType, RecipientType
 
+# emails collected into an outbox scope (see `Dispatcher.outbox`)
+_outbox = ContextVar("notifications_outbox", default=None)
+
 
 class Dispatcher:
     """Dispatcher notifications class."""
@@ -37,30 +46,22 @@ class Dispatcher:
     ):
         """Dispatch the notification.
 
+        Aggregated notifications are sent by chunks
+        (`RERO_ILS_NOTIFICATIONS_DISPATCH_CHUNK_SIZE`), optionally using a
+        thread pool (`RERO_ILS_NOTIFICATIONS_DISPATCH_WORKERS`). The emails of
+        a chunk are sent together and the processed notifications of a chunk
+        are committed and indexed together.
+
         :param notification_pids: Notification pids to send.
         :param resend: Resend notification if already send.
         :param verbose: Verbose output.
         :returns: dictionary with processed and send count
         """
-
-        def get_dispatcher_function(channel):
-            """Find the dispatcher function to use by communication channel."""
-            try:
-                communication_switcher = current_app.config.get(
-                    "RERO_ILS_COMMUNICATION_DISPATCHER_FUNCTIONS", []
-                )
-                return communication_switcher[channel]
-            except KeyError:
-                current_app.logger.warning(
-                    f"The communication channel: {channel}" " is not yet implemented"
-                )
-                return Dispatcher.not_yet_implemented
-
         sent = not_sent = errors = 0
         aggregated = {}
+        updated = []
         pids = notification_pids or []
-        notifications = [Notification.get_record_by_pid(pid) for pid in pids]
-        notifications = list(filter(None, notifications))
+        notifications = list(Notification.get_records_by_pids(list(pids)))
 
         # PROCESS NOTIFICATIONS
         #   For each notification to process, we try to determine if this
@@ -68,7 +69,7 @@ class Dispatcher:
         #   notification to the aggregation dict
         for notification in notifications:
             try:
-                cls._process_notification(notification, resend, aggregated)
+                cls._process_notification(notification, resend, aggregated, updated)
             except Exception as error:
                 errors += 1
                 current_app.logger.error(
@@ -78,34 +79,37 @@ class Dispatcher:
                     exc_info=True,
                     stack_info=True,
                 )
+        cls._save_notifications(updated)
 
         # SEND AGGREGATED NOTIFICATIONS
         #   The aggregation key we build ensure than aggregated notifications
         #   are always send to same recipient (patron, lib, vendor, ...) with
         #   the same communication channel. So we can check any notification
         #   of the set to get the these informations.
-        for aggr_key, aggr_notifications in aggregated.items():
-            notification = aggr_notifications[0]
-            comm_channel = notification.get_communication_channel()
-            dispatcher_function = get_dispatcher_function(comm_channel)
-            counter = len(aggr_notifications)
-            if verbose:
-                msg = f"Dispatch notifications: {notification.type} "
-                if hasattr(notification, "library"):
-                    msg += f"library: {notification.library.pid} "
-                if hasattr(notification, "patron"):
-                    msg += f"patron: {notification.patron.pid} "
-                msg += f"documents: {counter}"
-                current_app.logger.info(msg)
-            result, recipients = dispatcher_function(aggr_notifications)
-            for notification in aggr_notifications:
-                notification.update_process_date(sent=result)
-            if result:
-                sent += counter
+        aggregations = list(aggregated.values())
+        chunk_size = current_app.config.get(
+            "RERO_ILS_NOTIFICATIONS_DISPATCH_CHUNK_SIZE", 100
+        )
+        for idx in range(0, len(aggregations), chunk_size):
+            chunk = aggregations[idx : idx + chunk_size]
+            with cls.outbox():
+                results = cls._send_aggregations(chunk, verbose)
+            updated = []
+            for aggr_notifications, (result, recipients) in zip(chunk, results):
                 for notification in aggr_notifications:
-                    notification.update_effective_recipients(recipients)
-            else:
-                not_sent += counter
+                    notification.update_process_date(
+                        sent=result, dbcommit=False, reindex=False
+                    )
+                    if result:
+                        notification.update_effective_recipients(
+                            recipients, dbcommit=False, reindex=False
+                        )
+                    updated.append(notification)
+                if result:
+                    sent += len(aggr_notifications)
+                else:
+                    not_sent += len(aggr_notifications)
+            cls._save_notifications(updated)
         return {
             "processed": len(notifications),
             "sent": sent,
@@ -113,14 +117,129 @@ class Dispatcher:
             "errors": errors,
         }
 
+    @staticmethod
+    def _get_dispatcher_function(channel):
+        """Find the dispatcher function to use by communication channel."""
+        try:
+            communication_switcher = current_app.config.get(
+                "RERO_ILS_COMMUNICATION_DISPATCHER_FUNCTIONS", []
+            )
+            return communication_switcher[channel]
+        except KeyError:
+            current_app.logger.warning(
+                f"The communication channel: {channel}" " is not yet implemented"
+            )
+            return Dispatcher.not_yet_implemented
+
+    @classmethod
+    def _send_aggregation(cls, notifications, verbose=False):
+        """Send a set of aggregated notifications.
+
+        :param notifications: the aggregated notifications.
+        :param verbose: Verbose output.
+        :return: the dispatcher function result: a tuple (sent, recipients).
+        """
+        notification = notifications[0]
+        comm_channel = notification.get_communication_channel()
+        dispatcher_function = cls._get_dispatcher_function(comm_channel)
+        if verbose:
+            msg = f"Dispatch notifications: {notification.type} "
+            if hasattr(notification, "library"):
+                msg += f"library: {notification.library.pid} "
+            if hasattr(notification, "patron"):
+                msg += f"patron: {notification.patron.pid} "
+            msg += f"documents: {len(notifications)}"
+            current_app.logger.info(msg)
+        return dispatcher_function(notifications)
+
     @classmethod
-    def _process_notification(cls, notification, resend, aggregated):
+    def _send_aggregations(cls, aggregations, verbose=False):
+        """Send sets of aggregated notifications.
+
+        :param aggregations: a list of aggregated notifications.
+        :param verbose: Verbose output.
+        :return: the list of dispatcher function results.
+        """
+        workers = current_app.config.get("RERO_ILS_NOTIFICATIONS_DISPATCH_WORKERS", 1)
+        if workers <= 1 or len(aggregations) <= 1:
+            return [cls._send_aggregation(aggr, verbose) for aggr in aggregations]
+
+        app = current_app._get_current_object()
+        outbox = _outbox.get()
+
+        def send(notifications):
+            # only the outbox is shared with the workers: the other context
+            # variables (ie: the record cache) are not thread safe.
+            _outbox.set(outbox)
+            with app.app_context():
+                return cls._send_aggregation(notifications, verbose)
+
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = [
+                executor.submit(Context().run, send, notifications)
+                for notifications in aggregations
+            ]
+            return [future.result() for future in futures]
+
+    @staticmethod
+    def _save_notifications(notifications):
+        """Commit and index processed notifications together.
+
+        :param notifications: the updated notifications.
+        """
+        if not notifications:
+            return
+        db.session.commit()
+        with ReindexCoordinator() as coordinator:
+            for notification in notifications:
+                coordinator.add(notification)
+
+    @staticmethod
+    @contextmanager
+    def outbox():
+        """Collect the emails sent into this scope and send them together.
+
+        The collected emails are sent by a single task (one by sending delay)
+        using one SMTP connection.
+        """
+        from .tasks import send_emails
+
+        messages = []
+        token = _outbox.set(messages)
+        try:
+            yield messages
+        finally:
+            _outbox.reset(token)
+            by_delay = {}
+            for data, delay in messages:
+                by_delay.setdefault(delay, []).append(data)
+            for delay, data in by_delay.items():
+                send_emails.apply_async((data,), countdown=delay)
+
+    @staticmethod
+    def send_email(msg, delay=0):
+        """Send an email message asynchronously.
+
+        Into an `outbox` scope, the message is only collected.
+
+        :param msg: the message to send.
+        :param delay: the sending delay (in seconds).
+        """
+        if (outbox := _outbox.get()) is not None:
+            outbox.append((msg.__dict__, delay))
+        else:
+            task_send_email.apply_async((msg.__dict__,), countdown=delay)
+
+    @classmethod
+    def _process_notification(cls, notification, resend, aggregated, updated):
         """Process one notification.
 
         :param notification: the notification to process.
         :param resend: is the notification should be resend notification
                        if already send.
         :param aggregated: ``dict`` to store notification results.
+        :param updated: ``list`` to store the cancelled notifications (not yet
+                        committed).
         """
         if process_date := notification.get("process_date"):
             current_app.logger.warning(
@@ -137,7 +256,10 @@ class Dispatcher:
         if can_cancel:
             msg = f"Notification #{notification.pid} cancelled: {reason}"
             current_app.logger.info(msg)
-            notification.update_process_date(sent=False, status="cancelled")
+            notification.update_process_date(
+                sent=False, status="cancelled", dbcommit=False, reindex=False
+            )
+            updated.append(notification)
             return
 
         # 3. Aggregate notifications
@@ -250,7 +372,7 @@ class Dispatcher:
             ctx_data=context,
             template=notification.get_template_path(),
         )
-        task_send_email.apply_async((msg.__dict__,))
+        Dispatcher.send_email(msg)
         return True, [(RecipientType.TO, recipient)]
 
     @staticmethod
@@ -298,5 +420,5 @@ class Dispatcher:
             template=notification.get_template_path(),
         )
         delay = context.get("delay", 0)
-        task_send_email.apply_async((msg.__dict__,), countdown=delay)
+        Dispatcher.send_email(msg, delay=delay)
         return True, [(RecipientType.TO, addr) for addr in recipients]
@@ -21,19 +21,51 @@ from __future__ import absolute_import, print_function
 
 from datetime import datetime, timezone
 
+import ciso8601
 from celery import shared_task
 from flask import current_app
+from flask_mail import Message
+from invenio_db import db
 
-from rero_ils.modules.circ_policies.api import OVERDUE_REMINDER_TYPE
+from rero_ils.modules.api import RecordCache, ReindexCoordinator
+from rero_ils.modules.circ_policies.api import (
+    DUE_SOON_REMINDER_TYPE,
+    OVERDUE_REMINDER_TYPE,
+)
 from rero_ils.modules.libraries.api import Library
-from rero_ils.modules.loans.api import get_due_soon_loans, get_overdue_loans
+from rero_ils.modules.loans.api import (
+    Loan,
+    get_due_soon_loan_pids,
+    get_overdue_loan_pids,
+)
+from rero_ils.modules.patron_transaction_events.api import PatronTransactionEvent
 from rero_ils.modules.utils import set_timestamp
 
+from .api import Notification, NotificationsSearch
 from .dispatcher import Dispatcher
 from .models import NotificationType
 from .utils import get_notifications
 
 
+@shared_task(ignore_result=True)
+def send_emails(messages):
+    """Send email messages using a single SMTP connection.
+
+    :param messages: the email messages data (see `Dispatcher.outbox`).
+    """
+    with current_app.extensions["mail"].connect() as connection:
+        for data in messages:
+            msg = Message()
+            msg.__dict__.update(data)
+            try:
+                connection.send(msg)
+            except Exception as error:
+                current_app.logger.error(
+                    f"Unable to send email to {msg.recipients} :: {error}",
+                    exc_info=True,
+                )
+
+
 @shared_task()
 def process_notifications(notification_type, verbose=True):
     """Dispatch notifications.
@@ -49,6 +81,166 @@ def process_notifications(notification_type, verbose=True):
     return result
 
 
+#: record types kept in memory while the reminder notifications are created.
+REMINDERS_CACHED_PID_TYPES = [
+    "cipo",
+    "hold",
+    "item",
+    "itty",
+    "lib",
+    "loc",
+    "org",
+    "ptrn",
+    "ptty",
+]
+
+
+def _get_sent_reminder_counts(loans, notification_type):
+    """Count the reminders already sent for some loans.
+
+    A reminder is considered as sent if a notification of the same type has
+    been created after the loan transaction date (see `Loan.is_notified`).
+
+    :param loans: the loans to check.
+    :param notification_type: the reminder notification type.
+    :return: a dictionary with the number of sent reminders by loan pid.
+    """
+
+    def to_utc(date):
+        date = ciso8601.parse_datetime(date)
+        return date if date.tzinfo else date.replace(tzinfo=timezone.utc)
+
+    trans_dates = {loan.pid: to_utc(loan.get("transaction_date")) for loan in loans}
+    counts = dict.fromkeys(trans_dates, 0)
+    query = (
+        NotificationsSearch()
+        .filter("terms", context__loan__pid=list(trans_dates))
+        .filter("term", notification_type=notification_type)
+        .source(["context.loan.pid", "creation_date"])
+    )
+    for hit in query.scan():
+        loan_pid = hit.context.loan.pid
+        if to_utc(hit.creation_date) > trans_dates[loan_pid]:
+            counts[loan_pid] += 1
+    return counts
+
+
+def _create_loan_reminders(loan, notification_type, sent, tstamp):
+    """Create the missing reminder notifications of a loan.
+
+    The notifications are not committed nor indexed.
+
+    :param loan: the loan.
+    :param notification_type: the reminder notification type.
+    :param sent: the number of reminders already sent for this loan.
+    :param tstamp: the execution time of the task.
+    :return: the list of created notifications.
+    """
+    from ..loans.utils import get_circ_policy
+
+    circ_policy = get_circ_policy(loan)
+    current_app.logger.debug(f"  - this loan use the cipo#{circ_policy.pid}")
+    if notification_type == NotificationType.DUE_SOON:
+        reminder_type = DUE_SOON_REMINDER_TYPE
+        counters = [0]
+    else:
+        # For each overdue loan, we need to get the 'overdue' reminders
+        # to should be sent from the due_date and the current used date.
+        reminder_type = OVERDUE_REMINDER_TYPE
+        loan_library = Library.get_record_by_pid(loan.library_pid)
+        open_days = loan_library.count_open(
+            start_date=loan.overdue_date, end_date=tstamp
+        )
+        current_app.logger.debug(f"  - open days from loans due_date :: {open_days}")
+        reminders = circ_policy.get_reminders(
+            reminder_type=reminder_type, limit=open_days
+        )
+        counters = range(len(list(reminders)))
+
+    notifications = []
+    for counter in counters:
+        # Do not recreate an already sent reminder, and only create it if a
+        # corresponding reminder exists into the circulation policy.
+        if sent > counter or not circ_policy.get_reminder(reminder_type, counter):
+            current_app.logger.debug(
+                f"  --> {notification_type} notification#{counter+1} skipped"
+            )
+            continue
+        data = loan.get_notification_data(notification_type, counter)
+        if notification := Notification.create(data=data):
+            current_app.logger.debug(
+                f"  --> {notification_type} notification#{counter+1} created"
+            )
+            notifications.append(notification)
+    return notifications
+
+
+def _index_notifications(notifications):
+    """Index created notifications and their patron transactions in bulk.
+
+    :param notifications: the created notifications.
+    """
+    with ReindexCoordinator() as coordinator:
+        for notification in notifications:
+            coordinator.add(notification)
+            if transaction := notification.patron_transaction:
+                coordinator.add(transaction)
+                coordinator.add_pids(
+                    PatronTransactionEvent.provider.pid_type, transaction.event_pids
+                )
+
+
+def create_reminder_notifications(notification_type, loan_pids, tstamp, stats):
+    """Create the reminder notifications of loans by chunks.
+
+    For each chunk of loans, the already sent reminders are counted with one
+    search query, the notifications are created into a single database
+    transaction and indexed with bulk requests.
+
+    :param notification_type: the reminder notification type.
+    :param loan_pids: the pids of the loans to process.
+    :param tstamp: the execution time of the task.
+    :param stats: the task statistics (updated and stored into the task
+        timestamp after each chunk).
+    :return: the number of created notifications.
+    """
+    logger = current_app.logger
+    chunk_size = current_app.config["RERO_ILS_NOTIFICATIONS_CREATION_CHUNK_SIZE"]
+    stats["total"] += len(loan_pids)
+    created = 0
+    for idx in range(0, len(loan_pids), chunk_size):
+        loans = list(Loan.get_records_by_pids(loan_pids[idx : idx + chunk_size]))
+        sent_counts = _get_sent_reminder_counts(loans, notification_type)
+        notifications = []
+        for loan in loans:
+            logger.debug(f"* Loan#{loan.pid} is considered as '{notification_type}'")
+            try:
+                with db.session.begin_nested():
+                    notifications.extend(
+                        _create_loan_reminders(
+                            loan, notification_type, sent_counts[loan.pid], tstamp
+                        )
+                    )
+            except Exception as error:
+                logger.error(
+                    f"Unable to create {notification_type.upper()} "
+                    f"notification :: {error}",
+                    exc_info=True,
+                    stack_info=True,
+                )
+        db.session.commit()
+        _index_notifications(notifications)
+        created += len(notifications)
+
+        stats["loans"] += len(loans)
+        stats["notifications"] += len(notifications)
+        elapsed = datetime.now(timezone.utc) - stats["start"]
+        stats["time"] = round(elapsed.total_seconds(), 3)
+        stats["loans_per_second"] = round(stats["loans"] / (stats["time"] or 1), 2)
+        set_timestamp("notification-creation", **stats)
+    return created
+
+
 @shared_task()
 def create_notifications(types=None, tstamp=None, verbose=True):
     """Creates requested notifications.
@@ -58,77 +250,42 @@ def create_notifications(types=None, tstamp=None, verbose=True):
                    default it will be `datetime.now()`.
     :param verbose: is the task should be verbose.
     """
-    from ..loans.utils import get_circ_policy
-
     types = types or []
     tstamp = tstamp or datetime.now(timezone.utc)
     logger = current_app.logger
     notification_counter = {}
+    stats = {
+        "start": datetime.now(timezone.utc),
+        "total": 0,
+        "loans": 0,
+        "notifications": 0,
+    }
 
-    # DUE SOON NOTIFICATIONS
-    if NotificationType.DUE_SOON in types:
-        notification_counter[NotificationType.DUE_SOON] = 0
-        logger.debug("DUE_SOON_NOTIFICATION_CREATION -------------")
-        for loan in get_due_soon_loans(tstamp=tstamp):
-            try:
-                logger.debug(f"* Loan#{loan.pid} is considered as 'due_soon'")
-                notifications = loan.create_notification(
-                    _type=NotificationType.DUE_SOON
+    with RecordCache(pid_types=REMINDERS_CACHED_PID_TYPES):
+        # DUE SOON NOTIFICATIONS
+        if NotificationType.DUE_SOON in types:
+            logger.debug("DUE_SOON_NOTIFICATION_CREATION -------------")
+            notification_counter[NotificationType.DUE_SOON] = (
+                create_reminder_notifications(
+                    NotificationType.DUE_SOON,
+                    get_due_soon_loan_pids(tstamp=tstamp),
+                    tstamp,
+                    stats,
                 )
-                notification_counter[NotificationType.DUE_SOON] += len(notifications)
-            except Exception as error:
-                logger.error(
-                    f"Unable to create DUE_SOON notification :: {error}",
-                    exc_info=True,
-                    stack_info=True,
-                )
-        process_notifications(NotificationType.DUE_SOON)
-    # OVERDUE NOTIFICATIONS
-    if NotificationType.OVERDUE in types:
-        logger.debug("OVERDUE_NOTIFICATION_CREATION --------------")
-        notification_counter[NotificationType.OVERDUE] = 0
-        for loan in get_overdue_loans(tstamp=tstamp):
-            logger.debug(f"* Loan#{loan.pid} is considered as 'overdue'")
-            # For each overdue loan, we need to get the 'overdue' reminders
-            # to should be sent from the due_date and the current used date.
-            loan_library = Library.get_record_by_pid(loan.library_pid)
-            open_days = loan_library.count_open(
-                start_date=loan.overdue_date, end_date=tstamp
             )
-            circ_policy = get_circ_policy(loan)
-            logger.debug(f"  - this loan use the cipo#{circ_policy.pid}")
-            logger.debug(f"  - open days from loans due_date :: {open_days}")
-            reminders = circ_policy.get_reminders(
-                reminder_type=OVERDUE_REMINDER_TYPE, limit=open_days
+            process_notifications(NotificationType.DUE_SOON)
+        # OVERDUE NOTIFICATIONS
+        if NotificationType.OVERDUE in types:
+            logger.debug("OVERDUE_NOTIFICATION_CREATION --------------")
+            notification_counter[NotificationType.OVERDUE] = (
+                create_reminder_notifications(
+                    NotificationType.OVERDUE,
+                    get_overdue_loan_pids(tstamp=tstamp),
+                    tstamp,
+                    stats,
+                )
             )
-            # For each reminder, try to create it.
-            #   the `create_notification` method will check if the notification
-            #   is already sent. If the notification has already sent, it will
-            #   not be created again
-            for idx, _ in enumerate(reminders):
-                try:
-                    if notifications := loan.create_notification(
-                        _type=NotificationType.OVERDUE, counter=idx
-                    ):
-                        msg = f"  --> Overdue notification#{idx+1} created"
-                        logger.debug(msg)
-                        notification_counter[NotificationType.OVERDUE] += len(
-                            notifications
-                        )
-
-                    else:
-                        msg = (
-                            f"  --> Overdue notification#{idx+1} skipped "
-                            ":: already sent"
-                        )
-                        logger.debug(msg)
-                except Exception as error:
-                    logger.error(
-                        f"Unable to create OVERDUE notification :: {error}",
-                        exc_info=True,
-                        stack_info=True,
-                    )
-        process_notifications(NotificationType.OVERDUE)
+            process_notifications(NotificationType.OVERDUE)
     notification_sum = sum(notification_counter.values())
 
     counters = {k: v for k, v in notification_counter.items() if v > 0}
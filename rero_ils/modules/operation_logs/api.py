@@ -28,6 +28,7 @@ from invenio_search import RecordsSearch, current_search_client
 from ..api import IlsRecordsSearch
 from ..fetchers import FetchedPID
 from .extensions import DatesExtension, IDExtension, ResolveRefsExtension
+from .writer import OperationLogWriter
 
 
 class OperationLogsSearch(IlsRecordsSearch):
@@ -98,6 +99,8 @@ class OperationLog(RecordBase):
             a refresh to make this operation visible to search, if `false`
             (the default) then do nothing with refreshes.
             Valid choices: 'true', 'false', 'wait_for'
+            Without refresh, the record is sent to the operation logs queue
+            if the buffered writer is enabled (see `OperationLogWriter`).
         :returns: A new :class:`Record` instance.
         """
         if id_:
@@ -120,12 +123,15 @@ class OperationLog(RecordBase):
                 format_checker=format_checker, validator=validator, use_model=False
             )
 
-        current_search_client.index(
-            index=cls.get_index(record),
-            body=record.dumps(),
-            id=record["pid"],
-            refresh=index_refresh,
-        )
+        if index_refresh == "false" and OperationLogWriter.is_enabled():
+            OperationLogWriter.publish(cls.get_index(record), record.dumps())
+        else:
+            current_search_client.index(
+                index=cls.get_index(record),
+                body=record.dumps(),
+                id=record["pid"],
+                refresh=index_refresh,
+            )
 
         # Run post create extensions
         for e in cls._extensions:
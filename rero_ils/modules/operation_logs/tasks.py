@@ -0,0 +1,32 @@
+# -*- coding: utf-8 -*-
+#
+# RERO ILS
+# Copyright (C) 2019-2024 RERO
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, version 3 of the License.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+"""Celery tasks for operation logs."""
+
+from celery import shared_task
+
+from .writer import OperationLogWriter
+
+
+@shared_task(ignore_result=True)
+def flush_operation_logs(max_chunks=None):
+    """Index the operation logs waiting into the message queue.
+
+    :param max_chunks: the maximum number of chunks to process.
+    :returns: the number of indexed operation logs.
+    """
+    return OperationLogWriter.flush(max_chunks=max_chunks)
@@ -0,0 +1,177 @@
+# -*- coding: utf-8 -*-
+#
+# RERO ILS
+# Copyright (C) 2019-2024 RERO
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, version 3 of the License.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+"""Buffered writer of the operation logs."""
+
+import time
+from threading import Lock
+
+from celery import current_app as current_celery_app
+from elasticsearch.helpers import bulk
+from flask import current_app
+from invenio_search import current_search_client
+from kombu import Producer, Queue
+
+from ..monitoring.metrics import Metrics
+
+
+class OperationLogWriter:
+    """Buffered writer of the operation logs.
+
+    Instead of one indexing request by operation log, the logs are published
+    into a durable message queue (persistent messages) and indexed by chunks
+    with one bulk request. A message is acknowledged only once its log is
+    indexed: if a worker crashes, the pending logs stay into the queue and are
+    indexed by the next flush.
+
+    The queue is flushed by the `flush_operation_logs` task: periodically (see
+    `CELERY_BEAT_SCHEDULE`) and as soon as a process has published a chunk of
+    logs (see `RERO_ILS_OPERATION_LOG_CHUNK_SIZE`).
+    """
+
+    metrics_namespace = "operation_logs"
+
+    _lock = Lock()
+    _published = 0
+
+    @staticmethod
+    def is_enabled():
+        """Check if the operation logs are buffered."""
+        return current_app.config.get("RERO_ILS_OPERATION_LOG_BUFFERED", False)
+
+    @staticmethod
+    def get_queue():
+        """Get the operation logs message queue."""
+        name = current_app.config["RERO_ILS_OPERATION_LOG_MQ_QUEUE"]
+        exchange = current_app.config["INDEXER_MQ_EXCHANGE"]
+        return Queue(name, exchange=exchange, routing_key=name, durable=True)
+
+    @classmethod
+    def publish(cls, index, body):
+        """Add an operation log to the queue.
+
+        If the message broker is not available, the log is directly indexed
+        to not lose it.
+
+        :param index: the index name of the operation log.
+        :param body: the operation log document.
+        """
+        queue = cls.get_queue()
+        try:
+            with current_celery_app.pool.acquire(block=True) as conn:
+                producer = Producer(
+                    conn, exchange=queue.exchange, routing_key=queue.routing_key
+                )
+                producer.publish(
+                    dict(index=index, body=body),
+                    declare=[queue],
+                    serializer="json",
+                    delivery_mode="persistent",
+                )
+        except Exception as error:
+            current_app.logger.warning(
+                f"Operation log queue not available, direct indexing: {error}"
+            )
+            Metrics.incr(cls.metrics_namespace, "fallback")
+            current_search_client.index(index=index, body=body, id=body["pid"])
+            return
+        Metrics.incr(cls.metrics_namespace, "published")
+
+        # size based flush
+        chunk_size = current_app.config["RERO_ILS_OPERATION_LOG_CHUNK_SIZE"]
+        with cls._lock:
+            cls._published += 1
+            flush = cls._published >= chunk_size
+            if flush:
+                cls._published = 0
+        if flush:
+            from .tasks import flush_operation_logs
+
+            flush_operation_logs.delay()
+
+    @classmethod
+    def flush(cls, max_chunks=None):
+        """Index the queued operation logs.
+
+        :param max_chunks: the maximum number of chunks to process, all
+            queued logs if `None`.
+        :returns: the number of indexed operation logs.
+        """
+        chunk_size = current_app.config["RERO_ILS_OPERATION_LOG_CHUNK_SIZE"]
+        req_timeout = current_app.config["INDEXER_BULK_REQUEST_TIMEOUT"]
+        count = chunks = 0
+        with current_celery_app.pool.acquire(block=True) as conn:
+            queue = cls.get_queue()(conn)
+            queue.declare()
+            while max_chunks is None or chunks < max_chunks:
+                messages = []
+                while len(messages) < chunk_size:
+                    message = queue.get(no_ack=False)
+                    if message is None:
+                        break
+                    messages.append(message)
+                if not messages:
+                    break
+                chunks += 1
+                start = time.perf_counter()
+                try:
+                    count += cls._index_messages(messages, req_timeout)
+                except Exception:
+                    # keep the logs into the queue for the next flush
+                    for message in messages:
+                        message.requeue()
+                    Metrics.incr(cls.metrics_namespace, "flush_errors")
+                    raise
+                latency = time.perf_counter() - start
+                Metrics.incr(cls.metrics_namespace, "flushed", len(messages))
+                Metrics.set(cls.metrics_namespace, "flush_latency", latency)
+            _, depth, _ = queue.queue_declare(passive=True)
+            Metrics.set(cls.metrics_namespace, "queue_depth", depth)
+        return count
+
+    @staticmethod
+    def _index_messages(messages, req_timeout):
+        """Index the operation logs of queued messages with a bulk request.
+
+        The messages are acknowledged once the bulk request is done. The
+        documents rejected by Elasticsearch are logged as they will never be
+        indexed.
+
+        :param messages: the queue messages.
+        :param req_timeout: the bulk request timeout.
+        :returns: the number of indexed operation logs.
+        """
+        actions = [
+            {
+                "_op_type": "index",
+                "_index": message.payload["index"],
+                "_id": message.payload["body"]["pid"],
+                "_source": message.payload["body"],
+            }
+            for message in messages
+        ]
+        n_succeed, errors = bulk(
+            current_search_client,
+            actions,
+            raise_on_error=False,
+            request_timeout=req_timeout,
+        )
+        for message in messages:
+            message.ack()
+        if errors:
+            current_app.logger.error(f"Operation logs indexing errors: {errors}")
+        return n_succeed
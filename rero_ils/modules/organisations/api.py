@@ -31,6 +31,7 @@ from rero_ils.modules.providers import Provider
 from rero_ils.modules.utils import sorted_pids
 from rero_ils.modules.vendors.api import Vendor, VendorsSearch
 
+from .cache import OrganisationViewcodeCache
 from .models import OrganisationIdentifier, OrganisationMetadata
 
 # provider
@@ -92,11 +93,21 @@ class Organisation(IlsRecord):
 
     @classmethod
     def get_record_by_viewcode(cls, viewcode):
-        """Get record by view code."""
+        """Get record by view code.
+
+        The organisations are resolved from a process level cache (see
+        `OrganisationViewcodeCache`).
+
+        :param viewcode: the organisation view code.
+        :returns: the organisation ES source.
+        """
+        if org := OrganisationViewcodeCache.get(viewcode):
+            return org
         result = OrganisationsSearch().filter("term", code=viewcode).execute()
         if result["hits"]["total"]["value"] != 1:
             abort(404, f"Organisation viewcode {viewcode}: Result not found.")
-
+        # organisation created by another process: reload the cache
+        OrganisationViewcodeCache.invalidate()
         return result["hits"]["hits"][0]["_source"]
 
     @classmethod
@@ -218,6 +229,25 @@ class OrganisationsIndexer(IlsRecordsIndexer):
 
     record_cls = Organisation
 
+    def index(self, record):
+        """Index an organisation.
+
+        :param record: Record instance.
+        """
+        return_value = super().index(record)
+        # the organisations by view code are loaded from the index
+        OrganisationViewcodeCache.invalidate()
+        return return_value
+
+    def delete(self, record):
+        """Delete an organisation from the index.
+
+        :param record: Record instance.
+        """
+        return_value = super().delete(record)
+        OrganisationViewcodeCache.invalidate()
+        return return_value
+
     def bulk_index(self, record_id_iterator):
         """Bulk index records.
 
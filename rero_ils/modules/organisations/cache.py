@@ -0,0 +1,87 @@
+# -*- coding: utf-8 -*-
+#
+# RERO ILS
+# Copyright (C) 2019-2024 RERO
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, version 3 of the License.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+"""Process level cache of the organisations by view code."""
+
+import time
+from copy import deepcopy
+from threading import Lock
+
+from elasticsearch_dsl.utils import AttrDict
+from flask import current_app
+
+from rero_ils.modules.monitoring.metrics import Metrics
+
+
+class OrganisationViewcodeCache:
+    """Organisations indexed by view code.
+
+    All organisations are loaded with one search request and are kept into
+    the process memory. The map is warmed when the application is loaded and
+    is reloaded when an organisation is indexed or deleted by this process. As
+    other processes can also modify an organisation, the map is reloaded
+    after `RERO_ILS_ORGANISATION_VIEWCODE_CACHE_TTL` seconds or when an
+    unknown view code is found into the index.
+    """
+
+    metrics_namespace = "organisation_viewcode"
+
+    _lock = Lock()
+    _organisations = None
+    _loaded_at = 0
+
+    @classmethod
+    def warm(cls):
+        """Load all organisations."""
+        from .api import OrganisationsSearch
+
+        organisations = {
+            hit["code"]: hit.to_dict() for hit in OrganisationsSearch().scan()
+        }
+        with cls._lock:
+            cls._organisations = organisations
+            cls._loaded_at = time.monotonic()
+
+    @classmethod
+    def invalidate(cls):
+        """Remove the organisations from the memory."""
+        with cls._lock:
+            cls._organisations = None
+
+    @classmethod
+    def get(cls, viewcode):
+        """Get an organisation by view code.
+
+        :param viewcode: the organisation view code.
+        :returns: the organisation ES source, `None` if the view code is
+            unknown.
+        """
+        ttl = current_app.config.get("RERO_ILS_ORGANISATION_VIEWCODE_CACHE_TTL", 0)
+        with cls._lock:
+            organisations = cls._organisations
+            expired = time.monotonic() - cls._loaded_at > ttl
+        if organisations is None or expired:
+            Metrics.incr(cls.metrics_namespace, "load")
+            cls.warm()
+            with cls._lock:
+                organisations = cls._organisations
+        if (data := organisations.get(viewcode)) is None:
+            Metrics.incr(cls.metrics_namespace, "miss")
+            return
+        Metrics.incr(cls.metrics_namespace, "hit")
+        # the callers can modify the returned organisation
+        return AttrDict(deepcopy(data))
@@ -35,7 +35,10 @@ from rero_ils.modules.decorators import (
     check_logged_user_authentication,
 )
 from rero_ils.modules.ill_requests.api import ILLRequestsSearch
-from rero_ils.modules.loans.api import get_loans_stats_by_patron_pid, get_overdue_loans
+from rero_ils.modules.loans.api import (
+    get_loans_stats_by_patron_pid,
+    get_overdue_loans_fees,
+)
 from rero_ils.modules.loans.utils import sum_for_fees
 from rero_ils.modules.organisations.dumpers import OrganisationLoggedUserDumper
 from rero_ils.modules.patron_transactions.utils import (
@@ -76,7 +79,7 @@ def patron_circulation_informations(patron_pid):
     if not patron:
         abort(404, "Patron not found")
     preview_amount = sum(
-        sum_for_fees(loan.get_overdue_fees) for loan in get_overdue_loans(patron.pid)
+        sum_for_fees(fees) for _, fees in get_overdue_loans_fees(patron.pid)
     )
     engaged_amount = get_transactions_total_amount_for_patron(patron.pid, status="open")
     statistics = get_loans_stats_by_patron_pid(patron_pid)
@@ -97,8 +100,7 @@ def patron_circulation_informations(patron_pid):
 def patron_overdue_preview_api(patron_pid):
     """Get all overdue preview linked to a patron."""
     data = []
-    for loan in get_overdue_loans(patron_pid):
-        fees = loan.get_overdue_fees
+    for loan, fees in get_overdue_loans_fees(patron_pid):
         fees = [(fee[0], fee[1].isoformat()) for fee in fees]
         total_amount = sum_for_fees(fees)
         if total_amount > 0:
@@ -23,6 +23,8 @@ import re
 
 from invenio_search import current_search
 
+from .organisations.cache import OrganisationViewcodeCache
+
 
 def process_boosting(index_name, config):
     """Expand the '*' using the mapping file.
@@ -73,3 +75,17 @@ def set_boosting_query_fields(sender, app=None, **kwargs):
     with app.app_context():
         for key, value in app.config["RERO_ILS_QUERY_BOOSTING"].items():
             app.config["RERO_ILS_QUERY_BOOSTING"][key] = process_boosting(key, value)
+
+
+def warm_organisation_viewcode_cache(sender, app=None, **kwargs):
+    """Load the organisations by view code.
+
+    :param sender: sender of the signal
+    :param app: the flask app
+    """
+    with app.app_context():
+        try:
+            OrganisationViewcodeCache.warm()
+        except Exception as err:
+            # the index may not exist yet (ie: setup commands)
+            app.logger.debug(f"Organisations by view code not loaded: {err}")
@@ -0,0 +1,80 @@
+# -*- coding: utf-8 -*-
+#
+# RERO ILS
+# Copyright (C) 2019-2024 RERO
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, version 3 of the License.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+"""SRU result sets."""
+
+from uuid import uuid4
+
+from flask import current_app
+from invenio_cache import current_cache
+
+
+class SRUResultSet:
+    """SRU result set paged with search after cursors.
+
+    Each page of a result set stores the `search_after` values of its last
+    record as the cursor of the next page. A client walking a result set
+    sends back the `resultSetId` with the `nextRecordPosition` as
+    `startRecord`: the next page is then searched after the cursor instead of
+    skipping all the previous records. Cursors expire after
+    `RERO_SRU_RESULT_SET_TTL` seconds of inactivity.
+    """
+
+    #: records sort, the pid makes the order unique for the cursors.
+    sort = ["_score", {"pid": "asc"}]
+
+    def __init__(self, query_es, result_set_id=None):
+        """Constructor.
+
+        :param query_es: the elasticsearch query string of the result set.
+        :param result_set_id: the result set identifier, a new one if `None`.
+        """
+        self.query_es = query_es
+        self.result_set_id = result_set_id or uuid4().hex
+        self.ttl = current_app.config["RERO_SRU_RESULT_SET_TTL"]
+
+    def get_key(self, start_record):
+        """Get the cache key of a cursor.
+
+        :param start_record: the position of the first record of the page.
+        :returns: the cache key.
+        """
+        return f"sru_result_set:{self.result_set_id}:{start_record}"
+
+    def get_cursor(self, start_record):
+        """Get the cursor of a page.
+
+        :param start_record: the position of the first record of the page.
+        :returns: the `search_after` values, `None` if the cursor does not
+            exist or belongs to another query.
+        """
+        cursor = current_cache.get(self.get_key(start_record))
+        if cursor and cursor["query_es"] == self.query_es:
+            return cursor["search_after"]
+
+    def set_cursor(self, start_record, search_after):
+        """Store the cursor of a page.
+
+        :param start_record: the position of the first record of the page.
+        :param search_after: the sort values of the last record of the
+            previous page.
+        """
+        current_cache.set(
+            self.get_key(start_record),
+            {"query_es": self.query_es, "search_after": list(search_after)},
+            timeout=self.ttl,
+        )
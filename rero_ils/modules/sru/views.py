@@ -31,9 +31,11 @@ from ..documents.serializers import (
     xml_dc_search,
     xml_marcxmlsru_search,
 )
+from ..monitoring.metrics import Metrics
 from ..utils import strip_chars
 from .cql_parser import Diagnostic, parse
 from .explaine import Explain
+from .result_sets import SRUResultSet
 
 
 class SRUDocumentsSearch(ContentNegotiatedMethodView):
@@ -61,6 +63,16 @@ class SRUDocumentsSearch(ContentNegotiatedMethodView):
             **kwargs,
         )
 
+    @staticmethod
+    def _raise_diagnostic(diagnostic):
+        """Raise an HTTP exception with a SRU diagnostic response.
+
+        :param diagnostic: the `Diagnostic` exception.
+        """
+        response = Response(diagnostic.xml_str())
+        response.headers["content-type"] = "application/xml"
+        raise HTTPException(response=response)
+
     def get(self, **kwargs):
         """Implement the GET /sru/documents."""
         operation = flask_request.args.get("operation", None)
@@ -82,14 +94,44 @@ class SRUDocumentsSearch(ContentNegotiatedMethodView):
             try:
                 query_string = parse(query).to_es()
             except Diagnostic as err:
-                response = Response(err.xml_str())
-                response.headers["content-type"] = "application/xml"
-                raise HTTPException(response=response)
+                self._raise_diagnostic(err)
 
-            search = DocumentsSearch().query("query_string", query=query_string)
+            result_set = SRUResultSet(
+                query_string, flask_request.args.get("resultSetId")
+            )
+            # one query for the records and the exact number of records
+            search = (
+                DocumentsSearch()
+                .query("query_string", query=query_string)
+                .sort(*SRUResultSet.sort)
+                .extra(track_total_hits=True)
+            )
+            if start_record > 1 and (
+                search_after := result_set.get_cursor(start_record)
+            ):
+                search = search.extra(search_after=search_after)[:maximum_records]
+                Metrics.incr("sru", "search_after")
+            else:
+                end_record = start_record - 1 + maximum_records
+                if end_record > current_app.config["RERO_SRU_MAX_RESULT_WINDOW"]:
+                    # deep pages are only available with a cursor
+                    if "resultSetId" in flask_request.args:
+                        code, message = 51, "Result set does not exist"
+                    else:
+                        code, message = 61, "First record position out of range"
+                    self._raise_diagnostic(
+                        Diagnostic(
+                            code=code,
+                            message=message,
+                            details="use the resultSetId of the previous page",
+                            query=query,
+                        )
+                    )
+                search = search[start_record - 1 : end_record]
+                Metrics.incr("sru", "from_size")
+            response = search.execute()
             records = []
-            search = search[(start_record - 1) : maximum_records + (start_record - 1)]
-            for hit in search.execute():
+            for hit in response:
                 records.append(
                     {
                         "_id": hit.meta.id,
@@ -99,16 +141,23 @@ class SRUDocumentsSearch(ContentNegotiatedMethodView):
                     }
                 )
 
+            total = response.hits.total.value
+            sru = {
+                "query": strip_chars(query),
+                "query_es": query_string,
+                "start_record": start_record,
+                "maximum_records": maximum_records,
+            }
+            next_record = start_record + len(records)
+            if records and next_record <= total:
+                result_set.set_cursor(next_record, response.hits[-1].meta.sort)
+                sru["result_set_id"] = result_set.result_set_id
+                sru["result_set_ttl"] = result_set.ttl
             result = {
                 "hits": {
                     "hits": records,
-                    "total": {"value": search.count(), "relation": "eq"},
-                    "sru": {
-                        "query": strip_chars(query),
-                        "query_es": query_string,
-                        "start_record": start_record,
-                        "maximum_records": maximum_records,
-                    },
+                    "total": {"value": total, "relation": "eq"},
+                    "sru": sru,
                 }
             }
             return self.make_response(
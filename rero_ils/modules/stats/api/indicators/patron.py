@@ -22,6 +22,7 @@
 import hashlib
 
 from elasticsearch_dsl.aggs import A
+from flask import current_app
 
 from rero_ils.modules.items.models import ItemCirculationAction
 from rero_ils.modules.loans.logs.api import LoanOperationLogsSearch
@@ -132,15 +133,18 @@ class NumberOfActivePatronsCfg(NumberOfPatronsCfg):
             op_query = op_query.filter(
                 "terms", loan__transaction_location__pid=loc_pids
             )
-        op_query.aggs.bucket(
-            "hashed_pid", A("terms", field="loan.patron.hashed_pid", size=100000)
+        page_size = current_app.config.get(
+            "RERO_ILS_STATS_ACTIVE_PATRONS_PAGE_SIZE", 1000
         )
-        results = op_query.execute()
+        hashed_pids = set(op_query.get_patron_hashed_pids(page_size=page_size))
         convert = {
             hashlib.md5(f"{i}".encode()).hexdigest(): i
             for i in range(1, PatronIdentifier.max() + 1)
         }
-        active_patron_pids = [
-            convert[v.key] for v in results.aggregations.hashed_pid.buckets
-        ]
+        active_patron_pids = [convert[key] for key in hashed_pids if key in convert]
+        if unknown := hashed_pids.difference(convert):
+            current_app.logger.warning(
+                f"Active patrons: {len(unknown)} unknown patron hashed pids: "
+                f"{sorted(unknown)}"
+            )
         return es_query.filter("terms", pid=active_patron_pids)
@@ -18,12 +18,15 @@
 
 """To compute the statistics for pricing."""
 
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 
 import arrow
 from dateutil.relativedelta import relativedelta
+from elasticsearch_dsl import MultiSearch
 from flask import current_app
 from invenio_access.permissions import system_identity
+from invenio_search import current_search_client
 from invenio_search.api import RecordsSearch
 
 from rero_ils.modules.acquisition.acq_order_lines.api import AcqOrderLinesSearch
@@ -85,51 +88,116 @@ class StatsForPricing:
         return
 
     def collect(self):
-        """Collect all the statistics."""
+        """Collect all the statistics.
+
+        The libraries are processed in parallel if several workers are
+        configured (see `RERO_ILS_STATS_WORKERS`).
+        """
+        libraries = list(
+            LibrariesSearch().source(["pid", "name", "organisation"]).scan()
+        )
+        workers = current_app.config.get("RERO_ILS_STATS_WORKERS", 1)
+        if workers > 1 and len(libraries) > 1:
+            app = current_app._get_current_object()
+
+            def _process(lib):
+                with app.app_context():
+                    return self.process(lib)
+
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                results = list(executor.map(_process, libraries))
+        else:
+            results = [self.process(lib) for lib in libraries]
         stats = []
-        for lib in LibrariesSearch().source(["pid", "name", "organisation"]).scan():
+        for lib, result in zip(libraries, results):
             data = {"library": {"pid": lib.pid, "name": lib.name}}
-            data |= self.process(lib)
+            data |= result
             stats.append(data)
         return stats
 
     def process(self, library):
         """Process statistics for a given library.
 
+        All the counters are computed with one multi search request.
+
         :param library: library from the elasticsearch index
         :return: a dict containing all the processed values.
         """
+        queries = self.get_count_queries(library)
+        files_query = self._files_query(library.pid)
+        multi_search = MultiSearch(using=current_search_client)
+        for query in queries.values():
+            multi_search = multi_search.add(query.extra(size=0, track_total_hits=True))
+        multi_search = multi_search.add(files_query)
+        responses = multi_search.execute()
+
+        counts = {
+            key: response.hits.total.value
+            for key, response in zip(queries.keys(), responses)
+        }
+        files_aggs = responses[-1].aggs
         return {
-            "number_of_documents": self.number_of_documents(library.pid),
-            "number_of_libraries": self.number_of_libraries(library.organisation.pid),
-            "number_of_librarians": self.number_of_librarians(library.pid),
+            "number_of_documents": counts["number_of_documents"],
+            "number_of_libraries": counts["number_of_libraries"],
+            "number_of_librarians": counts["number_of_librarians"],
             "number_of_active_patrons": self.number_of_active_patrons(library.pid),
-            "number_of_order_lines": self.number_of_order_lines(library.pid),
-            "number_of_checkouts": self.number_of_circ_operations(
-                library.pid, ItemCirculationAction.CHECKOUT
+            "number_of_order_lines": counts["number_of_order_lines"],
+            "number_of_checkouts": counts["number_of_checkouts"],
+            "number_of_renewals": counts["number_of_renewals"],
+            "number_of_ill_requests": counts["number_of_ill_requests"],
+            "number_of_items": counts["number_of_items"],
+            "number_of_new_items": counts["number_of_new_items"],
+            "number_of_deleted_items": counts["number_of_deleted_items"],
+            "number_of_patrons": counts["number_of_patrons"],
+            "number_of_new_patrons": counts["number_of_new_patrons"],
+            "number_of_checkins": counts["number_of_checkins"],
+            "number_of_requests": counts["number_of_requests"],
+            "number_of_docs_with_files": counts["number_of_docs_with_files"],
+            "number_of_files": int(files_aggs.number_of_files.value),
+            "files_volume": "%.3f" % (files_aggs.files_size.value / (1024 * 1024)),
+        }
+
+    def get_count_queries(self, library):
+        """Get the queries of the counters of a library.
+
+        :param library: library from the elasticsearch index
+        :return: a dict of elasticsearch queries by counter name.
+        """
+        library_pid = library.pid
+        organisation_pid = library.organisation.pid
+        return {
+            "number_of_documents": self._documents_query(library_pid),
+            "number_of_libraries": self._libraries_query(organisation_pid),
+            "number_of_librarians": self._librarians_query(library_pid),
+            "number_of_order_lines": self._order_lines_query(library_pid),
+            "number_of_checkouts": self._circ_operations_query(
+                library_pid, ItemCirculationAction.CHECKOUT
             ),
-            "number_of_renewals": self.number_of_circ_operations(
-                library.pid, ItemCirculationAction.EXTEND
+            "number_of_renewals": self._circ_operations_query(
+                library_pid, ItemCirculationAction.EXTEND
             ),
-            "number_of_ill_requests": self.number_of_ill_requests(
-                library.pid, [ILLRequestStatus.DENIED]
+            "number_of_ill_requests": self._ill_requests_query(
+                library_pid, [ILLRequestStatus.DENIED]
             ),
-            "number_of_items": self.number_of_items(library.pid),
-            "number_of_new_items": self.number_of_new_items(library.pid),
-            "number_of_deleted_items": self.number_of_deleted_items(library.pid),
-            "number_of_patrons": self.number_of_patrons(library.organisation.pid),
-            "number_of_new_patrons": self.number_of_patrons(library.organisation.pid),
-            "number_of_checkins": self.number_of_circ_operations(
-                library.pid, ItemCirculationAction.CHECKIN
+            "number_of_items": self._items_query(library_pid),
+            "number_of_new_items": self._new_items_query(library_pid),
+            "number_of_deleted_items": self._deleted_items_query(library_pid),
+            "number_of_patrons": self._patrons_query(organisation_pid),
+            # as before the multi search: the number of all patrons
+            "number_of_new_patrons": self._patrons_query(organisation_pid),
+            "number_of_checkins": self._circ_operations_query(
+                library_pid, ItemCirculationAction.CHECKIN
             ),
-            "number_of_requests": self.number_of_circ_operations(
-                library.pid, ItemCirculationAction.REQUEST
+            "number_of_requests": self._circ_operations_query(
+                library_pid, ItemCirculationAction.REQUEST
             ),
-            "number_of_docs_with_files": self.number_of_docs_with_files(library.pid),
-            "number_of_files": self.number_of_files(library.pid),
-            "files_volume": self.files_volume(library.pid),
+            "number_of_docs_with_files": self._docs_with_files_query(library_pid),
         }
 
+    def _documents_query(self, library_pid):
+        """Documents linked to a library query."""
+        return DocumentsSearch().by_library_pid(library_pid)
+
     def number_of_documents(self, library_pid):
         """Number of documents linked to my library.
 
@@ -138,7 +206,11 @@ class StatsForPricing:
         :return: the number of matched documents
         :rtype: integer
         """
-        return DocumentsSearch().by_library_pid(library_pid).count()
+        return self._documents_query(library_pid).count()
+
+    def _libraries_query(self, organisation_pid):
+        """Libraries of an organisation query."""
+        return LibrariesSearch().by_organisation_pid(organisation_pid)
 
     def number_of_libraries(self, organisation_pid):
         """Number of libraries of the given organisation.
@@ -148,7 +220,15 @@ class StatsForPricing:
         :return: the number of matched libraries
         :rtype: integer
         """
-        return LibrariesSearch().by_organisation_pid(organisation_pid).count()
+        return self._libraries_query(organisation_pid).count()
+
+    def _librarians_query(self, library_pid):
+        """Librarians of a library query."""
+        return (
+            PatronsSearch()
+            .filter("terms", roles=UserRole.PROFESSIONAL_ROLES)
+            .filter("term", libraries__pid=library_pid)
+        )
 
     def number_of_librarians(self, library_pid):
         """Number of users with a librarian role.
@@ -158,17 +238,15 @@ class StatsForPricing:
         :return: the number of matched librarians
         :rtype: integer
         """
-        return (
-            PatronsSearch()
-            .filter("terms", roles=UserRole.PROFESSIONAL_ROLES)
-            .filter("term", libraries__pid=library_pid)
-            .count()
-        )
+        return self._librarians_query(library_pid).count()
 
-    def number_of_active_patrons(self, library_pid):
+    def number_of_active_patrons(self, library_pid, mode=None):
         """Number of patrons who did a transaction in the past 365 days.
 
         :param library_pid: string - the library to filter with
+        :param mode: string - the counting method (see
+            `LoanOperationLogsSearch.count_patrons`), the
+            `RERO_ILS_STATS_ACTIVE_PATRONS_MODE` setting if not given.
         :return: the number of matched active patrons
         :rtype: integer
         """
@@ -186,10 +264,22 @@ class StatsForPricing:
             )
             .filter("term", loan__item__library_pid=library_pid)
         )
-        patrons = {
-            res.loan.patron.hashed_pid for res in op_logs_query.source(["loan"]).scan()
-        }
-        return len(patrons)
+        config = current_app.config
+        return op_logs_query.count_patrons(
+            mode=mode or config.get("RERO_ILS_STATS_ACTIVE_PATRONS_MODE", "exact"),
+            precision_threshold=config.get(
+                "RERO_ILS_STATS_ACTIVE_PATRONS_PRECISION_THRESHOLD", 40000
+            ),
+            page_size=config.get("RERO_ILS_STATS_ACTIVE_PATRONS_PAGE_SIZE", 1000),
+        )
+
+    def _order_lines_query(self, library_pid):
+        """Order lines created during the timeframe query."""
+        return (
+            AcqOrderLinesSearch()
+            .filter("range", _created=self.date_range)
+            .filter("term", library__pid=library_pid)
+        )
 
     def number_of_order_lines(self, library_pid):
         """Number of order lines created during the specified timeframe.
@@ -198,11 +288,14 @@ class StatsForPricing:
         :return: the number of matched order lines
         :rtype: integer
         """
+        return self._order_lines_query(library_pid).count()
+
+    def _circ_operations_query(self, library_pid, trigger):
+        """Circulation operations during the timeframe query."""
         return (
-            AcqOrderLinesSearch()
-            .filter("range", _created=self.date_range)
-            .filter("term", library__pid=library_pid)
-            .count()
+            LoanOperationLogsSearch()
+            .get_logs_by_trigger(triggers=[trigger], date_range=self.date_range)
+            .filter("term", loan__item__library_pid=library_pid)
         )
 
     def number_of_circ_operations(self, library_pid, trigger):
@@ -213,11 +306,15 @@ class StatsForPricing:
         :return: the number of matched circulation operation
         :rtype: integer
         """
+        return self._circ_operations_query(library_pid, trigger).count()
+
+    def _ill_requests_query(self, library_pid, exclude_status):
+        """ILL requests created during the timeframe query."""
         return (
-            LoanOperationLogsSearch()
-            .get_logs_by_trigger(triggers=[trigger], date_range=self.date_range)
-            .filter("term", loan__item__library_pid=library_pid)
-            .count()
+            ILLRequestsSearch()
+            .filter("range", _created=self.date_range)
+            .filter("term", library__pid=library_pid)
+            .exclude("terms", status=exclude_status)
         )
 
     def number_of_ill_requests(self, library_pid, exclude_status):
@@ -228,15 +325,13 @@ class StatsForPricing:
         :return: the number of matched inter library loan requests
         :rtype: integer
         """
-        query = (
-            ILLRequestsSearch()
-            .filter("range", _created=self.date_range)
-            .filter("term", library__pid=library_pid)
-            .exclude("terms", status=exclude_status)
-        )
-        return query.count()
+        return self._ill_requests_query(library_pid, exclude_status).count()
 
     # -------- optional -----------
+    def _items_query(self, library_pid):
+        """Items of a library query."""
+        return ItemsSearch().filter("term", library__pid=library_pid)
+
     def number_of_items(self, library_pid):
         """Number of items linked to my library.
 
@@ -246,7 +341,17 @@ class StatsForPricing:
         :rtype: integer
         """
         # can be done using the facet
-        return ItemsSearch().filter("term", library__pid=library_pid).count()
+        return self._items_query(library_pid).count()
+
+    def _deleted_items_query(self, library_pid):
+        """Items deleted during the timeframe query."""
+        return (
+            RecordsSearch(index=OperationLog.index_name)
+            .filter("range", date=self.date_range)
+            .filter("term", operation="delete")
+            .filter("term", record__type="item")
+            .filter("term", library__value=library_pid)
+        )
 
     def number_of_deleted_items(self, library_pid):
         """Number of deleted items during the specified timeframe.
@@ -255,13 +360,14 @@ class StatsForPricing:
         :return: the number of matched deleted items
         :rtype: integer
         """
+        return self._deleted_items_query(library_pid).count()
+
+    def _new_items_query(self, library_pid):
+        """Items created during the timeframe query."""
         return (
-            RecordsSearch(index=OperationLog.index_name)
-            .filter("range", date=self.date_range)
-            .filter("term", operation="delete")
-            .filter("term", record__type="item")
-            .filter("term", library__value=library_pid)
-            .count()
+            ItemsSearch()
+            .filter("range", _created=self.date_range)
+            .filter("term", library__pid=library_pid)
         )
 
     def number_of_new_items(self, library_pid):
@@ -272,11 +378,14 @@ class StatsForPricing:
         :rtype: integer
         """
         # can be done using the facet or operation logs
+        return self._new_items_query(library_pid).count()
+
+    def _new_patrons_query(self, organisation_pid):
+        """Patrons created during the timeframe query."""
         return (
-            ItemsSearch()
+            PatronsSearch()
             .filter("range", _created=self.date_range)
-            .filter("term", library__pid=library_pid)
-            .count()
+            .filter("term", organisation__pid=organisation_pid)
         )
 
     def number_of_new_patrons(self, organisation_pid):
@@ -286,11 +395,14 @@ class StatsForPricing:
         :return: the number of matched newly created patrons
         :rtype: integer
         """
+        return self._new_patrons_query(organisation_pid).count()
+
+    def _patrons_query(self, organisation_pid):
+        """Patrons of an organisation query."""
         return (
             PatronsSearch()
-            .filter("range", _created=self.date_range)
+            .filter("term", roles="patron")
             .filter("term", organisation__pid=organisation_pid)
-            .count()
         )
 
     def number_of_patrons(self, organisation_pid):
@@ -302,12 +414,11 @@ class StatsForPricing:
         :return: the number of matched patrons
         :rtype: integer
         """
-        return (
-            PatronsSearch()
-            .filter("term", roles="patron")
-            .filter("term", organisation__pid=organisation_pid)
-            .count()
-        )
+        return self._patrons_query(organisation_pid).count()
+
+    def _docs_with_files_query(self, library_pid):
+        """Documents containing files of a library query."""
+        return DocumentsSearch().filter("term", files__library_pid=library_pid)
 
     def number_of_docs_with_files(self, library_pid):
         """Number of documents containing files belonging to a given library.
@@ -317,7 +428,7 @@ class StatsForPricing:
         :return: the number of matched documents
         :rtype: integer
         """
-        return DocumentsSearch().filter("term", files__library_pid=library_pid).count()
+        return self._docs_with_files_query(library_pid).count()
 
     def _get_record_file_query(self):
         """Get a record file query on the related index."""
@@ -330,6 +441,14 @@ class StatsForPricing:
             record_service.config.search,
         )
 
+    def _files_query(self, library_pid):
+        """Files of a library query with the number and size aggregations."""
+        es_query = self._get_record_file_query()
+        es_query = es_query.filter("term", metadata__library__pid=library_pid)
+        es_query.aggs.metric("number_of_files", "sum", field="metadata.n_files")
+        es_query.aggs.metric("files_size", "sum", field="metadata.file_size")
+        return es_query
+
     def number_of_files(self, library_pid):
         """Number of files linked to my library.
 
@@ -338,9 +457,7 @@ class StatsForPricing:
         :return: the number of matched files
         :rtype: integer
         """
-        es_query = self._get_record_file_query()
-        es_query = es_query.filter("term", metadata__library__pid=library_pid)
-        es_query.aggs.metric("number_of_files", "sum", field="metadata.n_files")
+        es_query = self._files_query(library_pid)
         return int(es_query.execute().aggs.number_of_files.value)
 
     def files_volume(self, library_pid):
@@ -351,7 +468,5 @@ class StatsForPricing:
         :return: the volume taken by the files in Mb
         :rtype: str
         """
-        es_query = self._get_record_file_query()
-        es_query = es_query.filter("term", metadata__library__pid=library_pid)
-        es_query.aggs.metric("files_size", "sum", field="metadata.file_size")
+        es_query = self._files_query(library_pid)
         return "%.3f" % (es_query.execute().aggs.files_size.value / (1024 * 1024))
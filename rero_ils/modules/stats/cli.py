@@ -18,6 +18,7 @@
 """Click command-line interface for operation logs."""
 
 
+import time
 from pprint import pprint
 
 import arrow
@@ -26,6 +27,8 @@ from dateutil.relativedelta import relativedelta
 from flask import current_app
 from flask.cli import with_appcontext
 
+from rero_ils.modules.libraries.api import LibrariesSearch
+
 from .api.api import Stat
 from .api.librarian import StatsForLibrarian
 from .api.pricing import StatsForPricing
@@ -56,6 +59,32 @@ def dumps(type):
         pprint(StatsForLibrarian(to_date=arrow.utcnow()).collect(), indent=2)
 
 
+@stats.command()
+@click.option("-l", "--library", "library_pids", multiple=True)
+@with_appcontext
+def benchmark_active_patrons(library_pids):
+    """Compare the methods used to count the active patrons.
+
+    :param library_pids: the library pids, all libraries if not given.
+    """
+    stats_pricing = StatsForPricing(to_date=arrow.utcnow())
+    query = LibrariesSearch().source(["pid"])
+    if library_pids:
+        query = query.filter("terms", pid=library_pids)
+    lib_pids = [hit.pid for hit in query.scan()]
+    for mode in ["scan", "exact", "cardinality"]:
+        start = time.perf_counter()
+        count = sum(
+            stats_pricing.number_of_active_patrons(lib_pid, mode=mode)
+            for lib_pid in lib_pids
+        )
+        duration = time.perf_counter() - start
+        click.echo(
+            f"{mode:>12}: {count} active patrons for {len(lib_pids)} libraries "
+            f"in {duration:.3f}s"
+        )
+
+
 @stats.command()
 @click.argument("type")
 @with_appcontext
@@ -49,7 +49,7 @@ from invenio_records_rest.utils import obj_or_import_string
 from lazyreader import lazyread
 from lxml import etree
 from psycopg2.extensions import ISOLATION_LEVEL_AUTOCOMMIT
-from requests.adapters import HTTPAdapter
+from requests.adapters import DEFAULT_POOLSIZE, HTTPAdapter
 from urllib3.util import Retry
 from werkzeug.local import LocalProxy
 
@@ -982,7 +982,11 @@ def number_records_in_file(json_file, type):
 
 
 def requests_retry_session(
-    retries=5, backoff_factor=0.5, status_forcelist=(500, 502, 504), session=None
+    retries=5,
+    backoff_factor=0.5,
+    status_forcelist=(500, 502, 504),
+    session=None,
+    pool_maxsize=DEFAULT_POOLSIZE,
 ):
     """Request retry session.
 
@@ -991,6 +995,8 @@ def requests_retry_session(
         {backoff factor} * (2 ** ({number of total retries} - 1))
     :params status_forcelist: The HTTP response codes to retry on..
     :params session: Session to use.
+    :params pool_maxsize: The number of connections kept by host, should be
+        the number of threads sharing the session.
 
     """
     session = session or requests.Session()
@@ -1001,7 +1007,7 @@ def requests_retry_session(
         backoff_factor=backoff_factor,
         status_forcelist=status_forcelist,
     )
-    adapter = HTTPAdapter(max_retries=retry)
+    adapter = HTTPAdapter(max_retries=retry, pool_maxsize=pool_maxsize)
     session.mount("http://", adapter)
     session.mount("https://", adapter)
     return session
@@ -1100,6 +1106,32 @@ def sorted_pids(query):
     return pids
 
 
+def iter_query_by_keyset(query, key_column, limit=100000):
+    """Iterate over the rows of a query with keyset pagination.
+
+    Unlike `LIMIT/OFFSET` pagination, each page is retrieved by an index
+    seek on `key_column`: the cost of a page doesn't depend on its position
+    and a full table walk stays linear.
+
+    :param query: the SQLAlchemy query to iterate.
+    :param key_column: an unique and indexed column used to sort the rows.
+    :param limit: the page size.
+    :returns: a generator of the query rows.
+    """
+    last_key = None
+    while True:
+        page = query
+        if last_key is not None:
+            page = page.filter(key_column > last_key)
+        rows = page.order_by(key_column).limit(limit).all()
+        if not rows:
+            return
+        last_key = getattr(rows[-1], key_column.key)
+        yield from rows
+        if len(rows) < limit:
+            return
+
+
 def get_objects(record_class, query):
     """Get record object from search query by record id.
 
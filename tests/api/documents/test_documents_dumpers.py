@@ -23,9 +23,11 @@ from rero_ils.modules.acquisition.dumpers import document_acquisition_dumper
 from rero_ils.modules.commons.exceptions import RecordNotFound
 from rero_ils.modules.documents.api import Document
 from rero_ils.modules.documents.dumpers import (
+    document_indexer_dumper,
     document_replace_refs_dumper,
     document_title_dumper,
 )
+from rero_ils.modules.documents.dumpers.indexer import IndexerDumper
 from rero_ils.modules.entities.models import EntityType
 
 
@@ -56,6 +58,20 @@ def test_document_dumpers(document, document_data):
         document.dumps(dumper=document_replace_refs_dumper)
 
 
+def test_document_indexer_dumper_holdings(document, item_lib_martigny):
+    """Test holdings and items of the document indexer dumper."""
+    holdings = IndexerDumper.search_holdings([document.pid, "unknown"])
+    assert holdings["unknown"] == []
+    [(holding, items)] = holdings[document.pid]
+    assert holding["pid"] == item_lib_martigny.holding_pid
+    assert [item["pid"] for item in items] == [item_lib_martigny.pid]
+
+    dump_data = document.dumps(dumper=document_indexer_dumper)
+    with IndexerDumper.prefetch_holdings([document.pid]):
+        assert document.dumps(dumper=document_indexer_dumper) == dump_data
+    assert dump_data["holdings"][0]["items"][0]["pid"] == item_lib_martigny.pid
+
+
 @pytest.mark.skip(reason="Dumper() not implement 'load()' method")
 def test_multi_dumpers(document_data):
     """Test MultiDumper."""
@@ -24,7 +24,9 @@ from flask import url_for
 from invenio_accounts.testutils import login_user_via_session
 from werkzeug.exceptions import NotFound
 
+from rero_ils.modules.monitoring.metrics import Metrics
 from rero_ils.modules.organisations.api import Organisation
+from rero_ils.modules.organisations.cache import OrganisationViewcodeCache
 from tests.utils import postdata
 
 
@@ -36,6 +38,27 @@ def test_get_record_by_viewcode(org_martigny):
         assert Organisation.get_record_by_viewcode("dummy")
 
 
+def test_get_record_by_viewcode_cache(org_martigny):
+    """Test the organisations by view code cache."""
+    namespace = OrganisationViewcodeCache.metrics_namespace
+    OrganisationViewcodeCache.invalidate()
+    Metrics.reset(namespace)
+
+    org = Organisation.get_record_by_viewcode("org1")
+    assert org.pid == org_martigny.pid
+    # callers get a copy of the cached organisation
+    org["name"] = "foo"
+    assert Organisation.get_record_by_viewcode("org1")["name"] == org_martigny["name"]
+    # all organisations are loaded once
+    assert Metrics.get(namespace) == {"load": 1, "hit": 2}
+
+    # indexing an organisation reloads the cache
+    org_martigny.reindex()
+    assert OrganisationViewcodeCache._organisations is None
+    assert Organisation.get_record_by_viewcode("org1")["pid"] == org_martigny.pid
+    assert Metrics.get(namespace)["load"] == 2
+
+
 def test_get_record_by_online_harvested_source(org_martigny):
     """Test get_record_by_online_harvested_source."""
     source = org_martigny.get("online_harvested_source")[0]
@@ -20,6 +20,7 @@
 from flask import url_for
 
 from rero_ils.modules.documents.api import Document
+from rero_ils.modules.monitoring.metrics import Metrics
 from tests.utils import get_xml_dict
 
 
@@ -114,3 +115,44 @@ def test_sru_documents_diagnostics(client):
         xml_dict["srw:searchRetrieveResponse"]["diag:diagnostics"]["diag:message"]
         == "Malformed Query"
     )
+
+
+def test_sru_documents_result_set(app, client, document, document_sion_items):
+    """Test sru documents paging with result set cursors."""
+    Metrics.reset("sru")
+    app.config["RERO_SRU_MAX_RESULT_WINDOW"] = 1
+    params = dict(
+        version="1.1", operation="searchRetrieve", query="Berthe", maximumRecords=1
+    )
+
+    # first page: the result set cursor of the next page is returned
+    res = client.get(url_for("api_sru.documents", **params))
+    assert res.status_code == 200
+    search_rr = get_xml_dict(res)["zs:searchRetrieveResponse"]
+    assert search_rr["zs:numberOfRecords"] == "2"
+    assert search_rr["zs:nextRecordPosition"] == "2"
+    assert search_rr["zs:resultSetIdleTime"] == "300"
+    result_set_id = search_rr["zs:resultSetId"]
+
+    # next page: searched after the cursor, beyond the result window
+    res = client.get(
+        url_for("api_sru.documents", startRecord=2, resultSetId=result_set_id, **params)
+    )
+    search_rr = get_xml_dict(res)["zs:searchRetrieveResponse"]
+    assert search_rr["zs:numberOfRecords"] == "2"
+    assert search_rr["zs:records"]["zs:record"]["zs:RecordPosition"] == "2"
+    # last page: no more cursor
+    assert "zs:resultSetId" not in search_rr
+    assert Metrics.get("sru") == {"from_size": 1, "search_after": 1}
+
+    # deep pages are not available without a cursor
+    res = client.get(url_for("api_sru.documents", startRecord=2, **params))
+    diagnostics = get_xml_dict(res)["srw:searchRetrieveResponse"]["diag:diagnostics"]
+    assert diagnostics["diag:uri"] == "info:srw/diagnostic/1/61"
+    res = client.get(
+        url_for("api_sru.documents", startRecord=2, resultSetId="unknown", **params)
+    )
+    diagnostics = get_xml_dict(res)["srw:searchRetrieveResponse"]["diag:diagnostics"]
+    assert diagnostics["diag:uri"] == "info:srw/diagnostic/1/51"
+
+    app.config["RERO_SRU_MAX_RESULT_WINDOW"] = 10000
@@ -21,6 +21,7 @@
 from flask import url_for
 from invenio_accounts.testutils import login_user_via_session
 from invenio_db import db
+from lxml import etree
 
 from rero_ils.modules.utils import get_ref_for_pid
 from tests.utils import get_csv, parse_csv
@@ -129,3 +130,27 @@ def test_patron_transaction_events_exports(
     ]
     assert all(field in header for field in header_columns)
     assert len(data) == 1
+
+
+def test_documents_exports(client, document, export_document):
+    """Test documents streamed MARCXML exportation."""
+    url = url_for("api_exports.document_export", q=f"pid:{document.pid}")
+    res = client.get(url)
+    assert res.status_code == 200
+    assert res.mimetype == "application/marcxml+xml"
+    assert "attachment" in res.headers["Content-Disposition"]
+    root = etree.fromstring(res.get_data())
+    namespaces = {"marc": "http://www.loc.gov/MARC21/slim"}
+    assert root.tag == "{http://www.loc.gov/MARC21/slim}collection"
+    records = root.findall("marc:record", namespaces)
+    assert len(records) == 1
+    assert records[0].find("marc:leader", namespaces) is not None
+    pid_field = records[0].find("marc:controlfield[@tag='001']", namespaces)
+    assert pid_field.text == document.pid
+
+    # all the records are exported
+    url = url_for("api_exports.document_export")
+    res = client.get(url)
+    assert res.status_code == 200
+    root = etree.fromstring(res.get_data())
+    assert len(root.findall("marc:record", namespaces)) == 2
@@ -17,13 +17,26 @@
 
 """Tests REST API documents."""
 
+import json
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from threading import Thread
+
 import mock
+import pytest
 import requests
 from flask import url_for
 from invenio_accounts.testutils import login_user_via_session
 
 from rero_ils.modules.documents.api import Document
-from rero_ils.modules.imports.api import LoCImport
+from rero_ils.modules.imports.api import (
+    BnfImport,
+    DNBImport,
+    LoCImport,
+    SUDOCImport,
+)
+from rero_ils.modules.imports.cache import ImportCache
+from rero_ils.modules.monitoring.metrics import Metrics
 from tests.utils import clean_text, get_json, mock_response
 
 
@@ -275,6 +288,112 @@ def test_documents_import_loc_missing_id(mock_get, client, loc_without_010):
     assert len(results["hits"]["hits"]) == 9
 
 
+@mock.patch("requests.get")
+def test_documents_import_cache(mock_get, app, loc_without_010):
+    """Test the import results cache."""
+    cache = ImportCache(LoCImport.name)
+    for what in ["cache", "partial", "failure"]:
+        cache.redis.delete(cache.get_key(what, "=", "anywhere"))
+    Metrics.reset("import_cache")
+    mock_get.return_value = mock_response(content=loc_without_010)
+    loc_import = LoCImport()
+    results, _ = loc_import.search_records(
+        what="cache", relation="all", max_results=100, no_cache=True
+    )
+    assert Metrics.get("import_cache")["stored_bytes"] > 0
+
+    # a smaller page is served from the cached results
+    mock_get.reset_mock()
+    cached_import = LoCImport()
+    cached_results, status_code = cached_import.search_records(
+        what="cache", relation="all", max_results=5
+    )
+    assert not mock_get.called
+    assert status_code == 200
+    hits = cached_results["hits"]["hits"]
+    # the first source record has no 010 (no id): it is not a hit
+    assert len(hits) == 4
+    assert hits == results["hits"]["hits"][: len(hits)]
+    assert cached_import.data == loc_import.data[: len(hits)]
+    assert cached_results["hits"]["remote_total"] == 10
+    # all the source records are cached: a bigger page is also served
+    LoCImport().search_records(what="cache", relation="all", max_results=200)
+    assert not mock_get.called
+    assert Metrics.get("import_cache")["hit"] == 2
+    # only a part of the source records are cached
+    LoCImport().search_records(
+        what="partial", relation="all", max_results=5, no_cache=True
+    )
+    mock_get.reset_mock()
+    LoCImport().search_records(what="partial", relation="all", max_results=20)
+    assert mock_get.called
+    assert Metrics.get("import_cache")["miss"] == 1
+
+    # source failures are cached
+    error = requests.exceptions.HTTPError("error")
+    error.response = mock.MagicMock()
+    error.response.status_code = 555
+    mock_get.return_value = mock_response(
+        content=b"", status=555, raise_for_status=error
+    )
+    _, status_code = LoCImport().search_records(
+        what="failure", relation="all", no_cache=True
+    )
+    assert status_code == 555
+    mock_get.reset_mock()
+    results, status_code = LoCImport().search_records(what="failure", relation="all")
+    assert not mock_get.called
+    assert status_code == 555
+    assert results["errors"]["message"] == "error"
+    assert Metrics.get("import_cache")["negative_hit"] == 1
+
+    # source timeouts are cached
+    cache.redis.delete(cache.get_key("timeout", "=", "anywhere"))
+    mock_get.side_effect = requests.exceptions.ReadTimeout("timeout")
+    _, status_code = LoCImport().search_records(
+        what="timeout", relation="all", no_cache=True
+    )
+    assert status_code == 433
+    mock_get.reset_mock()
+    results, status_code = LoCImport().search_records(what="timeout", relation="all")
+    assert not mock_get.called
+    assert status_code == 433
+    assert results["errors"]["message"] == "timeout"
+    assert Metrics.get("import_cache")["negative_hit"] == 2
+    mock_get.side_effect = None
+
+
+@mock.patch("requests.get")
+def test_documents_import_processor_lock(mock_get, app, loc_without_010):
+    """Test that a dojson processor converts one record at a time."""
+    lock = LoCImport.get_processor_lock()
+    assert lock is LoCImport.get_processor_lock()
+    # the sources using the same processor share the same lock
+    assert BnfImport.get_processor_lock() is SUDOCImport.get_processor_lock()
+    assert BnfImport.get_processor_lock() is not lock
+
+    mock_get.return_value = mock_response(content=loc_without_010)
+    loc_import = LoCImport()
+    results = {}
+
+    def search():
+        with app.test_request_context():
+            results["results"], _ = loc_import.search_records(
+                what="test", relation="all", max_results=100, no_cache=True
+            )
+
+    # the conversion waits for the processor
+    with lock:
+        thread = Thread(target=search)
+        thread.start()
+        thread.join(1)
+        assert thread.is_alive()
+    thread.join()
+    assert results["results"]["hits"]["remote_total"] == 10
+    assert set(loc_import.timings) == {"request", "parse", "convert"}
+    assert loc_import.timings["convert"] > 0
+
+
 @mock.patch("requests.get")
 def test_documents_import_dnb_isbn(
     mock_get,
@@ -681,3 +800,131 @@ def test_documents_import_bnf_errors(mock_get, client, librarian_martigny):
     data = get_json(res)
     assert res.status_code == err_code
     assert data["errors"]["message"] == err_msg
+
+
+@pytest.fixture()
+def sru_server(
+    bnf_ean_any_9782070541270, bnf_anywhere_all_peter, loc_isbn_all_9781604689808
+):
+    """Local stand-in SRU server.
+
+    The response is chosen with the first part of the url path, the `slow`
+    source answers after a delay.
+    """
+    responses = {
+        "bnf": bnf_ean_any_9782070541270,
+        "sudoc": bnf_ean_any_9782070541270,
+        "peter": bnf_anywhere_all_peter,
+        "loc": loc_isbn_all_9781604689808,
+        "slow": loc_isbn_all_9781604689808,
+    }
+
+    class SRUHandler(BaseHTTPRequestHandler):
+        """SRU request handler."""
+
+        def do_GET(self):
+            """Answer with the source SRU response."""
+            source = self.path.strip("/").split("/")[0]
+            if source == "slow":
+                time.sleep(3)
+            self.send_response(200)
+            self.send_header("Content-Type", "text/xml")
+            self.end_headers()
+            self.wfile.write(responses.get(source, b""))
+
+        def log_message(self, *args):
+            """Silent server."""
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), SRUHandler)
+    server.daemon_threads = True
+    Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_port}"
+    server.shutdown()
+
+
+def test_documents_import_federated(
+    app, client, librarian_martigny, sru_server, monkeypatch
+):
+    """Test the federated search on several import sources."""
+    for import_class, path in [
+        (BnfImport, "bnf"),
+        (SUDOCImport, "sudoc"),
+        (LoCImport, "loc"),
+        (DNBImport, "slow"),
+    ]:
+        monkeypatch.setattr(import_class, "url", f"{sru_server}/{path}")
+    monkeypatch.setitem(app.config, "RERO_IMPORT_FEDERATED_TIMEOUT", 1)
+    url = url_for(
+        "api_import.federated_search",
+        q="ean:any:9782070541270",
+        sources="loc,bnf,sudoc,dnb",
+        no_cache=1,
+    )
+    res = client.get(url)
+    assert res.status_code == 401
+
+    login_user_via_session(client, librarian_martigny.user)
+    res = client.get(url_for("api_import.federated_search", q="1", sources="foo"))
+    assert res.status_code == 400
+    for size in ["abc", "0", "-1"]:
+        res = client.get(url_for("api_import.federated_search", q="1", size=size))
+        assert res.status_code == 400
+
+    res = client.get(url)
+    assert res.status_code == 200
+    assert res.mimetype == "application/x-ndjson"
+    lines = [json.loads(line) for line in res.get_data(as_text=True).splitlines()]
+    sources = {data["source"]: data for data in lines[:-1]}
+    assert set(sources) == {"loc", "bnf", "sudoc", "dnb"}
+    # the slow source is reported as a timeout
+    assert lines[-2]["source"] == "dnb"
+    assert sources["dnb"]["status"] == 408
+    assert sources["bnf"]["status"] == 200
+    assert sources["bnf"]["hits"]
+
+    # the sudoc hits are duplicates of the bnf hits (same ISBN)
+    merged = lines[-1]["merged"]
+    assert merged["total"] == len(merged["hits"])
+    assert "sudoc" not in {hit["source_key"] for hit in merged["hits"]}
+    bnf_hits = [hit for hit in merged["hits"] if hit["source_key"] == "bnf"]
+    assert len(bnf_hits) == len(sources["bnf"]["hits"])
+    assert any(
+        duplicate["source"] == "sudoc"
+        for hit in bnf_hits
+        for duplicate in hit.get("duplicates", [])
+    )
+
+
+def test_documents_import_federated_shared_processor(
+    app, client, librarian_martigny, sru_server, monkeypatch
+):
+    """Test the federated search on sources using the same processor."""
+    # BnF and SUDOC both use the unimarc processor
+    monkeypatch.setattr(BnfImport, "url", f"{sru_server}/bnf")
+    monkeypatch.setattr(SUDOCImport, "url", f"{sru_server}/peter")
+    login_user_via_session(client, librarian_martigny.user)
+    res = client.get(
+        url_for(
+            "api_import.federated_search",
+            q="ean:any:9782070541270",
+            sources="bnf,sudoc",
+            no_cache=1,
+        )
+    )
+    assert res.status_code == 200
+    lines = [json.loads(line) for line in res.get_data(as_text=True).splitlines()]
+    sources = {data["source"]: data for data in lines[:-1]}
+
+    # each source gets the records of its own response
+    for key, import_class in [("bnf", BnfImport), ("sudoc", SUDOCImport)]:
+        with app.test_request_context():
+            results, _ = import_class().search_records(
+                what="9782070541270", relation="any", where="ean", no_cache=True
+            )
+        assert sources[key]["status"] == 200
+        assert [hit["metadata"] for hit in sources[key]["hits"]] == [
+            hit["metadata"] for hit in results["hits"]["hits"]
+        ]
+    assert sources["bnf"]["hits"][0]["metadata"] != (
+        sources["sudoc"]["hits"][0]["metadata"]
+    )
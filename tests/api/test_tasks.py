@@ -53,7 +53,7 @@ from rero_ils.modules.patrons.tasks import (
     clean_obsolete_subscriptions,
     task_clear_and_renew_subscriptions,
 )
-from rero_ils.modules.utils import add_years, get_ref_for_pid
+from rero_ils.modules.utils import add_years, get_ref_for_pid, get_timestamp
 from tests.utils import postdata
 
 
@@ -101,6 +101,10 @@ def test_notifications_task(
     NotificationsSearch.flush_and_refresh()
     LoansSearch.flush_and_refresh()
     assert loan.is_notified(NotificationType.DUE_SOON)
+    # the task progress is stored into the task timestamp
+    stats = get_timestamp("notification-creation")
+    assert stats["loans"] == stats["total"] >= 1
+    assert stats["notifications"] >= 1
 
     notif = get_notification(loan, NotificationType.DUE_SOON)
     notif_date = ciso8601.parse_datetime(notif.get("creation_date"))
@@ -19,7 +19,15 @@
 
 from __future__ import absolute_import, print_function
 
-from rero_ils.modules.circ_policies.api import CircPolicy
+from copy import deepcopy
+
+from invenio_cache import current_cache
+
+from rero_ils.modules.circ_policies.api import (
+    CIRC_POLICIES_MATRIX_CACHE_PREFIX,
+    CircPolicy,
+)
+from rero_ils.modules.monitoring.metrics import Metrics
 
 
 def test_circ_policy_search(app, circulation_policies):
@@ -76,3 +84,52 @@ def test_circ_policy_search(app, circulation_policies):
             row["item_type_pid"],
         )
         assert cipo.pid == row["cipo"]
+
+
+def test_circ_policies_matrix(app, circulation_policies):
+    """Test the circulation policies resolution table."""
+    CircPolicy.invalidate_circ_policies_matrix("org1")
+    matrix = CircPolicy.get_circ_policies_matrix("org1")
+    assert matrix["default"] == "cipo1"
+    # the resolution table gives the same result as the search queries
+    for (lib_pid, ptty_pid, itty_pid), pid in matrix["lpi"].items():
+        cipo = CircPolicy.get_circ_policy_by_LPI("org1", lib_pid, ptty_pid, itty_pid)
+        assert cipo.pid == pid
+    for (ptty_pid, itty_pid), pid in matrix["opi"].items():
+        cipo = CircPolicy.get_circ_policy_by_OPI("org1", ptty_pid, itty_pid)
+        assert cipo.pid == pid
+    # the resolution table is stored into the cache
+    assert CircPolicy.get_circ_policies_matrix("org1") == matrix
+
+    # updating a policy invalidates the resolution table
+    key = f"{CIRC_POLICIES_MATRIX_CACHE_PREFIX}org1"
+    cipo = CircPolicy.get_record_by_pid("cipo1")
+    cipo.update(cipo, dbcommit=True, reindex=True)
+    assert current_cache.get(key) is None
+    Metrics.reset("circ_policies_matrix")
+    assert CircPolicy.get_circ_policies_matrix("org1") == matrix
+    assert Metrics.get("circ_policies_matrix") == {"miss": 1}
+
+    # the resolution table is built from the database: a committed change
+    # is taken into account even if the policy is not yet indexed
+    cipo = CircPolicy.get_record_by_pid("cipo3")
+    original = deepcopy(cipo)
+    assert matrix["lpi"][("lib1", "ptty2", "itty2")] == "cipo3"
+    cipo["settings"] = []
+    cipo.update(cipo, dbcommit=True, reindex=False)
+    matrix = CircPolicy.get_circ_policies_matrix("org1")
+    assert ("lib1", "ptty2", "itty2") not in matrix["lpi"]
+    cipo = CircPolicy.get_record_by_pid("cipo3")
+    cipo.update(original, dbcommit=True, reindex=True)
+    matrix = CircPolicy.get_circ_policies_matrix("org1")
+    assert matrix["lpi"][("lib1", "ptty2", "itty2")] == "cipo3"
+
+    # a stale resolution table falls back on the search queries
+    stale = deepcopy(matrix)
+    stale["lpi"] = {lpi: "unknown" for lpi in stale["lpi"]}
+    stale["default"] = "unknown"
+    current_cache.set(key, stale)
+    cipo = CircPolicy.provide_circ_policy("org1", "lib1", "ptty1", "itty1")
+    assert cipo.pid == "cipo2"
+    assert current_cache.get(key) is None
+    assert Metrics.get("circ_policies_matrix")["stale"] == 1
@@ -303,6 +303,85 @@ def test_sync_concept(
     assert not RemoteEntity.get_record_by_pid("foo_mef")
 
 
+@mock.patch("requests.Session.get")
+def test_sync_batch(
+    mock_get,
+    app,
+    mef_agents_url,
+    mef_concepts_url,
+    entity_person_data_tmp,
+    entity_topic_data,
+    document_data_ref,
+    document_data_subject_ref,
+):
+    """Test MEF synchronization by batch."""
+    # === setup: a document linked to two entities
+    sync_entity = SyncEntity(log_dir=tempfile.mkdtemp(), workers=2)
+    pers = RemoteEntity.create(
+        entity_person_data_tmp, dbcommit=True, reindex=True, delete_pid=True
+    )
+    topic = RemoteEntity.create(
+        deepcopy(entity_topic_data), dbcommit=True, reindex=True, delete_pid=True
+    )
+    RemoteEntitiesSearch.flush_and_refresh()
+    data = deepcopy(document_data_ref)
+    data["contribution"][0]["entity"][
+        "$ref"
+    ] = f'{mef_agents_url}/idref/{pers["idref"]["pid"]}'
+    data["subjects"] = deepcopy(document_data_subject_ref["subjects"])
+    data["subjects"][0]["entity"][
+        "$ref"
+    ] = f'{mef_concepts_url}/idref/{topic["idref"]["pid"]}'
+    doc = Document.create(data, dbcommit=True, reindex=True, delete_pid=True)
+    DocumentsSearch.flush_and_refresh()
+
+    # === MEF metadata of both entities has been changed
+    latest = {}
+    for entity, value in [(pers, "foo"), (topic, "bar")]:
+        mef = deepcopy(dict(entity))
+        mef["idref"]["authorized_access_point"] = value
+        latest[entity.type] = mef
+    sync_entity._get_latest = mock.MagicMock(
+        side_effect=lambda entity_type, source, pid: latest[entity_type]
+    )
+    mock_get.return_value = mock_response(json_data={})
+    with mock.patch.object(
+        Document, "replace", autospec=True, side_effect=Document.replace
+    ) as replace:
+        doc_updated, mef_updated, errors = sync_entity.sync_batch([pers.pid, topic.pid])
+    # the document has been written once for both entities
+    assert replace.call_count == 1
+    assert doc_updated == {doc.pid}
+    assert sorted(mef_updated) == sorted([pers.pid, topic.pid])
+    assert errors == []
+    # the prefetched MEF records are not kept after the batch
+    assert sync_entity._latest == {}
+
+    DocumentsSearch.flush_and_refresh()
+    query = DocumentsSearch().filter("term", pid=doc.pid)
+    assert query.query(
+        "term", contribution__entity__authorized_access_point_fr="foo"
+    ).count()
+    assert query.query(
+        "term", subjects__entity__authorized_access_point_fr="bar"
+    ).count()
+
+    # === a document update failure is reported for the MEF records
+    for entity, value in [(pers, "foo2"), (topic, "bar2")]:
+        latest[entity.type]["idref"]["authorized_access_point"] = value
+    with mock.patch.object(Document, "replace", side_effect=Exception("Test!")):
+        doc_updated, mef_updated, errors = sync_entity.sync_batch([pers.pid, topic.pid])
+    assert doc_updated == set()
+    assert sorted(mef_updated) == sorted([pers.pid, topic.pid])
+    assert sorted(errors) == sorted([pers.pid, topic.pid])
+
+    # RESET FIXTURES
+    doc = Document.get_record_by_pid(doc.pid)
+    doc.delete(True, True, True)
+    DocumentsSearch.flush_and_refresh()
+    assert (2, []) == sync_entity.remove_unused()
+
+
 def test_remote_entity_properties(
     entity_person, item_lib_martigny, document, document_data, mef_concept1
 ):
@@ -21,11 +21,13 @@ from __future__ import absolute_import, print_function
 
 from datetime import datetime, timedelta
 
+import mock
 import pytz
 from dateutil import parser
 
 from rero_ils.modules.libraries.api import Library
 from rero_ils.modules.libraries.api import library_id_fetcher as fetcher
+from rero_ils.modules.libraries.calendar import LibraryCalendar
 from rero_ils.modules.libraries.models import LibraryAddressType
 from rero_ils.modules.notifications.models import NotificationType
 from rero_ils.modules.utils import date_string_to_utc
@@ -54,6 +56,41 @@ def test_library_create(db, org_martigny, lib_martigny_data):
     assert fetched_pid.pid_type == "lib"
 
 
+def test_libraries_calendar(lib_martigny):
+    """Test the precomputed library calendar."""
+    library = lib_martigny
+    LibraryCalendar.invalidate(library.pid)
+    calendar = LibraryCalendar.get(library)
+    assert calendar
+    assert LibraryCalendar.get(library) is calendar
+
+    # the precomputed calendar gives the same results as the day by day
+    # computation.
+    start_date = datetime.now(pytz.utc).replace(hour=10) - timedelta(days=400)
+    end_date = start_date + timedelta(days=800)
+    dates = [start_date + timedelta(days=idx) for idx in range(0, 800, 3)]
+    results = {
+        "is_open": [library.is_open(date, day_only=True) for date in dates],
+        "next_open": [library.next_open(date) for date in dates],
+        "previous_open": [library.next_open(date, previous=True) for date in dates],
+        "open_days": library.get_open_days(start_date, end_date),
+        "count_open": library.count_open(start_date, end_date),
+    }
+    with mock.patch.object(LibraryCalendar, "get", return_value=None):
+        assert results == {
+            "is_open": [library.is_open(date, day_only=True) for date in dates],
+            "next_open": [library.next_open(date) for date in dates],
+            "previous_open": [library.next_open(date, previous=True) for date in dates],
+            "open_days": library.get_open_days(start_date, end_date),
+            "count_open": library.count_open(start_date, end_date),
+        }
+
+    # a calendar change builds a new calendar
+    changed_library = Library(dict(library, exception_dates=[]))
+    assert LibraryCalendar.get(changed_library) is not calendar
+    LibraryCalendar.invalidate(library.pid)
+
+
 def test_libraries_is_open(lib_martigny):
     """Test library 'open' methods."""
     saturday = "2018-12-15 11:00"
@@ -30,7 +30,12 @@ from invenio_circulation.proxies import current_circulation
 from rero_ils.modules.circ_policies.api import DUE_SOON_REMINDER_TYPE
 from rero_ils.modules.items.models import ItemStatus
 from rero_ils.modules.libraries.api import Library
-from rero_ils.modules.loans.api import Loan, LoansSearch, get_expired_request
+from rero_ils.modules.loans.api import (
+    Loan,
+    LoansSearch,
+    get_expired_request,
+    get_overdue_loans_fees,
+)
 from rero_ils.modules.loans.models import LoanAction, LoanState
 from rero_ils.modules.loans.tasks import loan_anonymizer
 from rero_ils.modules.loans.utils import (
@@ -459,6 +464,13 @@ def test_loan_get_overdue_fees(item_on_loan_martigny_patron_and_loan_on_loan):
             sum_for_fees(loan.get_overdue_fees) == expected_due_amount[count_open - 1]
         )
 
+    # the batch computation gives the same fees
+    batch_fees = {
+        overdue_loan.pid: fees
+        for overdue_loan, fees in get_overdue_loans_fees(loan.patron_pid)
+    }
+    assert batch_fees[loan.pid] == loan.get_overdue_fees
+
     # CASE#2 :: no more overdue after 3 days.
     #    * same definition than before, but add a upper limit to the last
     #      interval
@@ -20,11 +20,15 @@
 
 from __future__ import absolute_import, print_function
 
+import threading
+
 import mock
 import pytest
 from jsonschema.exceptions import ValidationError
 
+from rero_ils.modules.api import RecordCache
 from rero_ils.modules.items.api import Item
+from rero_ils.modules.notifications.api import Notification
 from rero_ils.modules.notifications.dispatcher import Dispatcher
 from rero_ils.modules.notifications.models import NotificationType
 from rero_ils.modules.notifications.subclasses.availability import (
@@ -36,6 +40,10 @@ from rero_ils.modules.notifications.subclasses.circulation import (
 from rero_ils.modules.notifications.subclasses.claim_issue import (
     ClaimSerialIssueNotification,
 )
+from rero_ils.modules.notifications.tasks import (
+    REMINDERS_CACHED_PID_TYPES,
+    send_emails,
+)
 from rero_ils.modules.utils import get_ref_for_pid
 
 
@@ -130,6 +138,88 @@ def test_notification_email_aggregated(
     assert mailbox[0].recipients == [recipient]
 
 
+def test_notification_dispatch_chunks(
+    app,
+    notification_late_sion,
+    notification_availability_martigny,
+    notification2_availability_martigny,
+    mailbox,
+):
+    """Test notifications dispatched by chunks with a thread pool."""
+    # two aggregations (the martigny availabilities are aggregated) sent
+    # without delay: one chunk dispatched by the thread pool.
+    pids = [
+        notification_late_sion.pid,
+        notification_availability_martigny.pid,
+        notification2_availability_martigny.pid,
+    ]
+    mailbox.clear()
+    threads = set()
+    send_aggregation = Dispatcher._send_aggregation
+
+    def send(notifications, verbose=False):
+        threads.add(threading.get_ident())
+        return send_aggregation(notifications, verbose)
+
+    mail = app.extensions["mail"]
+    with (
+        mock.patch.dict(
+            app.config,
+            {
+                "RERO_ILS_NOTIFICATIONS_DISPATCH_CHUNK_SIZE": 2,
+                "RERO_ILS_NOTIFICATIONS_DISPATCH_WORKERS": 2,
+            },
+        ),
+        mock.patch.object(Dispatcher, "_send_aggregation", side_effect=send),
+        mock.patch.object(
+            send_emails, "apply_async", wraps=send_emails.apply_async
+        ) as apply_async,
+        mock.patch.object(mail, "connect", wraps=mail.connect) as connect,
+    ):
+        result = Dispatcher.dispatch_notifications(pids, resend=True)
+    # the aggregations are sent by the pool workers
+    assert threads and threading.get_ident() not in threads
+    assert result["processed"] == 3
+    assert result["sent"] == 3
+    # the messages of the chunk are sent by one task with one SMTP connection
+    assert apply_async.call_count == 1
+    assert len(apply_async.call_args.args[0][0]) == 2
+    assert connect.call_count == 1
+    # each message is sent exactly once
+    assert len(mailbox) == 2
+    assert len({tuple(message.recipients) for message in mailbox}) == 2
+    for notification in Notification.get_records_by_pids(pids):
+        assert notification["process_date"]
+        assert notification["notification_sent"]
+
+
+def test_notification_dispatch_workers_record_cache(
+    app, notification_late_sion, notification_availability_martigny, mailbox
+):
+    """Test the dispatch workers into a record cache scope."""
+    pids = [notification_late_sion.pid, notification_availability_martigny.pid]
+    mailbox.clear()
+    caches = []
+    send_aggregation = Dispatcher._send_aggregation
+
+    def send(notifications, verbose=False):
+        caches.append(RecordCache.current())
+        return send_aggregation(notifications, verbose)
+
+    with (
+        mock.patch.dict(app.config, {"RERO_ILS_NOTIFICATIONS_DISPATCH_WORKERS": 2}),
+        mock.patch.object(Dispatcher, "_send_aggregation", side_effect=send),
+        RecordCache(pid_types=REMINDERS_CACHED_PID_TYPES) as cache,
+    ):
+        result = Dispatcher.dispatch_notifications(pids, resend=True)
+        assert RecordCache.current() is cache
+    # the record cache of the caller is not shared with the workers
+    assert caches == [None, None]
+    assert result["sent"] == 2
+    # but the outbox is: the messages are sent
+    assert len(mailbox) == 2
+
+
 def test_notification_properties(client, holding_lib_martigny_w_patterns):
     """Test notification properties."""
 
@@ -23,7 +23,9 @@ from datetime import datetime
 import pytest
 from invenio_search import current_search
 
+from rero_ils.modules.monitoring.metrics import Metrics
 from rero_ils.modules.operation_logs.api import OperationLog, OperationLogsSearch
+from rero_ils.modules.operation_logs.tasks import flush_operation_logs
 
 
 def test_operation_create(client, search_clear, operation_log_data):
@@ -76,6 +78,38 @@ def test_operation_bulk_index(client, search_clear, operation_log_data):
     assert OperationLog.delete_indices()
 
 
+def test_operation_buffered_create(app, search_clear, operation_log_data):
+    """Test operation logs creation with the buffered writer."""
+    app.config["RERO_ILS_OPERATION_LOG_BUFFERED"] = True
+    Metrics.reset("operation_logs")
+    try:
+        oplg = OperationLog.create(deepcopy(operation_log_data))
+        # the log is queued but not yet indexed
+        current_search.flush_and_refresh(OperationLog.index_name)
+        assert OperationLog.count() == 0
+        assert Metrics.get("operation_logs")["published"] == 1
+
+        assert flush_operation_logs() == 1
+        current_search.flush_and_refresh(OperationLog.index_name)
+        assert OperationLog.get_record(oplg.id)
+        metrics = Metrics.get("operation_logs")
+        assert metrics["flushed"] == 1
+        assert metrics["queue_depth"] == 0
+        assert "flush_latency" in metrics
+        # nothing more to flush
+        assert flush_operation_logs() == 0
+
+        # a refresh is required: the log is directly indexed
+        oplg = OperationLog.create(
+            deepcopy(operation_log_data), index_refresh="wait_for"
+        )
+        assert OperationLog.get_record(oplg.id)
+    finally:
+        app.config["RERO_ILS_OPERATION_LOG_BUFFERED"] = False
+    # clean up the index
+    assert OperationLog.delete_indices()
+
+
 def test_operation_update(app, search_clear, operation_log_data, monkeypatch):
     """Test update log."""
     operation_log = OperationLog.create(
@@ -25,6 +25,7 @@ from invenio_db import db
 
 from rero_ils.modules.ill_requests.models import ILLRequestStatus
 from rero_ils.modules.items.models import ItemCirculationAction
+from rero_ils.modules.libraries.api import LibrariesSearch
 from rero_ils.modules.loans.logs.api import LoanOperationLogsSearch
 from rero_ils.modules.stats.api.pricing import StatsForPricing
 
@@ -202,6 +203,13 @@ def test_stats_pricing_number_of_new_patrons(stat_for_pricing, patron_martigny):
     # today item creation is excluded
     stat = StatsForPricing()
     assert stat.number_of_new_patrons(patron_martigny.organisation_pid) == 0
+    # the collected value is unchanged by the multi search: it is the
+    # number of all patrons
+    results = stat.collect()
+    assert all(
+        values["number_of_new_patrons"] == values["number_of_patrons"]
+        for values in results
+    )
 
 
 def test_stats_pricing_files(stat_for_pricing, lib_martigny, document_with_files):
@@ -212,3 +220,47 @@ def test_stats_pricing_files(stat_for_pricing, lib_martigny, document_with_files
     assert stat_for_pricing.number_of_files(lib_martigny.pid) >= 1
     assert float(stat_for_pricing.files_volume(lib_martigny.pid)) > 0
     assert stat_for_pricing.number_of_docs_with_files(lib_martigny.pid) >= 1
+
+
+def test_stats_pricing_process(stat_for_pricing, lib_martigny, document_with_files):
+    """Test that the multi search gives the same values as each indicator."""
+    library = next(
+        LibrariesSearch()
+        .filter("term", pid=lib_martigny.pid)
+        .source(["pid", "name", "organisation"])
+        .scan()
+    )
+    values = stat_for_pricing.process(library)
+    lib_pid = lib_martigny.pid
+    org_pid = lib_martigny.organisation_pid
+    assert values["number_of_documents"] == stat_for_pricing.number_of_documents(
+        lib_pid
+    )
+    assert values["number_of_libraries"] == stat_for_pricing.number_of_libraries(
+        org_pid
+    )
+    assert values["number_of_checkouts"] == stat_for_pricing.number_of_circ_operations(
+        lib_pid, ItemCirculationAction.CHECKOUT
+    )
+    assert values["number_of_items"] == stat_for_pricing.number_of_items(lib_pid)
+    assert values["number_of_patrons"] == stat_for_pricing.number_of_patrons(org_pid)
+    assert values["number_of_files"] == stat_for_pricing.number_of_files(lib_pid)
+    assert values["files_volume"] == stat_for_pricing.files_volume(lib_pid)
+    assert list(values)[:4] == [
+        "number_of_documents",
+        "number_of_libraries",
+        "number_of_librarians",
+        "number_of_active_patrons",
+    ]
+
+
+def test_stats_pricing_active_patrons_modes(
+    stat_for_pricing, loan_due_soon_martigny, lib_martigny
+):
+    """Test the active patrons counting methods give the same results."""
+    for lib_pid, expected in [("foo", 0), (lib_martigny.pid, 1)]:
+        counts = {
+            stat_for_pricing.number_of_active_patrons(lib_pid, mode=mode)
+            for mode in ["scan", "exact", "cardinality"]
+        }
+        assert counts == {expected}
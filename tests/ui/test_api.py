@@ -27,9 +27,16 @@ from invenio_pidstore.providers.base import BaseProvider
 from invenio_records.models import RecordMetadataBase
 from jsonschema.exceptions import ValidationError
 
-from rero_ils.modules.api import IlsRecord, IlsRecordError, IlsRecordsSearch
+from rero_ils.modules.api import (
+    IlsRecord,
+    IlsRecordError,
+    IlsRecordsSearch,
+    RecordCache,
+)
 from rero_ils.modules.fetchers import id_fetcher
+from rero_ils.modules.libraries.api import Library
 from rero_ils.modules.minters import id_minter
+from rero_ils.modules.monitoring.metrics import Metrics
 from rero_ils.modules.providers import Provider
 
 
@@ -149,6 +156,19 @@ def test_ilsrecord(app, es_default_index, ils_record, ils_record_2):
     ]
     assert len(list(RecordTest.get_all_pids(limit=None))) == 3
     assert len(list(RecordTest.get_all_ids(limit=None))) == 3
+    # keyset pagination: pids are returned in creation order
+    assert list(RecordTest.get_all_pids(limit=1)) == [
+        "ilsrecord_pid",
+        "ilsrecord_pid_2",
+        "1",
+    ]
+    assert len(list(RecordTest.get_all_ids(limit=2))) == 3
+    assert len(list(RecordTest.get_all_pids(stream=True))) == 3
+    # bulk loading keeps the order of the pids and ignores unknown ones
+    records = RecordTest.get_records_by_pids(
+        ["1", "dummy", "ilsrecord_pid"], chunk_size=1
+    )
+    assert [record.pid for record in records] == ["1", "ilsrecord_pid"]
 
     assert RecordTest.get_id_by_pid(record_created_pid.pid) == record_created_pid.id
     assert not RecordTest.get_record_by_pid("dummy")
@@ -298,3 +318,24 @@ def test_ilsrecord_failed_pid(app, es_default_index, ils_record, ils_record_2):
     next_pid += 1
     db.session.commit()
     assert record4.pid == str(next_pid)
+
+
+def test_record_cache(app, lib_martigny):
+    """Test the record cache."""
+    Metrics.reset("record_cache")
+    assert RecordCache.current() is None
+    with RecordCache(pid_types=["lib"]) as cache:
+        library = Library.get_record_by_pid(lib_martigny.pid, read_only=True)
+        assert Library.get_record_by_pid(lib_martigny.pid, read_only=True) is library
+        # not read only callers get a copy of the cached record
+        copy = Library.get_record(lib_martigny.id)
+        assert copy is not library
+        assert copy == library
+        copy["name"] = "changed"
+        record = Library.get_record_by_pid(lib_martigny.pid)
+        assert record["name"] == lib_martigny["name"]
+        # modified records are removed from the cache
+        RecordCache.invalidate(lib_martigny)
+        assert not cache.records
+    assert RecordCache.current() is None
+    assert Metrics.get("record_cache") == {"miss": 1, "hit": 3, "invalidated": 1}
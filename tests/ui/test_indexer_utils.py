@@ -18,11 +18,19 @@
 """API tests for indexer utilities."""
 import pytest
 from elasticsearch import NotFoundError
+from flask import g
 from mock import mock
 
+from rero_ils.modules.api import ReindexCoordinator
 from rero_ils.modules.documents.api import DocumentsSearch
-from rero_ils.modules.indexer_utils import record_to_index
-from rero_ils.modules.libraries.api import LibrariesIndexer, LibrariesSearch
+from rero_ils.modules.indexer_utils import (
+    IndexEnrichers,
+    get_refresh_policy,
+    record_to_index,
+    refresh_policy,
+)
+from rero_ils.modules.libraries.api import LibrariesIndexer, LibrariesSearch, Library
+from rero_ils.modules.monitoring.metrics import Metrics
 
 
 def test_record_indexing(app, lib_martigny):
@@ -51,6 +59,21 @@ def test_record_indexing(app, lib_martigny):
     LibrariesSearch.flush_and_refresh()
 
 
+def test_bulk_queue_chunks(app, lib_martigny, lib_saxon):
+    """Test the bulk indexing of queue messages by chunks."""
+    app.config["RERO_ILS_INDEXER_BULK_CHUNK_SIZE"] = 2
+    indexer = LibrariesIndexer()
+    indexer.bulk_index([lib_martigny.id, lib_martigny.id, lib_saxon.id])
+    with mock.patch.object(
+        Library, "get_records", wraps=Library.get_records
+    ) as get_records:
+        # duplicated messages are indexed once
+        assert indexer.process_bulk_queue()[1] == (2, 0)
+        # one database query by chunk
+        assert get_records.call_count == 2
+    app.config["RERO_ILS_INDEXER_BULK_CHUNK_SIZE"] = 500
+
+
 def test_record_to_index(app):
     """Test the index name value from the JSONSchema."""
 
@@ -102,3 +125,109 @@ def test_get_resource_from_ES(document):
 
     with pytest.raises(NotFoundError):
         DocumentsSearch().get_record_by_pid("dummy_pid")
+
+
+def test_record_indexing_refresh_policy(app, lib_martigny):
+    """Test the refresh policies of single record indexing."""
+    Metrics.reset("indexer_refresh")
+    assert get_refresh_policy("lib") == "true"
+
+    # configuration by record type
+    app.config["RERO_ILS_INDEXER_REFRESH_POLICIES"] = {"lib": "wait_for"}
+    assert get_refresh_policy("lib") == "wait_for"
+    assert get_refresh_policy("loc") == "true"
+    app.config["RERO_ILS_INDEXER_REFRESH_POLICIES"] = {}
+
+    # call site policy: refresh is done once at the end of the block
+    with refresh_policy("deferred"):
+        assert get_refresh_policy("lib") == "deferred"
+        lib_martigny.reindex()
+        lib_martigny.reindex()
+        assert g.rero_ils_deferred_refresh == {"libraries-library-v0.0.1"}
+    assert "rero_ils_deferred_refresh" not in g
+    assert LibrariesSearch().get_record_by_pid(lib_martigny.pid)
+
+    counters = Metrics.get("indexer_refresh")
+    assert counters["deferred"] == 2
+    assert counters["avoided"] == 2
+    assert counters["deferred_flushed"] == 1
+
+    with pytest.raises(ValueError):
+        with refresh_policy("unknown"):
+            pass
+    app.config["RERO_ILS_INDEXER_REFRESH_POLICIES"] = {"lib": "unknown"}
+    with pytest.raises(ValueError):
+        get_refresh_policy("lib")
+    app.config["RERO_ILS_INDEXER_REFRESH_POLICIES"] = {}
+
+
+def test_reindex_coordinator(app, item_lib_martigny):
+    """Test the coalescing of dependent records reindexing."""
+    Metrics.reset("reindex_coordinator")
+    holding_pid = item_lib_martigny.holding_pid
+    with ReindexCoordinator() as coordinator:
+        # nested scopes are using the outer coordinator
+        with ReindexCoordinator() as nested:
+            assert nested is coordinator
+        item_lib_martigny.reindex()
+        item_lib_martigny.reindex()
+        assert coordinator.dirty == {"hold": {holding_pid: None}}
+    assert not coordinator.dirty
+    assert ReindexCoordinator.current() is None
+
+    # the holding is scheduled twice, the document once during the flush.
+    counters = Metrics.get("reindex_coordinator")
+    assert counters["scheduled"] == 3
+    assert counters["indexed"] == 2
+    doc = DocumentsSearch().get_record_by_pid(item_lib_martigny.document_pid)
+    assert doc.holdings[0].pid == holding_pid
+
+
+def test_reindex_coordinator_request(app, item_lib_martigny, monkeypatch):
+    """Test the coalescing of dependent records reindexing by request."""
+    Metrics.reset("reindex_coordinator")
+    monkeypatch.setitem(app.config, "RERO_ILS_INDEXER_COALESCE_REINDEX", True)
+    holding_pid = item_lib_martigny.holding_pid
+    with app.test_request_context():
+        item_lib_martigny.reindex()
+        coordinator = ReindexCoordinator.current()
+        assert g.rero_ils_reindex_coordinator is coordinator
+        assert coordinator.dirty == {"hold": {holding_pid: None}}
+        # request teardown
+        ReindexCoordinator.flush_request()
+        assert "rero_ils_reindex_coordinator" not in g
+        assert not coordinator.dirty
+
+    # the document scheduled during the flush is indexed by the same flush.
+    counters = Metrics.get("reindex_coordinator")
+    assert counters["scheduled"] == 2
+    assert counters["indexed"] == 2
+    doc = DocumentsSearch().get_record_by_pid(item_lib_martigny.document_pid)
+    assert doc.holdings[0].pid == holding_pid
+
+
+def test_index_enrichers(app, item_lib_martigny, lib_martigny):
+    """Test the dispatch of the indexed data enrichment by index."""
+    namespace = IndexEnrichers.metrics_namespace
+    enrichers = app.extensions["rero-ils"].index_enrichers
+    assert [func.__name__ for func in enrichers.get("items-item-v0.0.1")] == [
+        "enrich_item_data"
+    ]
+    assert enrichers.get("libraries-library-v0.0.1") == []
+
+    # only the enrichment functions of the record index are called
+    Metrics.reset(namespace)
+    item_lib_martigny.reindex()
+    lib_martigny.reindex()
+    counters = Metrics.get(namespace)
+    assert counters["enrich_item_data_calls"] == 1
+    assert counters["enrich_item_data_time"] > 0
+    assert "enrich_patron_data_calls" not in counters
+
+    # custom registry
+    registry = IndexEnrichers()
+    func = mock.MagicMock(__name__="enrich")
+    registry.register("items", func)
+    registry.dispatch(app, json={}, record=None, index="items-item-v0.0.1")
+    registry.dispatch(app, json={}, record=None, index="holdings-holding-v0.0.1")
+    func.assert_called_once_with(app, index="items-item-v0.0.1", json={}, record=None)
@@ -26,6 +26,9 @@ import mock
 from dojson.utils import GroupableOrderedDict
 
 from rero_ils.modules.documents.dojson.contrib.jsontomarc21 import to_marc21
+from rero_ils.modules.documents.dojson.contrib.jsontomarc21.model import (
+    HoldingsItemsContext,
+)
 
 
 def add_created_updated(record, updated=False):
@@ -820,3 +823,29 @@ def test_holdings_items_to_marc21(
         }
     )
     assert result == marc21
+
+
+def test_holdings_items_context_to_marc21(
+    app, document, item2_lib_sion, ebook_5, holding_lib_sion_electronic
+):
+    """Test holding items to MARC21 transformation with a prefetched context."""
+    context = HoldingsItemsContext([document.pid, ebook_5.pid, None])
+    assert set(context.holdings) == {document.pid, ebook_5.pid}
+    assert context.names["library"]["lib4"] == "Library of Sion"
+
+    for pid in [document.pid, ebook_5.pid]:
+        _, record = add_created_updated({"pid": pid})
+        expected = to_marc21.do(deepcopy(record), with_holdings_items=True)
+        # the holdings and items are only read from the context
+        with mock.patch.object(
+            HoldingsItemsContext, "_load", side_effect=AssertionError
+        ):
+            result = to_marc21.do(
+                record, with_holdings_items=True, holdings_items_context=context
+            )
+        assert result == expected
+        assert result.get("949__")
+
+    # the organisation filter is applied on the loaded holdings
+    context = HoldingsItemsContext([document.pid], organisation_pids=["org1"])
+    assert not context.get_holdings_items(document.pid)
@@ -17,9 +17,11 @@
 
 """Test cli."""
 
+import mock
 from click.testing import CliRunner
 
 from rero_ils.modules.cli.index import (
+    bulk_queue_worker,
     delete_queue,
     init_queue,
     purge_queue,
@@ -105,3 +107,69 @@ def test_cli_reindex_missing(app, org_sion_data):
     runner = CliRunner()
     res = runner.invoke(delete_queue, ["-n", queue_name])
     assert res.output.strip().split("\n") == [f"Queue has been deleted: {queue_name}"]
+
+
+def test_cli_run_processes(app):
+    """Test the multi-processes run cli."""
+    results = [
+        {
+            "worker": 0,
+            "indexed": 10,
+            "errors": 1,
+            "failed": ["Failed!"],
+            "exception": None,
+            "time": 2.0,
+        },
+        {
+            "worker": 1,
+            "indexed": 0,
+            "errors": 0,
+            "failed": [],
+            "exception": "Test!",
+            "time": 0.5,
+        },
+    ]
+    with mock.patch(
+        "rero_ils.modules.cli.index.run_bulk_queue_workers", return_value=results
+    ) as run_workers:
+        runner = CliRunner()
+        res = runner.invoke(run, ["-p", "2", "--chunk-size", "100"])
+        assert res.output.strip().split("\n") == [
+            "Indexing records with 2 processes (None)...",
+            "worker 0: indexed: 10 error: 1 time: 2.0s (5.0 records/s)",
+            "  Failed!",
+            "worker 1: indexed: 0 error: 0 time: 0.5s (0.0 records/s) "
+            "exception: Test!",
+            "indexed: 10 error: 1 time: 2.0s (5.0 records/s)",
+        ]
+        assert run_workers.call_args.kwargs["chunk_size"] == 100
+        assert run_workers.call_args.kwargs["stats_only"]
+
+        res = runner.invoke(run, ["-p", "2", "--with_stats"])
+        assert not run_workers.call_args.kwargs["stats_only"]
+
+
+def test_cli_bulk_queue_worker(app, org_martigny):
+    """Test a bulk queue worker in the current process."""
+    runner = CliRunner()
+    res = runner.invoke(init_queue, [])
+    res = runner.invoke(reindex, ["-t", "org", "--yes-i-know"])
+    assert res.output.strip().split("\n")[0] == (
+        "Sending org to indexing queue (indexer): 1"
+    )
+
+    with mock.patch("invenio_app.factory.create_api", return_value=app):
+        result = bulk_queue_worker(0, None, None, None, None, True, stats_only=False)
+    assert result["worker"] == 0
+    assert result["exception"] is None
+    assert result["indexed"] == 1
+    assert result["errors"] == 0
+    assert result["failed"] == []
+    assert result["time"] >= 0
+
+    # the queue is empty now
+    with mock.patch("invenio_app.factory.create_api", return_value=app):
+        result = bulk_queue_worker(1, None, None, None, None, True)
+    assert result["exception"] is None
+    assert result["indexed"] == 0
+    assert result["errors"] == 0
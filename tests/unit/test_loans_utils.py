@@ -0,0 +1,80 @@
+# -*- coding: utf-8 -*-
+#
+# RERO ILS
+# Copyright (C) 2019-2024 RERO
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, version 3 of the License.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+"""Test loans utils."""
+
+import math
+import random
+from bisect import bisect_right
+from datetime import datetime, timedelta
+
+import pytz
+
+from rero_ils.modules.loans.utils import compute_overdue_fees
+
+
+def _compute_overdue_fees_by_day(open_days, intervals, maximum_total_amount, tz):
+    """Compute the overdue fees day by day (reference implementation)."""
+    fees = []
+    total = 0
+    interval_lower_bounds = [inter["from"] for inter in intervals]
+    for day_idx, day in enumerate(open_days, 1):
+        day = day.replace(hour=0, minute=0, second=0, microsecond=0, tzinfo=None)
+        day = tz.localize(day)
+        interval_idx = bisect_right(interval_lower_bounds, day_idx) - 1
+        if interval_idx == -1:
+            continue
+        if day_idx > intervals[interval_idx]["to"]:
+            continue
+        fee_amount = intervals[interval_idx]["fee_amount"]
+        gap = round(maximum_total_amount - total, 2)
+        fee_amount = min(fee_amount, gap)
+        total = round(math.fsum([total, fee_amount]), 2)
+        fees.append((fee_amount, day))
+        if maximum_total_amount <= total:
+            break
+    return fees
+
+
+def test_compute_overdue_fees():
+    """Test the overdue fees computation."""
+    tz = pytz.timezone("Europe/Zurich")
+    start = datetime(2023, 3, 1, 22, 59, tzinfo=pytz.utc)
+    generator = random.Random(42)
+    for _ in range(200):
+        open_days = sorted(
+            start + timedelta(days=day)
+            for day in generator.sample(range(400), generator.randint(0, 100))
+        )
+        intervals = []
+        for _ in range(generator.randint(0, 4)):
+            lower_bound = generator.randint(0, 30)
+            interval = {
+                "from": lower_bound,
+                "to": lower_bound + generator.randint(-1, 20),
+                "fee_amount": generator.choice([0.1, 0.2, 0.35, 0.5, 1, 2.5]),
+            }
+            intervals.append(interval)
+        intervals = sorted(intervals, key=lambda interval: interval.get("from"))
+        if intervals and generator.random() < 0.5:
+            intervals[-1]["to"] = float("+inf")
+        maximum_total_amount = generator.choice([math.inf, 1, 2.5, 7.3])
+        assert compute_overdue_fees(
+            open_days, intervals, maximum_total_amount, tz
+        ) == _compute_overdue_fees_by_day(
+            open_days, intervals, maximum_total_amount, tz
+        )